@@ -1,4 +1,8 @@
-from typing import Tuple
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+from src.environment.grid import stack_routes
 
 Position = Tuple[int, int, int]
 
@@ -6,7 +10,7 @@ class BatteryModel:
     def __init__(self, base_cost_per_unit=1.0):
         self.base_cost_per_unit = base_cost_per_unit
 
-    def step_cost(self, a, b, payload_weight, weather=None):
+    def step_cost(self, a, b, payload_weight, weather=None, weather_penalty=None):
 
         dx = abs(a[0] - b[0])
         dy = abs(a[1] - b[1])
@@ -23,8 +27,87 @@ class BatteryModel:
         else:
             altitude_factor = 1.0
 
+        # Callers that already looked the penalty up in the weather
+        # cost field can pass it in to skip a second lookup
+        if weather_penalty is None and weather:
+            weather_penalty = weather.cost(b)
+
+        weather_factor = 1.0
+        if weather_penalty:
+            weather_factor = self.weather_factor(weather_penalty)
+
+        return distance * payload_factor * altitude_factor * weather_factor
+
+    def weather_factor(self, weather_penalty):
+        # Works on scalars and on NumPy penalty arrays alike
+        return 1.0 + weather_penalty * 0.1
+
+    # ------------------- ROUTE ENERGY -------------------
+
+    def route_energy(self, route, payload_weight, weather=None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Energy of every hop of a route, computed in one vectorized pass.
+
+        `route` is a list of positions or an (N, 3) array. Returns
+        (per_step, cumulative), each of length N - 1, matching a loop of
+        step_cost() over consecutive waypoints.
+        """
+
+        return self.route_energy_batch([route], payload_weight, weather)[0]
+
+    def route_energy_batch(
+        self,
+        routes: Sequence,
+        payload_weight,
+        weather=None,
+    ) -> List[Tuple[np.ndarray, np.ndarray]]:
+        """
+        route_energy() for many routes at once.
+
+        All hops of all routes are costed together; `payload_weight` is
+        either one value or one value per route. Running totals come from
+        one shared cumulative sum, so they can differ from a per-route
+        loop in the last few bits.
+        """
+
+        if len(routes) == 0:
+            return []
+
+        coords, lengths = stack_routes(routes)
+        hops = np.maximum(lengths - 1, 0)
+
+        # Hop i runs from stacked point i to i + 1, unless it crosses routes
+        crossing = np.zeros(max(coords.shape[1] - 1, 0), dtype=bool)
+        ends = np.cumsum(lengths)[:-1] - 1
+        crossing[ends[(ends >= 0) & (ends < len(crossing))]] = True
+
+        hop_from = np.flatnonzero(~crossing)
+        a = np.take(coords, hop_from, axis=1)
+        b = np.take(coords, hop_from + 1, axis=1)
+
+        dx, dy, dz = np.abs(b - a).astype(np.float64)
+        distance = np.sqrt(dx*dx + dy*dy + dz*dz)
+
+        payloads = np.broadcast_to(np.asarray(payload_weight, dtype=np.float64), len(routes))
+        payload_factor = 1 + np.repeat(payloads, hops) * 0.4
+
+        # abs() above makes every vertical move a climb, as in step_cost()
+        altitude_factor = np.where(dz > 0, 2.5, 1.0)
+
         weather_factor = 1.0
         if weather:
-            weather_factor += weather.cost(b) * 0.1
+            weather_factor = self.weather_factor(weather.costs(b.T))
+
+        steps = distance * payload_factor * altitude_factor * weather_factor
+
+        # Per-route running totals from one global cumulative sum
+        cumulative = np.cumsum(steps)
+        offsets = np.cumsum(hops) - hops
+        before = np.concatenate(([0.0], cumulative))[offsets]
+        cumulative -= np.repeat(before, hops)
 
-        return distance * payload_factor * altitude_factor * weather_factor
\ No newline at end of file
+        # Plain slices, np.split costs several times more per route
+        return [
+            (steps[start:end], cumulative[start:end])
+            for start, end in zip(offsets.tolist(), (offsets + hops).tolist())
+        ]
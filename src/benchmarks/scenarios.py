@@ -0,0 +1,160 @@
+"""
+Deterministic benchmark scenarios.
+
+A Scenario is a small parameter record (grid size, obstacle density,
+no-fly coverage, weather preset, payload) plus a seed. build() turns
+it into the same environment, weather and mission every time, on any
+machine, so timings from different runs and commits compare like for
+like.
+"""
+
+from typing import Dict, List, Tuple
+import random
+
+import numpy as np
+
+from src.environment.constraints import add_cylinder
+from src.environment.grid import GridMap, Position
+from src.simulation.campaign import WEATHER_PRESETS
+from src.weather.weather_model import WeatherModel
+
+
+class ScenarioWorld:
+    # Built scenario: everything a planner, validator or engine needs
+    def __init__(self, env: GridMap, weather: WeatherModel, start: Position, goal: Position, payload_weight: float, battery_capacity: float):
+        self.env = env
+        self.weather = weather
+        self.start = start
+        self.goal = goal
+        self.payload_weight = payload_weight
+        self.battery_capacity = battery_capacity
+
+
+class Scenario:
+    # Parameters of one benchmark world; build() is deterministic
+    def __init__(
+        self,
+        name: str,
+        shape: Tuple[int, int, int] = (20, 20, 10),
+        obstacle_density: float = 0.05,
+        no_fly_coverage: float = 0.0,
+        weather: str = "default",
+        payload_weight: float = 3.0,
+        battery_capacity: float = 1e6,
+        seed: int = 0,
+    ):
+        if weather not in WEATHER_PRESETS:
+            raise ValueError(f"Unknown weather preset {weather!r}, expected one of {tuple(WEATHER_PRESETS)}")
+
+        self.name = name
+        self.shape = tuple(shape)
+        self.obstacle_density = obstacle_density
+        self.no_fly_coverage = no_fly_coverage
+        self.weather = weather
+        self.payload_weight = payload_weight
+        self.battery_capacity = battery_capacity
+        self.seed = seed
+
+    def params(self) -> Dict:
+        # JSON-ready parameters, stored next to every result
+        return {
+            "shape": list(self.shape),
+            "obstacle_density": self.obstacle_density,
+            "no_fly_coverage": self.no_fly_coverage,
+            "weather": self.weather,
+            "payload_weight": self.payload_weight,
+            "battery_capacity": self.battery_capacity,
+            "seed": self.seed,
+        }
+
+    def build(self) -> ScenarioWorld:
+
+        x_size, y_size, z_size = self.shape
+
+        # One stream per layer, so varying one factor leaves the others
+        # as they were: a denser scenario adds obstacles to the same layout
+        key = f"{self.seed}/{x_size}x{y_size}x{z_size}"
+        noise = np.random.default_rng(random.Random(f"{key}/obstacles").getrandbits(32))
+        rng = random.Random(f"{key}/no_fly")
+
+        env = GridMap(x_size, y_size, z_size)
+
+        # Scattered single-voxel obstacles, one masked region write
+        mask = noise.random(self.shape) < self.obstacle_density
+        env.fill_region((0, 0, 0), (x_size - 1, y_size - 1, z_size - 1), env.OBSTACLE, mask=mask)
+
+        # No-fly cylinders until the requested share of voxels is restricted
+        target = self.no_fly_coverage * x_size * y_size * z_size
+        radius = max(1.0, min(x_size, y_size) / 10)
+
+        # Running count: a cylinder only changes cells inside its own box
+        covered = 0
+
+        for _ in range(1000):
+
+            if covered >= target:
+                break
+
+            cx, cy = rng.uniform(0, x_size), rng.uniform(0, y_size)
+            top = rng.randint(z_size // 2, z_size - 1)
+
+            lo = (int(np.floor(cx - radius)), int(np.floor(cy - radius)), 0)
+            hi = (int(np.ceil(cx + radius)), int(np.ceil(cy + radius)), top)
+
+            before = _count(env, lo, hi, env.NO_FLY)
+
+            # Overlaps with earlier cylinders are written, but not new coverage
+            if add_cylinder(env, (cx, cy), radius, (0, top)):
+                covered += _count(env, lo, hi, env.NO_FLY) - before
+
+        start = (0, 0, 1)
+        goal = (x_size - 1, y_size - 1, z_size // 2)
+
+        env.clear_cell(start)
+        env.clear_cell(goal)
+
+        weather = WeatherModel()
+        weather.generate_weather(
+            x_size,
+            y_size,
+            z_size,
+            rng=random.Random(f"{key}/weather"),
+            **WEATHER_PRESETS[self.weather]
+        )
+
+        return ScenarioWorld(env, weather, start, goal, self.payload_weight, self.battery_capacity)
+
+    def __repr__(self) -> str:
+        return f"Scenario(name={self.name!r}, {self.params()})"
+
+
+def default_scenarios(quick: bool = False) -> List[Scenario]:
+    """
+    The standard suite: grid size scaling plus one-factor variations.
+
+    `quick` keeps only the small grids, for smoke runs in CI.
+    """
+
+    scenarios = [
+        Scenario("main_20", (20, 20, 10)),
+        Scenario("clear_20", (20, 20, 10), obstacle_density=0.0, weather="clear"),
+        Scenario("dense_20", (20, 20, 10), obstacle_density=0.2),
+        Scenario("no_fly_20", (20, 20, 10), no_fly_coverage=0.15),
+        Scenario("severe_20", (20, 20, 10), weather="severe"),
+        Scenario("heavy_20", (20, 20, 10), payload_weight=15.0),
+    ]
+
+    if quick:
+        return scenarios
+
+    return scenarios + [
+        Scenario("main_40", (40, 40, 12)),
+        Scenario("dense_40", (40, 40, 12), obstacle_density=0.2, no_fly_coverage=0.1),
+        Scenario("main_60", (60, 60, 16)),
+    ]
+
+
+def _count(env: GridMap, min_corner, max_corner, value: int) -> int:
+    # Cells of `value` in an inclusive box, clipped to the grid
+    region = env.read_region(min_corner, max_corner)
+    return 0 if region is None else int((region == value).sum())
@@ -0,0 +1,360 @@
+"""
+Planner benchmark suite with regression tracking.
+
+For every scenario the suite times the mission pipeline stage by
+stage: planning, route validation, the preflight check and headless
+simulation of the planned route. It reports latency percentiles over
+repeated samples, peak traced memory (tracemalloc) of one call and,
+for planning, the PlanStats search counters and route length. Memory
+and search counters come from separate, untimed calls, so the
+instrumentation never skews the latencies.
+
+Results are written as JSON; comparing them with a stored baseline
+(an earlier results file) lists every metric that got worse by more
+than the tolerance:
+
+    python -m src.benchmarks.suite --output results.json
+    python -m src.benchmarks.suite --output new.json --baseline results.json
+"""
+
+from typing import Callable, Dict, List, Optional, Sequence
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from src.battery.battery_model import BatteryModel
+from src.benchmarks.scenarios import Scenario, default_scenarios
+from src.decision.preflight_checker import PreflightChecker
+from src.planner.anytime_planner import AnytimeGridPlanner
+from src.planner.array_planner import ArrayGridPlanner
+from src.planner.incremental_planner import IncrementalGridPlanner
+from src.planner.jump_point_planner import JumpPointGridPlanner
+from src.planner.planner import GridPlanner
+from src.planner.stats import PlanStats
+from src.simulation.engine import SimulationEngine
+from src.validation.route_validator import RouteValidator
+
+
+PLANNERS = {
+    "grid": GridPlanner,
+    "array": ArrayGridPlanner,
+    "anytime": AnytimeGridPlanner,
+    "incremental": IncrementalGridPlanner,
+    "jump_point": JumpPointGridPlanner,
+}
+
+OPERATIONS = ("plan", "validate", "preflight", "simulate")
+
+PERCENTILES = (50, 90, 99)
+
+# Fast calls are looped until one sample takes at least this long
+MIN_SAMPLE_SECONDS = 0.002
+
+
+# ------------------- MEASUREMENT -------------------
+
+def measure_latency(fn: Callable[[], object], repeat: int) -> Dict[str, float]:
+    # Per-call latency statistics (seconds) over `repeat` samples
+    fn()
+
+    # Calibrate calls per sample so timer resolution does not dominate
+    number = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        if time.perf_counter() - started >= MIN_SAMPLE_SECONDS or number >= 1 << 16:
+            break
+        number *= 4
+
+    samples = []
+
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - started) / number)
+
+    samples = np.array(samples)
+
+    stats = {
+        "mean": float(samples.mean()),
+        "min": float(samples.min()),
+        "max": float(samples.max()),
+        "samples": repeat,
+        "calls_per_sample": number,
+    }
+
+    for q in PERCENTILES:
+        stats[f"p{q}"] = float(np.percentile(samples, q))
+
+    return stats
+
+
+def measure_peak_memory(fn: Callable[[], object]) -> int:
+    # Bytes allocated at the peak of one call, above what was live before
+    tracing = tracemalloc.is_tracing()
+
+    if not tracing:
+        tracemalloc.start()
+
+    tracemalloc.reset_peak()
+    before, _ = tracemalloc.get_traced_memory()
+
+    fn()
+
+    _, peak = tracemalloc.get_traced_memory()
+
+    if not tracing:
+        tracemalloc.stop()
+
+    return max(0, peak - before)
+
+
+def plan_stats(planner, start, goal) -> PlanStats:
+    # Search counters of one instrumented plan
+    stats = PlanStats(labels={"planner": type(planner).__name__})
+    planner.plan(start, goal, stats=stats)
+
+    return stats
+
+
+# ------------------- SUITE -------------------
+
+def benchmark_scenario(scenario: Scenario, repeat: int = 5, planner_cls=GridPlanner) -> List[dict]:
+    # One result per operation of the mission pipeline
+    world = scenario.build()
+    battery_model = BatteryModel()
+
+    planner = planner_cls(
+        world.env,
+        world.weather,
+        battery_model=battery_model,
+        payload_weight=world.payload_weight,
+        battery_capacity=world.battery_capacity
+    )
+
+    route = planner.plan(world.start, world.goal)
+
+    validator = RouteValidator(world.env)
+    preflight = PreflightChecker(
+        validator,
+        max_route_length=10 * sum(world.env.shape),
+        battery_model=battery_model,
+        battery_capacity=world.battery_capacity,
+        payload_weight=world.payload_weight,
+        weather=world.weather,
+        reserve_margin=0.1
+    )
+
+    def simulate():
+        return SimulationEngine(
+            world.env,
+            planner,
+            world.start,
+            world.goal,
+            battery_model=battery_model,
+            payload_weight=world.payload_weight,
+            battery_capacity=world.battery_capacity,
+            weather=world.weather,
+            route=route,
+        ).run()
+
+    operations = {"plan": lambda: planner.plan(world.start, world.goal)}
+
+    # The later stages need a route to work on
+    if route is not None:
+        operations["validate"] = lambda: validator.validate(route)
+        operations["preflight"] = lambda: preflight.check(route)
+        operations["simulate"] = simulate
+
+    results = []
+
+    for name, fn in operations.items():
+
+        result = {
+            "scenario": scenario.name,
+            "params": scenario.params(),
+            "operation": name,
+            "latency": measure_latency(fn, repeat),
+            "peak_memory_bytes": measure_peak_memory(fn),
+        }
+
+        if name == "plan":
+            result["planner"] = planner_cls.__name__
+            result["route_length"] = None if route is None else len(route)
+            stats = plan_stats(planner, world.start, world.goal)
+            result["expansions"] = stats.expansions
+            result["plan_stats"] = stats.to_dict()
+
+        results.append(result)
+
+    return results
+
+
+def run_suite(
+    scenarios: Optional[Sequence[Scenario]] = None,
+    repeat: int = 5,
+    planner_cls=GridPlanner,
+    progress: Optional[Callable[[str], None]] = None,
+) -> dict:
+    # Full results document: environment metadata plus every result
+    if scenarios is None:
+        scenarios = default_scenarios()
+
+    results = []
+
+    for scenario in scenarios:
+        if progress:
+            progress(scenario.name)
+        results.extend(benchmark_scenario(scenario, repeat, planner_cls))
+
+    return {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "machine": platform.machine(),
+            "planner": planner_cls.__name__,
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+
+
+# ------------------- REGRESSIONS -------------------
+
+class Regression:
+    # One metric that got worse than the baseline allows
+    def __init__(self, scenario: str, operation: str, metric: str, baseline: float, current: float):
+        self.scenario = scenario
+        self.operation = operation
+        self.metric = metric
+        self.baseline = baseline
+        self.current = current
+
+    @property
+    def ratio(self) -> float:
+        return self.current / self.baseline if self.baseline else float("inf")
+
+    def __repr__(self) -> str:
+        return (
+            "Regression("
+            f"{self.scenario}/{self.operation} {self.metric}: "
+            f"{self.baseline:.6g} -> {self.current:.6g} (x{self.ratio:.2f}))"
+        )
+
+
+def compare(
+    results: dict,
+    baseline: dict,
+    tolerance: float = 0.25,
+    latency_floor: float = 5e-5,
+) -> List[Regression]:
+    """
+    Metrics of `results` worse than `baseline` by more than `tolerance`.
+
+    Latency compares p50, with `latency_floor` seconds of absolute slack
+    so microsecond-level jitter never counts. Expansions are exact
+    counts, so any increase beyond the tolerance is reported. Results
+    without a baseline entry are skipped.
+    """
+
+    previous = {
+        (result["scenario"], result["operation"]): result
+        for result in baseline.get("results", [])
+    }
+
+    regressions = []
+
+    for result in results.get("results", []):
+
+        old = previous.get((result["scenario"], result["operation"]))
+
+        if old is None:
+            continue
+
+        checks = [
+            ("latency_p50", old["latency"]["p50"], result["latency"]["p50"], latency_floor),
+            ("peak_memory_bytes", old["peak_memory_bytes"], result["peak_memory_bytes"], 0),
+            ("expansions", old.get("expansions"), result.get("expansions"), 0),
+        ]
+
+        for metric, before, after, slack in checks:
+
+            if before is None or after is None:
+                continue
+
+            if after > before * (1 + tolerance) + slack:
+                regressions.append(Regression(result["scenario"], result["operation"], metric, before, after))
+
+    return regressions
+
+
+# ------------------- CLI -------------------
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+
+    parser = argparse.ArgumentParser(description="Benchmark the planning pipeline.")
+    parser.add_argument("--output", default="benchmark_results.json", help="results JSON file to write")
+    parser.add_argument("--baseline", help="earlier results file to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed relative slowdown")
+    parser.add_argument("--repeat", type=int, default=5, help="latency samples per operation")
+    parser.add_argument("--planner", choices=sorted(PLANNERS), default="grid")
+    parser.add_argument("--quick", action="store_true", help="small grids only")
+    parser.add_argument("--scenario", action="append", help="only run scenarios with this name")
+
+    args = parser.parse_args(argv)
+
+    scenarios = default_scenarios(quick=args.quick)
+
+    if args.scenario:
+        scenarios = [scenario for scenario in scenarios if scenario.name in args.scenario]
+
+    results = run_suite(
+        scenarios,
+        repeat=args.repeat,
+        planner_cls=PLANNERS[args.planner],
+        progress=lambda name: print(f"⏱ {name}", file=sys.stderr),
+    )
+
+    with open(args.output, "w") as handle:
+        json.dump(results, handle, indent=2)
+
+    for result in results["results"]:
+        latency = result["latency"]
+        print(
+            f"{result['scenario']:<12} {result['operation']:<10} "
+            f"p50={latency['p50'] * 1000:9.3f}ms p90={latency['p90'] * 1000:9.3f}ms "
+            f"peak={result['peak_memory_bytes'] / 1024:9.1f}KiB"
+            + (f" expansions={result['expansions']}" if result.get("expansions") is not None else "")
+        )
+
+    if not args.baseline:
+        return 0
+
+    with open(args.baseline) as handle:
+        baseline = json.load(handle)
+
+    if baseline.get("meta", {}).get("planner") != results["meta"]["planner"]:
+        print(f"⚠️ Baseline was recorded with {baseline.get('meta', {}).get('planner')}")
+
+    regressions = compare(results, baseline, tolerance=args.tolerance)
+
+    for regression in regressions:
+        print(f"❌ {regression}")
+
+    if not regressions:
+        print("✅ No regressions against the baseline")
+
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
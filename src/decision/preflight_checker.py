@@ -3,10 +3,15 @@ Preflight decision module.
 
 Decides whether a mission is allowed to start based on
 route validity and simple mission constraints.
+
+With a battery model attached, the budget is energy rather than hop
+count: a route is rejected when its energy exceeds the battery, when
+the reserve margin no longer fits, or when the projected landing
+charge would fall below the level at which a mission is aborted.
 """
 
 from enum import Enum
-from typing import Optional, List
+from typing import Optional, List, Sequence
 
 from src.environment.grid import Position
 from src.validation.route_validator import (
@@ -27,6 +32,9 @@ class PreflightRejectReason(Enum):
     NO_ROUTE = "no_route"
     INVALID_ROUTE = "invalid_route"
     COST_EXCEEDED = "cost_exceeded"
+    ENERGY_EXCEEDED = "energy_exceeded"
+    RESERVE_VIOLATED = "reserve_violated"
+    LANDING_CHARGE_LOW = "landing_charge_low"
 
 
 class PreflightResult:
@@ -36,11 +44,18 @@ class PreflightResult:
         decision: PreflightDecision,
         reason: Optional[PreflightRejectReason] = None,
         details: Optional[str] = None,
+        energy: Optional[float] = None,
+        landing_charge: Optional[float] = None,
     ):
         self.decision = decision
         self.reason = reason
         self.details = details
 
+        # Route energy and projected landing charge (fraction of capacity),
+        # set when the checker has a battery model
+        self.energy = energy
+        self.landing_charge = landing_charge
+
     def approved(self) -> bool:
         # Convenience helper for GO / NO-GO checks
         return self.decision == PreflightDecision.GO
@@ -60,22 +75,78 @@ class PreflightChecker:
     def __init__(
         self,
         validator: RouteValidator,
-        max_route_length: int,
+        max_route_length: Optional[int] = None,
+        battery_model=None,
+        battery_capacity: Optional[float] = None,
+        payload_weight: float = 0,
+        weather=None,
+        reserve_margin: float = 0.0,
+        min_landing_charge: float = 0.1,
     ):
         self.validator = validator
         self.max_route_length = max_route_length
 
+        # Energy budget, only enforced with a battery model and capacity
+        self.battery_model = battery_model
+        self.battery_capacity = battery_capacity
+        self.payload_weight = payload_weight
+        self.weather = weather
+
+        # Extra fraction of the route energy held back for uncertainty
+        self.reserve_margin = reserve_margin
+
+        # Charge fraction left on landing; the simulator aborts below 10%
+        self.min_landing_charge = min_landing_charge
+
     def check(self, route: Optional[List[Position]]) -> PreflightResult:
-        # Planner failed to produce any route
-        if route is None or len(route) == 0:
-            return PreflightResult(
-                decision=PreflightDecision.NO_GO,
-                reason=PreflightRejectReason.NO_ROUTE,
-                details="Planner did not return a route",
-            )
+        return self.check_many([route])[0]
+
+    def check_many(self, routes: Sequence[Optional[List[Position]]]) -> List[PreflightResult]:
+        """
+        Preflight every candidate route, returning one result per route.
+
+        Validation and energy are computed for the whole batch at once,
+        so thousands of candidates can be scored in one call.
+        """
+
+        results: List[Optional[PreflightResult]] = [None] * len(routes)
+        pending = []
+
+        for i, route in enumerate(routes):
+            # Planner failed to produce any route
+            if route is None or len(route) == 0:
+                results[i] = PreflightResult(
+                    decision=PreflightDecision.NO_GO,
+                    reason=PreflightRejectReason.NO_ROUTE,
+                    details="Planner did not return a route",
+                )
+            else:
+                pending.append(i)
+
+        candidates = [routes[i] for i in pending]
 
         # Validate route legality against environment constraints
-        validation: RouteValidationResult = self.validator.validate(route)
+        validations: List[RouteValidationResult] = self.validator.validate_many(candidates)
+
+        energies = [None] * len(candidates)
+        if self._checks_energy() and candidates:
+            energies = [
+                float(cumulative[-1]) if len(cumulative) else 0.0
+                for _, cumulative in self.battery_model.route_energy_batch(
+                    candidates, self.payload_weight, self.weather
+                )
+            ]
+
+        for i, route, validation, energy in zip(pending, candidates, validations, energies):
+            results[i] = self._decide(route, validation, energy)
+
+        return results
+
+    def _checks_energy(self) -> bool:
+        return self.battery_model is not None and self.battery_capacity is not None
+
+    def _decide(self, route, validation: RouteValidationResult, energy: Optional[float]) -> PreflightResult:
+
         if not validation.valid:
             return PreflightResult(
                 decision=PreflightDecision.NO_GO,
@@ -85,14 +156,56 @@ class PreflightChecker:
 
         # Simple mission budget check using path length
         route_length = len(route) - 1
-        if route_length >= self.max_route_length:
+        if self.max_route_length is not None and route_length >= self.max_route_length:
             return PreflightResult(
                 decision=PreflightDecision.NO_GO,
                 reason=PreflightRejectReason.COST_EXCEEDED,
                 details=f"Route length {route_length} exceeds budget {self.max_route_length}",
             )
 
-        # All preflight checks passed
-        return PreflightResult(decision=PreflightDecision.GO)
+        if energy is None:
+            # All preflight checks passed
+            return PreflightResult(decision=PreflightDecision.GO)
+
+        capacity = self.battery_capacity
+        reserved = energy * (1 + self.reserve_margin)
+        landing_charge = (capacity - reserved) / capacity
+
+        def reject(reason: PreflightRejectReason, details: str) -> PreflightResult:
+            return PreflightResult(
+                decision=PreflightDecision.NO_GO,
+                reason=reason,
+                details=details,
+                energy=energy,
+                landing_charge=landing_charge,
+            )
+
+        # Route energy alone must fit in the battery
+        if energy > capacity:
+            return reject(
+                PreflightRejectReason.ENERGY_EXCEEDED,
+                f"Route energy {energy:.2f} exceeds battery capacity {capacity:.2f}",
+            )
+
+        # The reserve margin on top of it must fit as well
+        if reserved > capacity:
+            return reject(
+                PreflightRejectReason.RESERVE_VIOLATED,
+                f"Route energy {energy:.2f} plus {self.reserve_margin:.0%} reserve "
+                f"exceeds battery capacity {capacity:.2f}",
+            )
 
+        # Landing below the abort threshold would end the mission early
+        if landing_charge < self.min_landing_charge:
+            return reject(
+                PreflightRejectReason.LANDING_CHARGE_LOW,
+                f"Projected landing charge {landing_charge:.1%} is below "
+                f"{self.min_landing_charge:.0%}",
+            )
 
+        # All preflight checks passed
+        return PreflightResult(
+            decision=PreflightDecision.GO,
+            energy=energy,
+            landing_charge=landing_charge,
+        )
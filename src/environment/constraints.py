@@ -1,14 +1,167 @@
+"""
+Constraint rasterization.
+
+Turns restricted-airspace geometry into grid cells with clipped NumPy
+slice and mask writes instead of per-voxel calls. Shapes are given in
+grid coordinates; altitude bands are inclusive (z_min, z_max).
+"""
+
+from typing import Dict, Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+
 from .grid import GridMap, Position
 
+AltitudeBand = Tuple[int, int]
+
+# Cell values accepted by name in constraint layers
+CELL_VALUES = {
+    "no_fly": GridMap.NO_FLY,
+    "obstacle": GridMap.OBSTACLE,
+    "free": GridMap.FREE,
+}
+
+
 def add_cuboid_no_fly_zone(
     env: GridMap,
     min_corner: Position,
     max_corner: Position
 ):
-    x1, y1, z1 = min_corner
-    x2, y2, z2 = max_corner
+    add_cuboid(env, min_corner, max_corner, GridMap.NO_FLY)
+
+
+def add_cuboid(
+    env: GridMap,
+    min_corner: Position,
+    max_corner: Position,
+    value: int = GridMap.NO_FLY,
+) -> int:
+    # Inclusive box, one slice write
+    return env.fill_region(min_corner, max_corner, value)
+
+
+def add_cylinder(
+    env: GridMap,
+    center: Tuple[float, float],
+    radius: float,
+    altitude: AltitudeBand,
+    value: int = GridMap.NO_FLY,
+) -> int:
+    # Vertical cylinder, e.g. an airport control radius
+    cx, cy = center
+    z_min, z_max = altitude
+
+    box = env.clip_box(
+        (np.floor(cx - radius), np.floor(cy - radius), z_min),
+        (np.ceil(cx + radius), np.ceil(cy + radius), z_max),
+    )
+
+    if box is None:
+        return 0
+
+    (x0, y0, z0), (x1, y1, z1) = box
+
+    xs = np.arange(x0, x1 + 1)[:, None]
+    ys = np.arange(y0, y1 + 1)[None, :]
+
+    footprint = (xs - cx) ** 2 + (ys - cy) ** 2 <= radius ** 2
+
+    return env.fill_region((x0, y0, z0), (x1, y1, z1), value, footprint[:, :, None])
+
+
+def add_extruded_polygon(
+    env: GridMap,
+    vertices: Sequence[Tuple[float, float]],
+    altitude: AltitudeBand,
+    value: int = GridMap.NO_FLY,
+) -> int:
+    # Polygon footprint (x, y) extruded over an altitude band
+    polygon = np.asarray(vertices, dtype=np.float64)
+
+    if len(polygon) < 3:
+        raise ValueError("A polygon needs at least 3 vertices")
+
+    z_min, z_max = altitude
+
+    box = env.clip_box(
+        (np.floor(polygon[:, 0].min()), np.floor(polygon[:, 1].min()), z_min),
+        (np.ceil(polygon[:, 0].max()), np.ceil(polygon[:, 1].max()), z_max),
+    )
+
+    if box is None:
+        return 0
+
+    (x0, y0, z0), (x1, y1, z1) = box
+
+    footprint = _polygon_mask(
+        polygon,
+        np.arange(x0, x1 + 1, dtype=np.float64),
+        np.arange(y0, y1 + 1, dtype=np.float64),
+    )
+
+    return env.fill_region((x0, y0, z0), (x1, y1, z1), value, footprint[:, :, None])
+
+
+def load_constraint_layer(
+    env: GridMap,
+    constraints: Iterable[Dict],
+    value: Optional[int] = None,
+) -> int:
+    """
+    Rasterize a whole layer of constraints in one call.
+
+    Each constraint is a dict with a "type" of "cuboid" (min_corner,
+    max_corner), "cylinder" (center, radius, altitude) or "polygon"
+    (vertices, altitude), and an optional "value" (cell value or one of
+    "no_fly" / "obstacle" / "free"). `value` overrides every entry.
+    Returns the number of cells written.
+    """
+
+    written = 0
+
+    for constraint in constraints:
+
+        kind = constraint.get("type")
+        cell_value = _cell_value(value if value is not None else constraint.get("value", GridMap.NO_FLY))
+
+        if kind == "cuboid":
+            written += add_cuboid(env, constraint["min_corner"], constraint["max_corner"], cell_value)
+        elif kind == "cylinder":
+            written += add_cylinder(env, constraint["center"], constraint["radius"], constraint["altitude"], cell_value)
+        elif kind == "polygon":
+            written += add_extruded_polygon(env, constraint["vertices"], constraint["altitude"], cell_value)
+        else:
+            raise ValueError(f"Unknown constraint type {kind!r}")
+
+    return written
+
+
+def _cell_value(value) -> int:
+
+    if isinstance(value, str):
+        try:
+            return CELL_VALUES[value]
+        except KeyError:
+            raise ValueError(f"Unknown cell value {value!r}") from None
+
+    return int(value)
+
+
+def _polygon_mask(polygon: np.ndarray, xs: np.ndarray, ys: np.ndarray) -> np.ndarray:
+    # Even-odd ray casting for every cell center at once
+    px = xs[:, None]
+    py = ys[None, :]
+
+    inside = np.zeros((len(xs), len(ys)), dtype=bool)
+
+    for (ax, ay), (bx, by) in zip(polygon, np.roll(polygon, -1, axis=0)):
+
+        if ay == by:
+            continue
+
+        crosses = (ay > py) != (by > py)
+        x_at_y = ax + (py - ay) * (bx - ax) / (by - ay)
+
+        inside ^= crosses & (px < x_at_y)
 
-    for x in range(x1, x2 + 1):
-        for y in range(y1, y2 + 1):
-            for z in range(z1, z2 + 1):
-                env.add_no_fly_zone((x, y, z))
+    return inside
@@ -1,6 +1,11 @@
-from typing import Tuple
+from collections import deque
+from typing import Callable, List, Optional, Sequence, Tuple
+import itertools
+
 import numpy as np
 
+from .storage import ChunkedVoxelStore, DenseVoxelStore
+
 Position = Tuple[int, int, int]  # (x, y, z)
 
 class GridMap:
@@ -8,11 +13,57 @@ class GridMap:
     OBSTACLE = 1
     NO_FLY = 2
 
-    def __init__(self, x_size: int, y_size: int, z_size: int):
+    STORAGE_BACKENDS = ("dense", "chunked")
+
+    # Dirty boxes kept for changes_since(); older history is dropped
+    DIRTY_LOG_SIZE = 4096
+
+    def __init__(self, x_size: int, y_size: int, z_size: int, storage: str = "dense", chunk_size: int = 16):
         self.x_size = x_size
         self.y_size = y_size
         self.z_size = z_size
-        self._grid = np.zeros((x_size, y_size, z_size), dtype=int)
+
+        # "dense" keeps one uint8 array, "chunked" only stores occupied blocks
+        if storage == "dense":
+            self._store = DenseVoxelStore(self.shape, fill=self.FREE)
+        elif storage == "chunked":
+            self._store = ChunkedVoxelStore(self.shape, chunk_size=chunk_size, empty=self.FREE)
+        else:
+            raise ValueError(f"Unknown storage {storage!r}, expected one of {self.STORAGE_BACKENDS}")
+
+        self.storage = storage
+
+        self._init_tracking()
+
+    @classmethod
+    def from_array(cls, cells: np.ndarray, source: Tuple[str, str] = None) -> "GridMap":
+        """
+        Dense GridMap over an existing (x, y, z) uint8 array, not copied.
+
+        Used for memory-mapped maps (see src.environment.map_file);
+        `source` is the (path, mmap_mode) the array was mapped from, so
+        pickled copies map the file again instead of carrying the cells.
+        """
+
+        env = cls.__new__(cls)
+        env.x_size, env.y_size, env.z_size = (int(n) for n in cells.shape)
+        env._store = DenseVoxelStore.from_array(cells, source)
+        env.storage = "dense"
+        env._init_tracking()
+        return env
+
+    def _init_tracking(self):
+
+        # Bumped on every mutation; consumers compare it to skip work
+        self.version = 0
+
+        # (version, min_corner, max_corner) of recent mutations
+        self._dirty = deque(maxlen=self.DIRTY_LOG_SIZE)
+        self._subscribers: List[Callable] = []
+
+    @property
+    def shape(self) -> Tuple[int, int, int]:
+        return (self.x_size, self.y_size, self.z_size)
 
     def in_bounds(self, pos: Position) -> bool:
         x, y, z = pos
@@ -22,19 +73,320 @@ class GridMap:
             0 <= z < self.z_size
         )
 
+    def cell(self, pos: Position) -> int:
+        return self._store.get(pos)
+
     def is_traversable(self, pos: Position) -> bool:
-        return self.in_bounds(pos) and self._grid[pos] == self.FREE
+        return self.in_bounds(pos) and self._store.get(pos) == self.FREE
 
     def is_constrained(self, pos: Position) -> bool:
-        return not self.in_bounds(pos) or self._grid[pos] != self.FREE
+        return not self.in_bounds(pos) or self._store.get(pos) != self.FREE
 
     def add_obstacle(self, pos: Position):
-        if self.in_bounds(pos):
-            self._grid[pos] = self.OBSTACLE
+        self._set_cell(pos, self.OBSTACLE)
 
     def add_no_fly_zone(self, pos: Position):
-        if self.in_bounds(pos):
-            self._grid[pos] = self.NO_FLY
+        self._set_cell(pos, self.NO_FLY)
+
+    def clear_cell(self, pos: Position):
+        self._set_cell(pos, self.FREE)
+
+    def _set_cell(self, pos: Position, value: int):
+        # Writes that do not change the cell do not bump the version
+        if self.in_bounds(pos) and self._store.get(pos) != value:
+            self._store.set(pos, value)
+            self._mark_dirty(tuple(pos), tuple(pos))
+
+    def clip_box(self, min_corner: Position, max_corner: Position):
+        # Inclusive box clipped to the grid, None when nothing is inside
+        lo = tuple(max(0, int(c)) for c in min_corner)
+        hi = tuple(min(n - 1, int(c)) for c, n in zip(max_corner, self.shape))
+
+        if any(h < l for l, h in zip(lo, hi)):
+            return None
+
+        return lo, hi
+
+    def fill_region(self, min_corner: Position, max_corner: Position, value: int, mask: np.ndarray = None) -> int:
+        """
+        Set every cell of an inclusive box to `value` in one bulk write.
+
+        The box is clipped to the grid. `mask`, if given, selects cells
+        inside the clipped box and may be broadcastable to it (e.g. an
+        (x, y, 1) footprint). Returns the number of cells written.
+        """
+
+        box = self.clip_box(min_corner, max_corner)
+
+        if box is None:
+            return 0
+
+        lo, hi = box
+        region = tuple(slice(l, h + 1) for l, h in zip(lo, hi))
+        shape = tuple(h + 1 - l for l, h in zip(lo, hi))
+
+        if mask is None:
+            self._store.fill(region, value)
+            written = int(np.prod(shape))
+        else:
+            mask = np.broadcast_to(np.asarray(mask, dtype=bool), shape)
+            self._store.fill(region, value, mask)
+            written = int(mask.sum())
+
+        if written:
+            self._mark_dirty(lo, hi)
+
+        return written
+
+    # ------------------- CHANGE TRACKING -------------------
+
+    def subscribe(self, callback: Callable[[int, Position, Position], None]):
+        # callback(version, min_corner, max_corner) after every mutation
+        self._subscribers.append(callback)
+
+    def unsubscribe(self, callback: Callable[[int, Position, Position], None]):
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    def changes_since(self, version: int) -> Optional[List[Tuple[Position, Position]]]:
+        """
+        Inclusive dirty boxes of every mutation after `version`.
+
+        Returns None when that history has already been dropped from the
+        log, in which case callers must assume the whole grid changed.
+        """
+
+        if version >= self.version:
+            return []
+
+        if not self._dirty or self._dirty[0][0] > version + 1:
+            return None
+
+        return [(lo, hi) for v, lo, hi in self._dirty if v > version]
+
+    def _mark_dirty(self, lo: Position, hi: Position):
+
+        self.version += 1
+        self._dirty.append((self.version, lo, hi))
+
+        for callback in list(self._subscribers):
+            callback(self.version, lo, hi)
+
+    def __getstate__(self):
+        # Subscribers are callbacks local to this process
+        state = self.__dict__.copy()
+        state["_subscribers"] = []
+        return state
+
+    def view(self) -> "GridView":
+        # Consistent read-only view, copy-on-write instead of a full copy
+        return GridView(self._store.freeze(), self.version)
+
+    # ------------------- BULK READS -------------------
+
+    def free_mask(self) -> np.ndarray:
+        return self._store.equals(self.FREE)
+
+    def gather(self, points: np.ndarray) -> np.ndarray:
+        # Cell values at an (N, 3) array of in-bounds positions
+        points = np.asarray(points)
+        return self._store.gather(points[:, 0], points[:, 1], points[:, 2])
+
+    def read_region(self, min_corner: Position, max_corner: Position) -> Optional[np.ndarray]:
+        # Copy of the cell values in an inclusive box, clipped to the grid
+        box = self.clip_box(min_corner, max_corner)
+
+        if box is None:
+            return None
+
+        lo, hi = box
+        return self._store.read(tuple(slice(l, h + 1) for l, h in zip(lo, hi)))
 
     def snapshot(self) -> np.ndarray:
-        return self._grid.copy()
\ No newline at end of file
+        return self._store.to_dense()
+
+    def compact(self):
+        # Collapses uniform chunks after many single-cell writes
+        if hasattr(self._store, "compact"):
+            self._store.compact()
+
+    @property
+    def nbytes(self) -> int:
+        return self._store.nbytes
+
+
+class GridView:
+    # Read-only GridMap state frozen at one version
+    FREE = GridMap.FREE
+    OBSTACLE = GridMap.OBSTACLE
+    NO_FLY = GridMap.NO_FLY
+
+    def __init__(self, store, version: int):
+        self._store = store
+        self.version = version
+        self.x_size, self.y_size, self.z_size = store.shape
+
+    @property
+    def shape(self) -> Tuple[int, int, int]:
+        return (self.x_size, self.y_size, self.z_size)
+
+    def in_bounds(self, pos: Position) -> bool:
+        x, y, z = pos
+        return (
+            0 <= x < self.x_size and
+            0 <= y < self.y_size and
+            0 <= z < self.z_size
+        )
+
+    def __getitem__(self, pos: Position) -> int:
+        return self._store.get(pos)
+
+    def is_traversable(self, pos: Position) -> bool:
+        return self.in_bounds(pos) and self._store.get(pos) == self.FREE
+
+    def free_mask(self) -> np.ndarray:
+        return self._store.equals(self.FREE)
+
+    def gather(self, points: np.ndarray) -> np.ndarray:
+        # Cell values at an (N, 3) array of in-bounds positions
+        points = np.asarray(points)
+        return self._store.gather(points[:, 0], points[:, 1], points[:, 2])
+
+    def to_array(self) -> np.ndarray:
+        return self._store.to_dense()
+
+
+def stack_routes(routes: Sequence) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Stack routes into one (3, N) int64 coordinate array plus route lengths.
+
+    Routes may be position lists or (N, 3) arrays. Per-axis rows keep
+    downstream tests 1D: boolean indexing and axis reductions on (N, 3)
+    arrays are several times slower.
+    """
+
+    lengths = np.array([len(route) for route in routes], dtype=np.int64)
+
+    if any(isinstance(route, np.ndarray) for route in routes):
+        points = np.concatenate(
+            [np.asarray(route, dtype=np.int64).reshape(-1, 3) for route in routes]
+            or [np.empty((0, 3), dtype=np.int64)]
+        )
+    else:
+        # Plain position lists: one pass over every coordinate
+        values = itertools.chain.from_iterable(itertools.chain.from_iterable(routes))
+        points = np.fromiter(values, dtype=np.int64, count=3 * int(lengths.sum())).reshape(-1, 3)
+
+    return np.ascontiguousarray(points.T), lengths
+
+
+# Axis subsets of a unit move, used to enumerate the corners it cuts
+_CORNER_MASKS = np.array(
+    [(1, 0, 0), (0, 1, 0), (0, 0, 1), (1, 1, 0), (1, 0, 1), (0, 1, 1)],
+    dtype=np.int64,
+)
+
+
+def trace_segments(starts: np.ndarray, ends: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Voxels crossed by many straight segments, traced in one pass.
+
+    `starts` and `ends` are (3, M) integer arrays of voxel centers.
+    Returns ((3, K) cells, (K,) segment numbers) for every voxel a
+    segment passes through strictly between its two endpoints. Where a
+    segment crosses an edge or corner exactly, every voxel touching that
+    point is included, so the result is a conservative supercover.
+    """
+
+    deltas = ends - starts
+
+    if (np.abs(deltas) <= 1).all():
+        # Unit steps (planner routes): only the corners lie in between
+        cells = []
+        owners = []
+        cell_from = starts
+        unit = deltas
+        owner = np.arange(starts.shape[1])
+    else:
+        cells, owners, cell_from, unit, owner = _crossing_groups(starts, deltas)
+
+    moved = unit != 0
+    axis_count = moved.sum(axis=0)
+
+    # Corners: every proper, non-empty subset of a simultaneous crossing
+    for mask in _CORNER_MASKS:
+
+        selected = axis_count > mask.sum()
+        for a in np.flatnonzero(mask):
+            selected &= moved[a]
+
+        selected = np.flatnonzero(selected)
+        cells.append(
+            np.take(cell_from, selected, axis=1) +
+            np.take(unit, selected, axis=1) * mask[:, None]
+        )
+        owners.append(owner[selected])
+
+    return np.concatenate(cells, axis=1), np.concatenate(owners)
+
+
+def _crossing_groups(starts: np.ndarray, deltas: np.ndarray):
+    # Walks every cell boundary crossing of every segment at once.
+    # Crossings at the same point form one group; returns the cells
+    # entered strictly inside the segments plus, per group, the cell
+    # it leaves, its unit step and its segment
+    signs = np.sign(deltas)
+    crossings = np.abs(deltas)
+
+    segment_count = starts.shape[1]
+
+    # One event per cell boundary, laid out axis-major: boundary j
+    # of axis a is crossed at t = (j + 0.5) / |delta_a|
+    counts = crossings.ravel()
+    source = np.repeat(np.arange(counts.size), counts)
+    j = np.arange(len(source)) - np.repeat(np.cumsum(counts) - counts, counts)
+
+    axis = source // segment_count
+    segment = source % segment_count
+    t = (j + 0.5) / counts[source]
+
+    order = np.lexsort((t, segment))
+    axis = axis[order]
+    segment = segment[order]
+    t = t[order]
+
+    events = len(t)
+
+    # Equal rationals with small denominators divide to the same float
+    group_start = np.ones(events, dtype=bool)
+    group_start[1:] = (segment[1:] != segment[:-1]) | (t[1:] != t[:-1])
+
+    group_first = np.flatnonzero(group_start)
+    group_last = np.append(group_first[1:] - 1, events - 1)
+
+    # A segment's last group lands on its end voxel, which is not traced
+    interior = np.append(segment[group_first[1:]] == segment[group_first[:-1]], False)
+
+    # Offset from the segment start after every event, per axis
+    per_segment = crossings.sum(axis=0)
+    first_event = np.cumsum(per_segment) - per_segment
+
+    after = []
+    unit = []
+
+    for a in range(3):
+
+        moves = np.where(axis == a, signs[a][segment], 0)
+        total = np.cumsum(moves)
+
+        before = np.concatenate(([0], total))[first_event]
+        total -= np.repeat(before, per_segment)
+
+        after.append(total[group_last])
+        unit.append(total[group_last] - total[group_first] + moves[group_first])
+
+    owner = segment[group_last]
+    cell_after = np.take(starts, owner, axis=1) + np.array(after)
+    unit = np.array(unit)
+
+    return [cell_after[:, interior]], [owner[interior]], cell_after - unit, unit, owner
@@ -0,0 +1,233 @@
+"""
+Persistent environment and mission maps.
+
+A map is a directory with a small JSON header and one .npy file per
+array:
+
+    city.map/
+        header.json          format version, shape, weather zones,
+                             constraint layers, mission, field index
+        occupancy.npy        (x, y, z) uint8 GridMap cells
+        fields/<name>.npy    precomputed volumes (weather costs, ...)
+
+load_map() memory-maps the arrays, so opening even a multi-GB city
+only reads the headers and cells page in as they are touched. The
+default "c" mode is copy-on-write: the map can be edited in memory
+(obstacle clicks, pop-up towers) while the file and the page cache
+stay shared, read-only, between every process that opened it. A
+GridMap over an unmodified memory map pickles as its path, so worker
+pools map the file again instead of receiving a copy of the cells.
+"""
+
+from typing import Dict, Iterable, Optional
+import json
+import os
+import shutil
+import time
+
+import numpy as np
+
+from src.weather.weather_model import WeatherModel
+
+from .grid import GridMap
+
+
+FORMAT = "drone-map"
+FORMAT_VERSION = 1
+
+HEADER = "header.json"
+OCCUPANCY = "occupancy.npy"
+FIELDS_DIR = "fields"
+
+# x-slab size of streamed occupancy writes, bounds memory on huge grids
+SLAB_BYTES = 64 * 1024 * 1024
+
+MMAP_MODES = ("r", "c", "r+", None)
+
+
+class MapBundle:
+    # Everything a map file holds, opened from disk
+    def __init__(
+        self,
+        path: str,
+        env: GridMap,
+        weather: Optional[WeatherModel],
+        mission: Optional[Dict],
+        layers: Dict[str, list],
+        fields: Dict[str, np.ndarray],
+        meta: Dict,
+    ):
+        self.path = path
+        self.env = env
+        self.weather = weather
+
+        # start / goal positions, payload_weight, battery_capacity ...
+        self.mission = mission
+
+        # Constraint dicts (load_constraint_layer format), already in env
+        self.layers = layers
+
+        self.fields = fields
+        self.meta = meta
+
+    def __repr__(self) -> str:
+        return (
+            "MapBundle("
+            f"path={self.path!r}, shape={self.env.shape}, "
+            f"zones={len(self.weather.zones) if self.weather else 0}, "
+            f"layers={list(self.layers)}, fields={list(self.fields)})"
+        )
+
+
+def save_map(
+    path: str,
+    env: GridMap,
+    weather: Optional[WeatherModel] = None,
+    mission: Optional[Dict] = None,
+    layers: Optional[Dict[str, Iterable[Dict]]] = None,
+    fields: Optional[Dict[str, np.ndarray]] = None,
+    meta: Optional[Dict] = None,
+    overwrite: bool = False,
+):
+    """
+    Write a map directory.
+
+    The occupancy grid is streamed in x-slabs, so saving never holds a
+    second copy of a large grid. Everything is written to a temporary
+    directory next to `path` and moved into place at the end, so
+    readers never see a half-written map.
+    """
+
+    if os.path.exists(path) and not overwrite:
+        raise FileExistsError(f"Map {path!r} already exists")
+
+    staging = f"{path}.tmp-{os.getpid()}"
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(os.path.join(staging, FIELDS_DIR))
+
+    try:
+        _write_occupancy(os.path.join(staging, OCCUPANCY), env)
+
+        field_index = {}
+
+        for name, array in (fields or {}).items():
+
+            if not name or os.sep in name or name.startswith("."):
+                raise ValueError(f"Invalid field name {name!r}")
+
+            relative = os.path.join(FIELDS_DIR, f"{name}.npy")
+            np.save(os.path.join(staging, relative), np.ascontiguousarray(array))
+            field_index[name] = relative
+
+        header = {
+            "format": FORMAT,
+            "version": FORMAT_VERSION,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "shape": list(env.shape),
+            "occupancy": OCCUPANCY,
+            "cell_values": {"free": GridMap.FREE, "obstacle": GridMap.OBSTACLE, "no_fly": GridMap.NO_FLY},
+            "weather": weather.to_dict() if weather is not None else None,
+            "mission": _to_json(mission),
+            "layers": {name: _to_json(list(layer)) for name, layer in (layers or {}).items()},
+            "fields": field_index,
+            "meta": _to_json(meta or {}),
+        }
+
+        with open(os.path.join(staging, HEADER), "w") as handle:
+            json.dump(header, handle, indent=2)
+
+        if os.path.exists(path):
+            shutil.rmtree(path)
+
+        os.replace(staging, path)
+
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+
+def load_map(path: str, mmap_mode: Optional[str] = "c") -> MapBundle:
+    """
+    Open a map directory.
+
+    `mmap_mode` is "c" (copy-on-write, default), "r" (read-only, writes
+    raise), "r+" (edits go to the file) or None to read every array
+    into memory.
+    """
+
+    if mmap_mode not in MMAP_MODES:
+        raise ValueError(f"Unknown mmap_mode {mmap_mode!r}, expected one of {MMAP_MODES}")
+
+    with open(os.path.join(path, HEADER)) as handle:
+        header = json.load(handle)
+
+    if header.get("format") != FORMAT:
+        raise ValueError(f"{path!r} is not a {FORMAT} map")
+
+    if header.get("version", 0) > FORMAT_VERSION:
+        raise ValueError(f"Map format version {header['version']} is newer than supported {FORMAT_VERSION}")
+
+    occupancy_path = os.path.join(path, header["occupancy"])
+    cells = np.load(occupancy_path, mmap_mode=mmap_mode)
+
+    if cells.dtype != np.uint8 or list(cells.shape) != header["shape"]:
+        raise ValueError(f"Occupancy {cells.dtype}{cells.shape} does not match header shape {header['shape']}")
+
+    source = (os.path.abspath(occupancy_path), mmap_mode) if mmap_mode else None
+    env = GridMap.from_array(cells, source)
+
+    weather = None
+    if header.get("weather") is not None:
+        weather = WeatherModel.from_dict(header["weather"])
+
+    fields = {
+        name: np.load(os.path.join(path, relative), mmap_mode=mmap_mode)
+        for name, relative in header.get("fields", {}).items()
+    }
+
+    mission = header.get("mission")
+    if mission is not None:
+        # JSON turns position tuples into lists
+        mission = {
+            key: tuple(value) if key in ("start", "goal") else value
+            for key, value in mission.items()
+        }
+
+    return MapBundle(
+        path,
+        env,
+        weather,
+        mission,
+        header.get("layers", {}),
+        fields,
+        header.get("meta", {}),
+    )
+
+
+def _write_occupancy(path: str, env: GridMap):
+
+    x_size, y_size, z_size = env.shape
+
+    out = np.lib.format.open_memmap(path, mode="w+", dtype=np.uint8, shape=env.shape)
+
+    slab = max(1, SLAB_BYTES // max(1, y_size * z_size))
+
+    for x in range(0, x_size, slab):
+        top = min(x_size, x + slab) - 1
+        out[x:top + 1] = env.read_region((x, 0, 0), (top, y_size - 1, z_size - 1))
+
+    out.flush()
+    del out
+
+
+def _to_json(value):
+    # Tuples and NumPy scalars / arrays into plain JSON types
+    if isinstance(value, dict):
+        return {str(key): _to_json(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_to_json(item) for item in value]
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    return value
@@ -0,0 +1,417 @@
+"""
+Voxel storage backends for GridMap.
+
+Cells only take three states (FREE / OBSTACLE / NO_FLY), so every
+backend stores them as uint8. The dense backend is one array for the
+whole airspace. The chunked backend splits it into cubic blocks where
+empty blocks are not stored at all and uniform blocks are collapsed to
+a single value, so memory follows occupied structure rather than the
+bounding-box volume.
+"""
+
+from typing import Dict, Iterator, Set, Tuple, Union
+import weakref
+
+import numpy as np
+
+
+Shape = Tuple[int, int, int]
+Region = Tuple[slice, slice, slice]
+ChunkKey = Tuple[int, int, int]
+
+
+class DenseVoxelStore:
+    # One uint8 array covering the whole grid
+    def __init__(self, shape: Shape, fill: int = 0):
+        self.shape = tuple(shape)
+        self._cells = np.full(self.shape, fill, dtype=np.uint8)
+
+        # Set while a frozen copy shares the array, the next write copies it
+        self._shared = False
+        self._frozen = weakref.WeakSet()
+
+        # (path, mmap_mode) of an unmodified memory-mapped .npy file
+        self._source = None
+
+    @classmethod
+    def from_array(cls, cells: np.ndarray, source: Tuple[str, str] = None) -> "DenseVoxelStore":
+        # Adopts an (x, y, z) uint8 array without copying, e.g. a memory map
+        store = cls.__new__(cls)
+        store.shape = tuple(cells.shape)
+        store._cells = cells
+        store._shared = False
+        store._frozen = weakref.WeakSet()
+        store._source = source
+        return store
+
+    def get(self, pos) -> int:
+        return self._cells[pos]
+
+    def set(self, pos, value: int):
+        self._unshare()
+        self._cells[pos] = value
+
+    def fill(self, region: Region, value: int, mask: np.ndarray = None):
+        # Bulk write of an in-bounds region, optionally only where mask is set
+        self._unshare()
+
+        if mask is None:
+            self._cells[region] = value
+        else:
+            self._cells[region][np.broadcast_to(mask, self._cells[region].shape)] = value
+
+    def read(self, region: Region) -> np.ndarray:
+        return self._cells[region].copy()
+
+    def gather(self, xs: np.ndarray, ys: np.ndarray, zs: np.ndarray) -> np.ndarray:
+        # Values at many in-bounds cells in one flat-index read
+        _, y_size, z_size = self.shape
+        return np.take(self._cells, (xs * y_size + ys) * z_size + zs)
+
+    def to_dense(self) -> np.ndarray:
+        return self._cells.copy()
+
+    def equals(self, value: int) -> np.ndarray:
+        return self._cells == value
+
+    def freeze(self) -> "DenseVoxelStore":
+        # Copy-on-write clone: O(1) now, one array copy on the next write
+        frozen = DenseVoxelStore.__new__(DenseVoxelStore)
+        frozen.shape = self.shape
+        frozen._cells = self._cells.view()
+        frozen._cells.flags.writeable = False
+        frozen._shared = True
+        frozen._frozen = weakref.WeakSet()
+        frozen._source = self._source
+
+        self._shared = True
+        self._frozen.add(frozen)
+        return frozen
+
+    def __getstate__(self):
+        # Frozen clones do not travel to other processes
+        state = self.__dict__.copy()
+        del state["_frozen"]
+        state["_shared"] = False
+
+        # An unmodified memory map travels as its path and is mapped again
+        if self._source is not None:
+            state["_cells"] = None
+
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._frozen = weakref.WeakSet()
+
+        if self._cells is None:
+            path, mmap_mode = self._source
+            self._cells = np.load(path, mmap_mode=mmap_mode)
+
+    def _unshare(self):
+        # Copies are only needed while a frozen clone is still alive
+        if self._shared and len(self._frozen):
+            self._cells = self._cells.copy()
+        self._shared = False
+
+        # Local writes make the contents differ from the mapped file
+        self._source = None
+
+    @property
+    def nbytes(self) -> int:
+        return self._cells.nbytes
+
+
+class ChunkedVoxelStore:
+    """
+    Sparse block storage.
+
+    Each chunk is either missing (implicitly `empty`), an int (uniform
+    chunk) or a uint8 array of chunk_size^3 cells. Edge chunks are
+    allocated at full size and clipped when exported. Region writes
+    collapse the chunks they touch; single-cell writes do not, call
+    compact() after many of them.
+    """
+
+    def __init__(self, shape: Shape, chunk_size: int = 16, empty: int = 0):
+        self.shape = tuple(shape)
+        self.chunk_size = chunk_size
+        self.empty = empty
+        self._chunks: Dict[ChunkKey, Union[int, np.ndarray]] = {}
+
+        # Chunk arrays shared with a frozen copy, copied before their next write
+        self._shared: Set[ChunkKey] = set()
+        self._frozen = weakref.WeakSet()
+
+    # ------------------- CELLS -------------------
+
+    def get(self, pos) -> int:
+
+        size = self.chunk_size
+        x, y, z = pos
+
+        chunk = self._chunks.get((x // size, y // size, z // size))
+
+        if chunk is None:
+            return self.empty
+
+        if isinstance(chunk, int):
+            return chunk
+
+        return chunk[x % size, y % size, z % size]
+
+    def set(self, pos, value: int):
+
+        size = self.chunk_size
+        x, y, z = pos
+        key = (x // size, y // size, z // size)
+
+        chunk = self._writable(key)
+
+        if isinstance(chunk, int):
+            if chunk == value:
+                return
+            chunk = self._materialize(key, chunk)
+
+        chunk[x % size, y % size, z % size] = value
+
+    # ------------------- REGIONS -------------------
+
+    def fill(self, region: Region, value: int, mask: np.ndarray = None):
+        # Bulk write of an in-bounds region, optionally only where mask is set
+        if mask is not None:
+            mask = np.broadcast_to(mask, tuple(s.stop - s.start for s in region))
+
+        for key, chunk_region, local_region in self._overlaps(region):
+
+            local_mask = None
+            if mask is not None:
+                local_mask = mask[local_region]
+                if not local_mask.any():
+                    continue
+
+            full = local_mask is None or local_mask.all()
+
+            if full and self._covers(key, chunk_region):
+                # Whole chunk overwritten: keep it as a single value
+                self._store_uniform(key, value)
+                continue
+
+            chunk = self._writable(key)
+
+            if isinstance(chunk, int):
+                if chunk == value:
+                    continue
+                chunk = self._materialize(key, chunk)
+
+            if local_mask is None:
+                chunk[chunk_region] = value
+            else:
+                chunk[chunk_region][local_mask] = value
+
+            self._collapse(key)
+
+    def read(self, region: Region) -> np.ndarray:
+
+        shape = tuple(s.stop - s.start for s in region)
+        out = np.full(shape, self.empty, dtype=np.uint8)
+
+        for key, chunk_region, local_region in self._overlaps(region):
+
+            chunk = self._chunks.get(key)
+
+            if chunk is None:
+                continue
+
+            if isinstance(chunk, int):
+                out[local_region] = chunk
+            else:
+                out[local_region] = chunk[chunk_region]
+
+        return out
+
+    def gather(self, xs: np.ndarray, ys: np.ndarray, zs: np.ndarray) -> np.ndarray:
+        # Values at many in-bounds cells, one lookup per touched chunk
+        size = self.chunk_size
+        out = np.full(len(xs), self.empty, dtype=np.uint8)
+
+        if len(xs) == 0:
+            return out
+
+        # One integer code per chunk, so grouping is a 1D sort
+        counts = [-(-extent // size) for extent in self.shape]
+        codes = ((xs // size) * counts[1] + ys // size) * counts[2] + zs // size
+
+        order = np.argsort(codes, kind="stable")
+        sorted_codes = codes[order]
+
+        # order[bounds[i]:bounds[i + 1]] are the cells of chunk unique[i]
+        starts = np.flatnonzero(np.diff(sorted_codes)) + 1
+        bounds = np.concatenate(([0], starts, [len(codes)]))
+        unique = sorted_codes[bounds[:-1]]
+
+        for i, code in enumerate(unique.tolist()):
+
+            rest, cz = divmod(code, counts[2])
+            cx, cy = divmod(rest, counts[1])
+            chunk = self._chunks.get((cx, cy, cz))
+
+            if chunk is None:
+                continue
+
+            cells = order[bounds[i]:bounds[i + 1]]
+
+            if isinstance(chunk, int):
+                out[cells] = chunk
+            else:
+                out[cells] = chunk[xs[cells] % size, ys[cells] % size, zs[cells] % size]
+
+        return out
+
+    def to_dense(self) -> np.ndarray:
+        return self.read(tuple(slice(0, n) for n in self.shape))
+
+    def equals(self, value: int) -> np.ndarray:
+        # Boolean mask built chunk by chunk, without a dense uint8 copy
+        out = np.full(self.shape, self.empty == value, dtype=bool)
+
+        for key, chunk in self._chunks.items():
+
+            size = self.chunk_size
+            valid = self._valid_region(key)
+            target = tuple(
+                slice(k * size, k * size + region.stop)
+                for k, region in zip(key, valid)
+            )
+
+            if isinstance(chunk, int):
+                out[target] = chunk == value
+            else:
+                out[target] = chunk[valid] == value
+
+        return out
+
+    def freeze(self) -> "ChunkedVoxelStore":
+        # Copy-on-write clone sharing every chunk until it is written
+        frozen = ChunkedVoxelStore(self.shape, self.chunk_size, self.empty)
+        frozen._chunks = dict(self._chunks)
+
+        self._shared = {
+            key for key, chunk in self._chunks.items()
+            if not isinstance(chunk, int)
+        }
+        self._frozen.add(frozen)
+        return frozen
+
+    def __getstate__(self):
+        # Frozen clones do not travel to other processes
+        state = self.__dict__.copy()
+        del state["_frozen"]
+        state["_shared"] = set()
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._frozen = weakref.WeakSet()
+
+    # ------------------- MEMORY -------------------
+
+    def compact(self):
+        # Collapse uniform chunks and drop empty ones
+        for key in list(self._chunks):
+            self._collapse(key)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(
+            chunk.nbytes
+            for chunk in self._chunks.values()
+            if not isinstance(chunk, int)
+        )
+
+    @property
+    def chunk_count(self) -> int:
+        return len(self._chunks)
+
+    # ------------------- HELPERS -------------------
+
+    def _writable(self, key: ChunkKey) -> Union[int, np.ndarray]:
+
+        chunk = self._chunks.get(key, self.empty)
+
+        if self._shared and not len(self._frozen):
+            # Every frozen clone is gone, nothing is shared any more
+            self._shared.clear()
+
+        if key in self._shared:
+            self._shared.discard(key)
+            if not isinstance(chunk, int):
+                chunk = chunk.copy()
+                self._chunks[key] = chunk
+
+        return chunk
+
+    def _materialize(self, key: ChunkKey, value: int) -> np.ndarray:
+
+        size = self.chunk_size
+        chunk = np.full((size, size, size), value, dtype=np.uint8)
+        self._chunks[key] = chunk
+        return chunk
+
+    def _store_uniform(self, key: ChunkKey, value: int):
+
+        if value == self.empty:
+            self._chunks.pop(key, None)
+        else:
+            self._chunks[key] = int(value)
+
+    def _collapse(self, key: ChunkKey):
+
+        chunk = self._chunks.get(key)
+
+        if chunk is None or isinstance(chunk, int):
+            return
+
+        # Only the in-bounds part of an edge chunk counts
+        valid = chunk[self._valid_region(key)]
+        first = int(valid.flat[0])
+
+        if (valid == first).all():
+            self._store_uniform(key, first)
+
+    def _valid_region(self, key: ChunkKey) -> Region:
+
+        size = self.chunk_size
+        return tuple(
+            slice(0, min(size, extent - k * size))
+            for k, extent in zip(key, self.shape)
+        )
+
+    def _covers(self, key: ChunkKey, chunk_region: Region) -> bool:
+
+        valid = self._valid_region(key)
+        return all(
+            region.start == 0 and region.stop >= limit.stop
+            for region, limit in zip(chunk_region, valid)
+        )
+
+    def _overlaps(self, region: Region) -> Iterator[Tuple[ChunkKey, Region, Region]]:
+        # (chunk key, slice inside the chunk, slice inside the region)
+        size = self.chunk_size
+        (x0, x1), (y0, y1), (z0, z1) = [(s.start, s.stop) for s in region]
+
+        for cx in range(x0 // size, -(-x1 // size)):
+            for cy in range(y0 // size, -(-y1 // size)):
+                for cz in range(z0 // size, -(-z1 // size)):
+
+                    chunk_region = []
+                    local_region = []
+
+                    for k, lo, hi in ((cx, x0, x1), (cy, y0, y1), (cz, z0, z1)):
+                        base = k * size
+                        a = max(lo, base)
+                        b = min(hi, base + size)
+                        chunk_region.append(slice(a - base, b - base))
+                        local_region.append(slice(a - lo, b - lo))
+
+                    yield (cx, cy, cz), tuple(chunk_region), tuple(local_region)
@@ -1,5 +1,9 @@
+import argparse
+import random
+
 from src.environment.grid import GridMap
-from src.environment.constraints import add_cuboid_no_fly_zone
+from src.environment.constraints import load_constraint_layer
+from src.environment.map_file import load_map, save_map
 
 from src.planner.planner import GridPlanner
 from src.validation.route_validator import RouteValidator
@@ -8,15 +12,74 @@ from src.decision.preflight_checker import PreflightChecker, PreflightDecision
 from src.visualization.simulator import DroneSimulator
 from src.weather.weather_model import WeatherModel
 from src.battery.battery_model import BatteryModel
+from src.simulation.world import scatter_buildings, scatter_trees
+
+
+# Built-in scenario, used when no map file is given
+DEFAULT_MISSION = {
+    "start": (0, 0, 2),
+    "goal": (19, 19, 3),
+    "payload_weight": 3.0,
+    "battery_capacity": 300,
+}
 
+NO_FLY_LAYER = [
+    {"type": "cuboid", "min_corner": (10, 10, 2), "max_corner": (12, 12, 5)},
+]
 
-def main():
+
+def save_default_map(path, seed=None):
+    # Built-in scenario with seeded scenery and weather, written as a map file
+    rng = random.Random(seed)
 
     env = GridMap(20, 20, 10)
-    add_cuboid_no_fly_zone(env, (10, 10, 2), (12, 12, 5))
+    load_constraint_layer(env, NO_FLY_LAYER)
+
+    scatter_buildings(env, rng, DEFAULT_MISSION["start"], DEFAULT_MISSION["goal"])
+    scatter_trees(env, rng)
+
+    weather = WeatherModel()
+    weather.generate_weather(env.x_size, env.y_size, env.z_size, rng=rng)
+
+    save_map(
+        path,
+        env,
+        weather,
+        mission=DEFAULT_MISSION,
+        layers={"no_fly": NO_FLY_LAYER},
+        meta={"seed": seed},
+        overwrite=True
+    )
+
 
-    start = (0, 0, 2)
-    goal = (19, 19, 3)
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description="Plan and fly a drone mission.")
+    parser.add_argument("--map", help="map directory to fly in, instead of the built-in scenario")
+    parser.add_argument("--save-map", help="write the built-in scenario with its scenery to this map directory and exit")
+    parser.add_argument("--seed", type=int, help="scenery and weather seed for --save-map")
+    args = parser.parse_args(argv)
+
+    if args.save_map:
+        save_default_map(args.save_map, seed=args.seed)
+        print(f"💾 Map saved to {args.save_map}")
+        return
+
+    weather = None
+
+    if args.map:
+        bundle = load_map(args.map)
+        env = bundle.env
+        weather = bundle.weather
+        mission = dict(DEFAULT_MISSION, **(bundle.mission or {}))
+        print(f"🗺 Loaded {bundle}")
+    else:
+        env = GridMap(20, 20, 10)
+        load_constraint_layer(env, NO_FLY_LAYER)
+        mission = DEFAULT_MISSION
+
+    start = mission["start"]
+    goal = mission["goal"]
 
     # USER INPUT 
     try:
@@ -28,8 +91,8 @@ def main():
 
     except ValueError:
         print("❌ Invalid input! Using default values.")
-        payload_weight = 3.0
-        battery_capacity = 300
+        payload_weight = mission["payload_weight"]
+        battery_capacity = mission["battery_capacity"]
 
     print("\n--- Mission Parameters ---")
     print(f"📦 Payload: {payload_weight} kg")
@@ -43,8 +106,9 @@ def main():
         print("❌ Heavy payload — risk of failure")
 
     # Weather
-    weather = WeatherModel()
-    weather.generate_weather(20, 20)
+    if weather is None:
+        weather = WeatherModel()
+        weather.generate_weather(env.x_size, env.y_size, env.z_size)
 
     # Battery Model 
     battery_model = BatteryModel()
@@ -67,7 +131,12 @@ def main():
 
     preflight = PreflightChecker(
         validator,
-        max_route_length=500
+        max_route_length=500,
+        battery_model=battery_model,
+        battery_capacity=battery_capacity,
+        payload_weight=payload_weight,
+        weather=weather,
+        reserve_margin=0.1
     )
 
     result = preflight.check(route)
@@ -89,7 +158,8 @@ def main():
         battery_model=battery_model,
         payload_weight=payload_weight,
         battery_capacity=battery_capacity,
-        weather=weather
+        weather=weather,
+        generate_scenery=not args.map
     )
 
     sim.run()
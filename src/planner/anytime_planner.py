@@ -0,0 +1,295 @@
+"""
+Anytime, deadline-bounded planning with ARA*.
+
+A first weighted-A* search with an inflated heuristic returns a
+feasible route quickly. While the time or expansion budget lasts, the
+weight is lowered and the search resumes from its previous state
+(only inconsistent vertices are re-expanded), tightening the route
+toward the optimum. Every result reports the suboptimality bound it
+reached, so replan latency is predictable and its cost is known.
+"""
+
+from typing import List, Optional, Tuple
+import heapq
+import math
+import time
+
+import numpy as np
+
+from src.environment.grid import Position
+from src.planner.array_planner import ArrayGridPlanner
+from src.planner.stats import PlanStats
+from src.planner.voxel_graph import VoxelGraph
+
+
+class AnytimeResult:
+    # Best route found within the budget and how close to optimal it is
+    def __init__(
+        self,
+        route: Optional[List[Position]],
+        cost: float,
+        bound: float,
+        expansions: int,
+        iterations: int,
+        elapsed: float,
+    ):
+        self.route = route
+        self.cost = cost
+
+        # cost <= bound * optimal cost; 1.0 means proven optimal
+        self.bound = bound
+
+        self.expansions = expansions
+        self.iterations = iterations
+        self.elapsed = elapsed
+
+    def optimal(self) -> bool:
+        return self.route is not None and self.bound <= 1.0
+
+    def __repr__(self) -> str:
+        if self.route is None:
+            return f"AnytimeResult(route=None, expansions={self.expansions})"
+        return (
+            "AnytimeResult("
+            f"length={len(self.route)}, cost={self.cost:.2f}, bound={self.bound:.3f}, "
+            f"iterations={self.iterations}, expansions={self.expansions})"
+        )
+
+
+class AnytimeGridPlanner(ArrayGridPlanner):
+    """
+    Drop-in GridPlanner whose plan() stops at a time or expansion budget.
+
+    `time_budget` is in seconds; either budget may be None. The first
+    solution is always completed, even past the budget, since hovering
+    without a route is worse than a late one; with the default weight
+    it costs a small fraction of a full optimal search. Routes whose
+    energy exceeds battery_capacity are rejected.
+    """
+
+    # Expansions between two clock reads
+    CLOCK_INTERVAL = 64
+
+    def __init__(
+        self,
+        env,
+        weather=None,
+        battery_model=None,
+        payload_weight=0,
+        battery_capacity=100,
+        time_budget: Optional[float] = None,
+        expansion_budget: Optional[int] = None,
+        initial_weight: float = 3.0,
+        weight_step: float = 0.5,
+    ):
+        super().__init__(
+            env,
+            weather,
+            battery_model=battery_model,
+            payload_weight=payload_weight,
+            battery_capacity=battery_capacity
+        )
+        self.time_budget = time_budget
+        self.expansion_budget = expansion_budget
+        self.initial_weight = initial_weight
+        self.weight_step = weight_step
+
+        # Outcome of the most recent plan() call
+        self.last_result: Optional[AnytimeResult] = None
+
+    def _astar(self, start: Position, goal: Position, stats: Optional[PlanStats]) -> Optional[List[Position]]:
+        self.last_result = self.plan_anytime(start, goal)
+
+        if stats is not None:
+            stats.expansions = self.last_result.expansions
+
+        return self.last_result.route
+
+    def plan_anytime(
+        self,
+        start: Position,
+        goal: Position,
+        time_budget: Optional[float] = None,
+        expansion_budget: Optional[int] = None,
+    ) -> AnytimeResult:
+        # Budgets passed here override the planner's defaults for this call
+        started = time.perf_counter()
+
+        if time_budget is None:
+            time_budget = self.time_budget
+        if expansion_budget is None:
+            expansion_budget = self.expansion_budget
+
+        if not self.env.is_traversable(start) or not self.env.is_traversable(goal):
+            return AnytimeResult(None, math.inf, math.inf, 0, 0, time.perf_counter() - started)
+
+        deadline = None if time_budget is None else started + time_budget
+
+        graph = VoxelGraph.for_env(self.env)
+        free = graph.free_cells(self.env)
+
+        return self._ara_star(graph, free, start, goal, deadline, expansion_budget, started)
+
+    # ------------------- ARA* -------------------
+
+    def _distance_array(self, graph: VoxelGraph, goal: Position) -> List[float]:
+        # Scaled Euclidean lower bound: consistent, so the bound holds
+        x_size, y_size, z_size = graph.shape
+
+        dx = (np.arange(x_size) - goal[0])[:, None, None]
+        dy = (np.arange(y_size) - goal[1])[None, :, None]
+        dz = (np.arange(z_size) - goal[2])[None, None, :]
+
+        distance = np.sqrt((dx*dx + dy*dy + dz*dz).astype(np.float64)) * self.heuristic_scale()
+
+        return graph.pad(distance, math.inf).tolist()
+
+    def _ara_star(self, graph, free, start, goal, deadline, expansion_budget, started) -> AnytimeResult:
+
+        weather_mul, weather_add = self._weather_arrays(graph)
+        heuristic = self._distance_array(graph, goal)
+
+        moves = list(zip(graph.flat_offsets, self.step_table()))
+        capacity = self.battery_capacity
+
+        start_idx = graph.index(start)
+        goal_idx = graph.index(goal)
+
+        g = [math.inf] * graph.size
+        parent = [-1] * graph.size
+        closed = bytearray(graph.size)
+
+        g[start_idx] = 0.0
+
+        weight = max(self.initial_weight, 1.0)
+        open_set: List[Tuple[float, int]] = [(weight * heuristic[start_idx], start_idx)]
+        incons: List[int] = []
+
+        best_route = None
+        best_cost = math.inf
+        bound = math.inf
+
+        expansions = 0
+        iterations = 0
+
+        heappush = heapq.heappush
+        heappop = heapq.heappop
+
+        while True:
+
+            iterations += 1
+            exhausted = False
+
+            # ImprovePath: weighted A* that defers re-expansions to INCONS
+            while open_set:
+
+                key, current = open_set[0]
+
+                # Stale heap entry: closed, or queued under an older g
+                if closed[current] or key != g[current] + weight * heuristic[current]:
+                    heappop(open_set)
+                    continue
+
+                if g[goal_idx] <= key:
+                    break
+
+                if best_route is not None and self._out_of_budget(expansions, deadline, expansion_budget):
+                    exhausted = True
+                    break
+
+                heappop(open_set)
+                closed[current] = 1
+                expansions += 1
+
+                g_current = g[current]
+
+                for offset, step in moves:
+
+                    neighbor = current + offset
+
+                    if not free[neighbor]:
+                        continue
+
+                    tentative_g = g_current + step * weather_mul[neighbor] + weather_add[neighbor]
+
+                    # battery constraint check
+                    if tentative_g > capacity:
+                        continue
+
+                    if tentative_g < g[neighbor]:
+
+                        g[neighbor] = tentative_g
+                        parent[neighbor] = current
+
+                        if closed[neighbor]:
+                            incons.append(neighbor)
+                        else:
+                            heappush(open_set, (tentative_g + weight * heuristic[neighbor], neighbor))
+
+            if g[goal_idx] < best_cost:
+
+                if exhausted and math.isfinite(bound):
+                    # The last proven bound scales down with the cheaper route
+                    bound = max(1.0, bound * g[goal_idx] / best_cost)
+
+                best_cost = g[goal_idx]
+                best_route = self._reconstruct_indices(graph, parent, goal_idx)
+
+            # Bound from the cheapest unexpanded f-value (OPEN and INCONS)
+            frontier = [idx for _, idx in open_set if not closed[idx]] + incons
+            lower = min((g[idx] + heuristic[idx] for idx in frontier), default=math.inf)
+
+            # An interrupted pass proves nothing new, keep the last bound
+            if exhausted:
+                break
+
+            if best_route is not None:
+                bound = min(weight, best_cost / lower) if lower > 0 else weight
+                bound = max(bound, 1.0)
+
+            if weight <= 1.0 or bound <= 1.0:
+                break
+
+            if not frontier and best_route is None:
+                break
+
+            if self._out_of_budget(expansions, deadline, expansion_budget, force=True):
+                break
+
+            # Next iteration: lower the weight and resume from OPEN + INCONS
+            weight = max(1.0, weight - self.weight_step)
+
+            open_set = [
+                (g[idx] + weight * heuristic[idx], idx)
+                for idx in set(frontier)
+            ]
+            heapq.heapify(open_set)
+
+            incons = []
+            closed = bytearray(graph.size)
+
+        if best_route is None:
+            bound = math.inf
+
+        return AnytimeResult(
+            best_route,
+            best_cost,
+            bound,
+            expansions,
+            iterations,
+            time.perf_counter() - started,
+        )
+
+    def _out_of_budget(self, expansions, deadline, expansion_budget, force=False) -> bool:
+
+        if expansion_budget is not None and expansions >= expansion_budget:
+            return True
+
+        if deadline is None:
+            return False
+
+        # Reading the clock every expansion would cost more than it saves
+        if not force and expansions % self.CLOCK_INTERVAL:
+            return False
+
+        return time.perf_counter() >= deadline
@@ -0,0 +1,223 @@
+"""
+Array-backed A* search engine.
+
+Drop-in alternative to GridPlanner that searches over flat voxel
+indices with preallocated cost / parent / closed arrays, a static
+26-move offset table and per-payload step cost tables. It returns
+the same routes as GridPlanner.plan.
+"""
+
+from typing import Dict, List, Optional, Tuple
+import heapq
+import math
+
+import numpy as np
+
+from src.environment.grid import Position
+from src.planner.planner import GridPlanner
+from src.planner.stats import PlanStats
+from src.planner.voxel_graph import NEIGHBOR_OFFSETS, VoxelGraph
+
+
+class ArrayGridPlanner(GridPlanner):
+    # Same constructor and cost model as GridPlanner, faster core
+    def __init__(self, env, weather=None, battery_model=None, payload_weight=0, battery_capacity=100):
+        super().__init__(
+            env,
+            weather,
+            battery_model=battery_model,
+            payload_weight=payload_weight,
+            battery_capacity=battery_capacity
+        )
+
+        # Base cost of each of the 26 moves, keyed by payload weight
+        self._step_tables: Dict[float, List[float]] = {}
+
+        # Flattened weather / heuristic arrays reused across plans
+        self._weather_key = None
+        self._weather_cache = None
+        self._heuristic_key = None
+        self._heuristic_cache = None
+
+    def _astar(self, start: Position, goal: Position, stats: Optional[PlanStats]) -> Optional[List[Position]]:
+
+        if not self.env.is_traversable(start) or not self.env.is_traversable(goal):
+            return None
+
+        graph = VoxelGraph.for_env(self.env)
+        free = graph.free_cells(self.env)
+
+        return self._search(graph, free, start, goal, stats)
+
+    def _search(
+        self,
+        graph: VoxelGraph,
+        free: bytes,
+        start: Position,
+        goal: Position,
+        stats: Optional[PlanStats] = None,
+    ) -> Optional[List[Position]]:
+        # A* over the cells marked in `free`, which may be a sub-region of the grid
+        weather_mul, weather_add = self._weather_arrays(graph)
+        heuristic = self._heuristic_array(graph, goal)
+
+        moves = list(zip(graph.flat_offsets, self.step_table()))
+        capacity = self.battery_capacity
+
+        start_idx = graph.index(start)
+        goal_idx = graph.index(goal)
+
+        g = [math.inf] * graph.size
+        parent = [-1] * graph.size
+        closed = bytearray(graph.size)
+
+        g[start_idx] = 0.0
+        open_set: List[Tuple[float, int]] = [(0.0, start_idx)]
+
+        heappush = heapq.heappush
+        heappop = heapq.heappop
+
+        # Instrumented runs remember every node ever expanded
+        if stats is not None:
+            expanded = bytearray(graph.size)
+            stats.heap_pushes = stats.heap_peak = 1
+
+        while open_set:
+
+            _, current = heappop(open_set)
+
+            # Stale heap entry for a node already expanded at its best cost
+            if closed[current]:
+                continue
+
+            if current == goal_idx:
+                return self._reconstruct_indices(graph, parent, current)
+
+            closed[current] = 1
+            g_current = g[current]
+
+            if stats is not None:
+                stats.expansions += 1
+                if expanded[current]:
+                    stats.reexpansions += 1
+                expanded[current] = 1
+
+            for offset, step in moves:
+
+                neighbor = current + offset
+
+                if not free[neighbor]:
+                    if stats is not None:
+                        stats.pruned_traversability += 1
+                    continue
+
+                tentative_g = g_current + step * weather_mul[neighbor] + weather_add[neighbor]
+
+                # battery constraint check
+                if tentative_g > capacity:
+                    if stats is not None:
+                        stats.pruned_battery += 1
+                    continue
+
+                if tentative_g < g[neighbor]:
+
+                    g[neighbor] = tentative_g
+                    parent[neighbor] = current
+
+                    # Inconsistent heuristic, so improved nodes are reopened
+                    closed[neighbor] = 0
+
+                    heappush(open_set, (tentative_g + heuristic[neighbor], neighbor))
+
+                    if stats is not None:
+                        stats.heap_pushes += 1
+                        stats.heap_peak = max(stats.heap_peak, len(open_set))
+
+        return None
+
+    def step_table(self) -> List[float]:
+        # Weather-free cost of each move direction for the current payload
+        table = self._step_tables.get(self.payload_weight)
+
+        if table is None:
+            origin = (0, 0, 0)
+
+            if self.battery_model:
+                table = [
+                    self.battery_model.step_cost(origin, offset, self.payload_weight)
+                    for offset in NEIGHBOR_OFFSETS
+                ]
+            else:
+                table = [
+                    self._movement_cost(origin, offset)
+                    for offset in NEIGHBOR_OFFSETS
+                ]
+
+            self._step_tables[self.payload_weight] = table
+
+        return table
+
+    def heuristic_scale(self) -> float:
+        # Cheapest cost per unit of distance over all move directions,
+        # so scaled Euclidean distance is a consistent lower bound
+        return min(
+            step / math.sqrt(dx*dx + dy*dy + dz*dz)
+            for (dx, dy, dz), step in zip(NEIGHBOR_OFFSETS, self.step_table())
+        )
+
+    def _weather_arrays(self, graph: VoxelGraph):
+        # Per-voxel step multiplier and additive penalty for entering a cell
+        if not self.weather:
+            return [1.0] * graph.size, [0.0] * graph.size
+
+        key = (id(self.weather), self.weather.version, graph.shape, self.battery_model is None)
+        if key == self._weather_key:
+            return self._weather_cache
+
+        penalty = np.asarray(self.weather.cost_field(graph.shape), dtype=np.float64)
+
+        if self.battery_model:
+            multiplier = self.battery_model.weather_factor(penalty)
+        else:
+            multiplier = np.ones(graph.shape)
+
+        self._weather_key = key
+        self._weather_cache = (
+            graph.pad(multiplier, 1.0).tolist(),
+            graph.pad(penalty, 0.0).tolist(),
+        )
+        return self._weather_cache
+
+    def _heuristic_array(self, graph: VoxelGraph, goal: Position) -> List[float]:
+        # Vectorized GridPlanner._heuristic for every voxel at once
+        key = (tuple(goal), self.payload_weight, graph.shape)
+        if key == self._heuristic_key:
+            return self._heuristic_cache
+
+        x_size, y_size, z_size = graph.shape
+
+        dx = np.abs(np.arange(x_size) - goal[0])[:, None, None]
+        dy = np.abs(np.arange(y_size) - goal[1])[None, :, None]
+        dz = np.abs(np.arange(z_size) - goal[2])[None, None, :]
+
+        distance = np.sqrt((dx*dx + dy*dy + dz*dz).astype(np.float64))
+
+        payload_factor = 1 + (self.payload_weight * 0.4)
+        altitude_factor = np.where(dz > 0, 2.5, 1.0)
+
+        heuristic = distance * payload_factor * altitude_factor
+
+        self._heuristic_key = key
+        self._heuristic_cache = graph.pad(heuristic, math.inf).tolist()
+        return self._heuristic_cache
+
+    def _reconstruct_indices(self, graph: VoxelGraph, parent, current) -> List[Position]:
+
+        path = [current]
+
+        while parent[current] != -1:
+            current = parent[current]
+            path.append(current)
+
+        path.reverse()
+        return graph.positions(path)
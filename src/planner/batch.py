@@ -0,0 +1,203 @@
+"""
+Batch planning for fleet dispatch.
+
+Plans many (start, goal, payload, capacity) requests against one
+shared environment, spread over a process or thread pool. Every
+worker gets its own copy of the caller's planner, with all of its
+settings, once and reuses it for all of its requests, so the
+environment and weather are only shipped once per worker.
+"""
+
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from enum import Enum
+from typing import List, Optional, Sequence
+import copy
+import numbers
+import os
+import threading
+
+from src.environment.grid import Position
+
+
+class PlanStatus(Enum):
+    # Outcome of a single request in a batch
+    OK = "ok"
+    NO_ROUTE = "no_route"
+    INVALID_REQUEST = "invalid_request"
+    ERROR = "error"
+
+
+class PlanResult:
+    # Holds the outcome of one batch request
+    def __init__(
+        self,
+        status: PlanStatus,
+        route: Optional[List[Position]] = None,
+        details: Optional[str] = None,
+    ):
+        self.status = status
+        self.route = route
+        self.details = details
+
+    def ok(self) -> bool:
+        # Convenience helper for success checks
+        return self.status == PlanStatus.OK
+
+    def __repr__(self) -> str:
+        # Readable output for logs and debugging
+        if self.status == PlanStatus.OK:
+            return f"PlanResult(status=OK, length={len(self.route)})"
+        return f"PlanResult(status={self.status}, details={self.details})"
+
+
+EXECUTORS = ("process", "thread", "serial")
+
+
+# Planner owned by the current worker process
+_worker_planner = None
+
+# Planner owned by the current worker thread
+_thread_state = threading.local()
+
+
+def plan_many(
+    planner,
+    requests: Sequence[tuple],
+    executor: str = "process",
+    max_workers: Optional[int] = None,
+    chunksize: Optional[int] = None,
+) -> List[PlanResult]:
+    """
+    Plan every request and return one PlanResult per request, in order.
+
+    Each request is (start, goal[, payload_weight[, battery_capacity]]);
+    missing values fall back to the template planner's settings.
+    `executor` is "process", "thread" or "serial". Threads only scale
+    for planner cores that release the GIL; the default Python search
+    needs processes.
+    """
+
+    if executor not in EXECUTORS:
+        raise ValueError(f"Unknown executor {executor!r}, expected one of {EXECUTORS}")
+
+    jobs = [normalize_request(planner, request) for request in requests]
+
+    if not jobs:
+        return []
+
+    if max_workers is None:
+        max_workers = os.cpu_count() or 1
+
+    max_workers = max(1, min(max_workers, len(jobs)))
+
+    if chunksize is None:
+        # A few chunks per worker keeps the pool busy without much IPC
+        chunksize = max(1, len(jobs) // (max_workers * 4))
+
+    if executor == "serial" or max_workers == 1:
+        # The caller's planner itself, with its mission settings put back after
+        settings = planner.payload_weight, planner.battery_capacity
+        try:
+            return [_run_job(planner, job) for job in jobs]
+        finally:
+            planner.payload_weight, planner.battery_capacity = settings
+
+    if executor == "thread":
+        with ThreadPoolExecutor(max_workers=max_workers) as pool:
+            return list(pool.map(lambda job: _thread_job(planner, job), jobs))
+
+    with ProcessPoolExecutor(
+        max_workers=max_workers,
+        initializer=_init_worker,
+        initargs=(planner,),
+    ) as pool:
+        return list(pool.map(_process_job, jobs, chunksize=chunksize))
+
+
+def normalize_request(planner, request):
+    # (start, goal, payload_weight, battery_capacity), None for a malformed request
+    try:
+        start, goal, *rest = request
+
+        if len(rest) > 2:
+            return None
+
+        start = _position(start)
+        goal = _position(goal)
+
+    except (TypeError, ValueError):
+        return None
+
+    payload_weight = rest[0] if len(rest) > 0 else planner.payload_weight
+    battery_capacity = rest[1] if len(rest) > 1 else planner.battery_capacity
+
+    for value in (payload_weight, battery_capacity):
+        if isinstance(value, bool) or not isinstance(value, numbers.Real):
+            return None
+
+    return start, goal, payload_weight, battery_capacity
+
+
+def _position(value) -> Position:
+    # Three integer coordinates, raises TypeError / ValueError otherwise
+    position = tuple(value)
+
+    if len(position) != 3 or not all(
+        isinstance(c, numbers.Integral) and not isinstance(c, bool) for c in position
+    ):
+        raise ValueError(f"Expected (x, y, z) integers, got {value!r}")
+
+    return tuple(int(c) for c in position)
+
+
+def _run_job(planner, job) -> PlanResult:
+
+    if job is None:
+        return PlanResult(
+            status=PlanStatus.INVALID_REQUEST,
+            details="Expected (start, goal[, payload_weight[, battery_capacity]])",
+        )
+
+    start, goal, payload_weight, battery_capacity = job
+
+    planner.payload_weight = payload_weight
+    planner.battery_capacity = battery_capacity
+
+    try:
+        route = planner.plan(start, goal)
+    except Exception as exc:
+        return PlanResult(status=PlanStatus.ERROR, details=repr(exc))
+
+    if route is None:
+        return PlanResult(
+            status=PlanStatus.NO_ROUTE,
+            details=f"No route from {start} to {goal}",
+        )
+
+    return PlanResult(status=PlanStatus.OK, route=route)
+
+
+def _init_worker(planner):
+    # The pickled template planner, settings and warm caches included
+    global _worker_planner
+    _worker_planner = planner
+
+
+def _process_job(job) -> PlanResult:
+    return _run_job(_worker_planner, job)
+
+
+def _thread_job(template, job) -> PlanResult:
+
+    if getattr(_thread_state, "template", None) is not template:
+        _thread_state.template = template
+        _thread_state.planner = _thread_copy(template)
+
+    return _run_job(_thread_state.planner, job)
+
+
+def _thread_copy(planner):
+    # Own copy of the planner's settings and search state, sharing the
+    # environment, weather and battery model with the other threads
+    shared = (planner.env, planner.weather, planner.battery_model)
+    return copy.deepcopy(planner, {id(obj): obj for obj in shared if obj is not None})
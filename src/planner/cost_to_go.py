@@ -0,0 +1,216 @@
+"""
+Reverse cost-to-go fields for repeated planning toward the same goal.
+
+A reverse Dijkstra from the goal gives the optimal remaining energy
+for every voxel. Any start, or the drone's current position during a
+replan, then gets its route by greedy descent over the field in
+O(path length). Fields are kept in an LRU cache keyed by goal, payload
+and environment version.
+"""
+
+from collections import OrderedDict
+from typing import Hashable, List, Optional
+import heapq
+import math
+
+import numpy as np
+
+from src.environment.grid import Position
+from src.planner.array_planner import ArrayGridPlanner
+from src.planner.stats import PlanStats
+from src.planner.voxel_graph import VoxelGraph
+
+
+class CostToGoField:
+    # Optimal remaining energy from every voxel to one goal
+    def __init__(self, graph: VoxelGraph, goal: Position, costs: np.ndarray):
+        self.graph = graph
+        self.goal = goal
+        self.costs = costs
+
+    def cost(self, pos: Position) -> float:
+        # math.inf when the goal cannot be reached from pos
+        return float(self.costs[self.graph.index(pos)])
+
+    def reachable(self, pos: Position) -> bool:
+        return math.isfinite(self.cost(pos))
+
+
+class CostToGoCache:
+    # Size-bounded LRU store of cost-to-go fields
+    def __init__(self, maxsize: int = 8):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._fields: "OrderedDict[Hashable, CostToGoField]" = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[CostToGoField]:
+
+        field = self._fields.get(key)
+
+        if field is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._fields.move_to_end(key)
+        return field
+
+    def put(self, key: Hashable, field: CostToGoField):
+
+        self._fields[key] = field
+        self._fields.move_to_end(key)
+
+        while len(self._fields) > self.maxsize:
+            self._fields.popitem(last=False)
+
+    def clear(self):
+        self._fields.clear()
+
+    def __len__(self) -> int:
+        return len(self._fields)
+
+
+class CostToGoPlanner(ArrayGridPlanner):
+    """
+    Drop-in GridPlanner that plans by descending cached cost-to-go fields.
+
+    The first plan toward a goal runs one reverse Dijkstra. Later plans
+    toward the same goal, from any start, only walk the field. Routes are
+    optimal and are rejected when their energy exceeds battery_capacity.
+    """
+
+    def __init__(self, env, weather=None, battery_model=None, payload_weight=0, battery_capacity=100, cache=None):
+        super().__init__(
+            env,
+            weather,
+            battery_model=battery_model,
+            payload_weight=payload_weight,
+            battery_capacity=battery_capacity
+        )
+        self.cache = cache if cache is not None else CostToGoCache()
+
+    def _astar(self, start: Position, goal: Position, stats: Optional[PlanStats]) -> Optional[List[Position]]:
+
+        if not self.env.is_traversable(start) or not self.env.is_traversable(goal):
+            return None
+
+        field = self.cost_to_go(goal)
+
+        # battery constraint check
+        if field.cost(start) > self.battery_capacity:
+            return None
+
+        return self._descend(field, start)
+
+    def cost_to_go(self, goal: Position) -> CostToGoField:
+        # Cached field for the current payload, grid and weather
+        graph = VoxelGraph.for_env(self.env)
+
+        # Sizes the weather field to this grid before its version is read
+        self._weather_arrays(graph)
+
+        key = (tuple(goal), self.payload_weight, self._environment_version(graph))
+
+        field = self.cache.get(key)
+
+        if field is None:
+            free = graph.free_cells(self.env)
+            field = self._reverse_dijkstra(graph, free, tuple(goal))
+            self.cache.put(key, field)
+
+        return field
+
+    def _environment_version(self, graph: VoxelGraph) -> Hashable:
+
+        weather_version = None
+        if self.weather:
+            weather_version = (id(self.weather), self.weather.version)
+
+        return (graph.shape, id(self.env), self.env.version, weather_version)
+
+    def _reverse_dijkstra(self, graph: VoxelGraph, free: bytes, goal: Position) -> CostToGoField:
+
+        weather_mul, weather_add = self._weather_arrays(graph)
+        moves = list(zip(graph.flat_offsets, self.step_table()))
+
+        goal_idx = graph.index(goal)
+
+        dist = [math.inf] * graph.size
+        dist[goal_idx] = 0.0
+
+        open_set = [(0.0, goal_idx)]
+
+        heappush = heapq.heappush
+        heappop = heapq.heappop
+
+        while open_set:
+
+            d, current = heappop(open_set)
+
+            if d > dist[current]:
+                continue
+
+            # Entering `current` costs the same from every predecessor
+            # except for the direction-dependent base step
+            entry_mul = weather_mul[current]
+            entry_add = weather_add[current]
+
+            for offset, step in moves:
+
+                predecessor = current - offset
+
+                if not free[predecessor]:
+                    continue
+
+                candidate = d + (step * entry_mul + entry_add)
+
+                if candidate < dist[predecessor]:
+                    dist[predecessor] = candidate
+                    heappush(open_set, (candidate, predecessor))
+
+        return CostToGoField(graph, goal, np.array(dist, dtype=np.float64))
+
+    def _descend(self, field: CostToGoField, start: Position) -> Optional[List[Position]]:
+
+        graph = field.graph
+        costs = field.costs
+
+        weather_mul, weather_add = self._weather_arrays(graph)
+        moves = list(zip(graph.flat_offsets, self.step_table()))
+
+        current = graph.index(start)
+        goal_idx = graph.index(field.goal)
+
+        if not math.isfinite(costs[current]):
+            return None
+
+        path = [current]
+
+        # Each step strictly lowers the remaining cost, so this terminates
+        while current != goal_idx:
+
+            best = -1
+            best_cost = math.inf
+
+            for offset, step in moves:
+
+                successor = current + offset
+                remaining = costs[successor]
+
+                if remaining == math.inf:
+                    continue
+
+                total = step * weather_mul[successor] + weather_add[successor] + remaining
+
+                if total < best_cost:
+                    best = successor
+                    best_cost = total
+
+            if best == -1:
+                return None
+
+            current = best
+            path.append(current)
+
+        return graph.positions(path)
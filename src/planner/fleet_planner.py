@@ -0,0 +1,203 @@
+"""
+Cooperative multi-drone planning over shared airspace.
+
+FleetPlanner plans drones one at a time in priority order with
+SpaceTimeGridPlanner, each against a ReservationTable holding the
+(cell, tick) claims of every drone planned before it, and reserves
+its route in turn (cooperative A*). Drones may hover to let others
+pass, and a drone that arrived keeps its goal cell.
+
+With `repair=True`, every drone that found no route gets a
+conflict-based repair: it is planned as if alone, the drones whose
+reservations that route runs into are released, the route is
+reserved, and the released drones are planned again around it. The
+repair is kept only if all of them still get a route.
+"""
+
+from typing import Dict, Hashable, List, Optional, Sequence
+
+from src.planner import batch
+from src.planner.reservations import ReservationTable, TimedPosition
+from src.planner.space_time_planner import SpaceTimeGridPlanner
+
+
+class FleetPlan:
+    # Timed routes of every drone, in request order (None: no route)
+    def __init__(self, routes: List[Optional[List[TimedPosition]]], order: List[int], repairs: int, table: ReservationTable):
+        self.routes = routes
+
+        # Request indices in the priority order they were planned
+        self.order = order
+
+        # Repairs that were kept
+        self.repairs = repairs
+
+        self.table = table
+
+    def ok(self) -> bool:
+        return all(route is not None for route in self.routes)
+
+    @property
+    def planned(self) -> int:
+        return sum(route is not None for route in self.routes)
+
+    @property
+    def makespan(self) -> int:
+        # Tick at which the last drone arrives
+        return max((route[-1][1] for route in self.routes if route), default=0)
+
+    def positions(self, drone: int) -> Optional[list]:
+        route = self.routes[drone]
+        return None if route is None else [pos for pos, _ in route]
+
+    def __repr__(self) -> str:
+        return (
+            "FleetPlan("
+            f"planned={self.planned}/{len(self.routes)}, "
+            f"makespan={self.makespan}, repairs={self.repairs})"
+        )
+
+
+class FleetPlanner:
+    """
+    Prioritized cooperative A* for many drones on one GridMap.
+
+    Requests are (start, goal[, payload_weight[, battery_capacity]])
+    like plan_many(); every drone departs at `start_time`. Drones are
+    planned in request order unless `priorities` (higher first) is
+    given. Drone ids in the reservation table are request indices.
+    Malformed requests get no route instead of stopping the fleet.
+    """
+
+    def __init__(
+        self,
+        env,
+        weather=None,
+        battery_model=None,
+        payload_weight=0,
+        battery_capacity=100,
+        wait_cost: float = 1.0,
+        horizon: Optional[int] = None,
+        repair: bool = False,
+        max_repairs: int = 16,
+    ):
+        self.env = env
+
+        self.planner = SpaceTimeGridPlanner(
+            env,
+            weather,
+            battery_model=battery_model,
+            payload_weight=payload_weight,
+            battery_capacity=battery_capacity,
+            horizon=horizon,
+            wait_cost=wait_cost,
+        )
+
+        self.repair = repair
+        self.max_repairs = max_repairs
+
+    def plan_fleet(
+        self,
+        requests: Sequence[tuple],
+        priorities: Optional[Sequence[float]] = None,
+        start_time: int = 0,
+        table: Optional[ReservationTable] = None,
+    ) -> FleetPlan:
+        # `table` may already hold drones that are in the air
+
+        jobs = [batch.normalize_request(self.planner, request) for request in requests]
+
+        order = list(range(len(jobs)))
+        if priorities is not None:
+            order.sort(key=lambda i: -priorities[i])
+
+        if table is None:
+            table = ReservationTable(self.env.shape)
+
+        routes: List[Optional[List[TimedPosition]]] = [None] * len(jobs)
+
+        for drone in order:
+            routes[drone] = self._plan_drone(table, jobs[drone], drone, start_time)
+
+        repairs = 0
+
+        if self.repair:
+            for drone in order:
+
+                if repairs >= self.max_repairs:
+                    break
+
+                if routes[drone] is None and jobs[drone] is not None:
+                    repairs += self._repair(table, jobs, routes, order, drone, start_time)
+
+        return FleetPlan(routes, order, repairs, table)
+
+    def _plan_drone(self, table: Optional[ReservationTable], job, drone: Hashable, start_time: int, reserve: bool = True) -> Optional[List[TimedPosition]]:
+        # Plans one drone against `table` (None: alone) and reserves its route
+        if job is None:
+            return None
+
+        start, goal, payload_weight, battery_capacity = job
+
+        planner = self.planner
+        planner.payload_weight = payload_weight
+        planner.battery_capacity = battery_capacity
+        planner.reservations = table
+        planner.agent = drone
+
+        route = planner.plan_timed(start, goal, start_time=start_time)
+
+        if route is not None and reserve:
+            table.reserve(drone, route)
+
+        return route
+
+    def _repair(self, table: ReservationTable, jobs, routes, order: List[int], drone: int, start_time: int) -> int:
+        # Clears the way for `drone` through the drones blocking it; 1 if kept
+        alone = self._plan_drone(None, jobs[drone], drone, start_time, reserve=False)
+
+        if alone is None:
+            return 0
+
+        blockers = {conflict.other for conflict in table.conflicts(drone, alone)}
+
+        # Drones of a table passed in are not this fleet's to release or replan
+        if not blockers or any(other not in range(len(jobs)) for other in blockers):
+            return 0
+
+        previous: Dict[int, List[TimedPosition]] = {other: routes[other] for other in blockers}
+
+        for other in blockers:
+            table.release(other)
+            routes[other] = None
+
+        table.reserve(drone, alone)
+        routes[drone] = alone
+
+        replanned = []
+
+        for other in order:
+
+            if other not in blockers:
+                continue
+
+            routes[other] = self._plan_drone(table, jobs[other], other, start_time)
+
+            if routes[other] is None:
+                break
+
+            replanned.append(other)
+
+        if len(replanned) == len(blockers):
+            return 1
+
+        # Some blocker lost its route: put everything back
+        table.release(drone)
+        routes[drone] = None
+
+        for other in blockers:
+            table.release(other)
+            table.reserve(other, previous[other])
+            routes[other] = previous[other]
+
+        return 0
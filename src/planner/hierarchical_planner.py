@@ -0,0 +1,701 @@
+"""
+Hierarchical path planning (HPA*-style) for large grids.
+
+The grid is split into cubic clusters. Entrances are the free cell
+pairs across each shared cluster face, and intra-cluster costs
+between entrances come from Dijkstra runs restricted to one cluster.
+A* runs on this small abstract graph and the chosen corridor of
+clusters is then refined with the array search, on a graph that only
+covers the corridor's bounding box.
+
+Free cells, weather, entrances and intra-cluster costs are built
+lazily per cluster the first time a search touches it and are cached;
+no full-grid copy is kept. When cells change, only the clusters
+containing them and their face neighbors are recomputed.
+"""
+
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import heapq
+import itertools
+import math
+
+import numpy as np
+
+from src.environment.grid import GridMap, Position
+from src.planner.array_planner import ArrayGridPlanner
+from src.planner.stats import PlanStats
+from src.planner.voxel_graph import NEIGHBOR_OFFSETS, VoxelGraph
+
+
+Cluster = Tuple[int, int, int]
+
+# Unit steps to the +x / +y / +z face neighbor of a cluster
+AXES: Tuple[Cluster, ...] = ((1, 0, 0), (0, 1, 0), (0, 0, 1))
+
+
+class HierarchicalGridPlanner(ArrayGridPlanner):
+    """
+    Drop-in GridPlanner for city-scale grids.
+
+    Routes are refined inside the abstract corridor, so they can be
+    slightly longer than a flat search. When the abstract graph has no
+    route (e.g. a gap only reachable through a cluster corner) or the
+    corridor route breaks the battery limit, it falls back to a flat
+    search over the whole grid.
+    """
+
+    def __init__(self, env, weather=None, battery_model=None, payload_weight=0, battery_capacity=100, cluster_size=8, corridor_margin=1):
+        super().__init__(
+            env,
+            weather,
+            battery_model=battery_model,
+            payload_weight=payload_weight,
+            battery_capacity=battery_capacity
+        )
+        self.cluster_size = cluster_size
+
+        # Clusters around the abstract route that refinement may also use,
+        # so diagonal shortcuts between clusters are not lost
+        self.corridor_margin = corridor_margin
+
+        self.reset()
+
+    def reset(self):
+        # Drop the abstract graph, it is rebuilt lazily on the next plan
+        self._state_key = None
+        self._graph: Optional[VoxelGraph] = None
+        self._env_version = None
+
+        # cluster -> traversable mask of its cells
+        self._cells: Dict[Cluster, np.ndarray] = {}
+
+        # cluster -> (step multiplier, penalty) of its cells, with weather
+        self._weather_blocks: Dict[Cluster, Tuple[np.ndarray, np.ndarray]] = {}
+
+        # (cluster, axis) -> [(a, b)] entrance pairs on the cluster's + face
+        self._faces: Dict[Tuple[Cluster, int], List[Tuple[int, int]]] = {}
+
+        # cluster -> {node: [partner across a face]}
+        self._links: Dict[Cluster, Dict[int, List[int]]] = {}
+
+        # cluster -> {node: [(other, cost)]} between its entrance nodes
+        self._intra: Dict[Cluster, Dict[int, List[Tuple[int, float]]]] = {}
+
+    # ------------------- PUBLIC API -------------------
+
+    def _astar(self, start: Position, goal: Position, stats: Optional[PlanStats]) -> Optional[List[Position]]:
+
+        if not self.env.is_traversable(start) or not self.env.is_traversable(goal):
+            return None
+
+        self._sync()
+
+        graph = self._graph
+
+        corridor = self._abstract_corridor(graph.index(start), graph.index(goal))
+
+        if corridor is not None:
+            route = self._refine(corridor, start, goal, stats)
+
+            if route is not None:
+                return route
+
+        # Abstract graph misses corner-only gaps, and the corridor may
+        # exclude a cheaper route that fits the battery
+        route = self._search(graph, graph.free_cells(self.env), start, goal, stats)
+
+        # The flat search's full-grid arrays are not kept between plans
+        self._weather_key = self._weather_cache = None
+        self._heuristic_key = self._heuristic_cache = None
+
+        return route
+
+    def build(self):
+        # Eagerly precompute entrances and intra-cluster costs everywhere
+        self._sync()
+
+        for cluster in self._all_clusters():
+            self._intra_edges(cluster)
+
+    # ------------------- STATE -------------------
+
+    def _sync(self):
+
+        graph = VoxelGraph.for_env(self.env)
+
+        weather_version = None
+        if self.weather:
+            # Sizes the weather field to this grid before its version is read
+            self.weather.set_extent(*graph.shape)
+            weather_version = (id(self.weather), self.weather.version)
+
+        state_key = (graph.shape, self.payload_weight, self.cluster_size, weather_version)
+
+        if state_key != self._state_key:
+            self.reset()
+            self._state_key = state_key
+            self._graph = graph
+
+        elif self._env_version != self.env.version:
+            boxes = self.env.changes_since(self._env_version)
+
+            if boxes is None:
+                # Change log truncated: any cluster may have changed
+                self._invalidate(set(self._all_clusters()))
+
+            else:
+                self._invalidate(self._clusters_in(boxes))
+
+        self._env_version = self.env.version
+        self._moves = list(zip(graph.flat_offsets, self.step_table()))
+
+    def _clusters_in(self, boxes) -> Set[Cluster]:
+        # Clusters overlapping any of the inclusive dirty boxes
+        size = self.cluster_size
+        dirty: Set[Cluster] = set()
+
+        for lo, hi in boxes:
+            ranges = [range(l // size, h // size + 1) for l, h in zip(lo, hi)]
+            dirty.update(itertools.product(*ranges))
+
+        return dirty
+
+    def _invalidate(self, dirty: Set[Cluster]):
+
+        for cluster in dirty:
+
+            self._cells.pop(cluster, None)
+
+            # Every face of a dirty cluster may have new entrances
+            for axis, step in enumerate(AXES):
+                lower = tuple(c - s for c, s in zip(cluster, step))
+                self._faces.pop((cluster, axis), None)
+                self._faces.pop((lower, axis), None)
+
+            # Neighbors share those faces, so their entrance sets change too
+            for stale in [cluster] + self._face_neighbors(cluster):
+                self._links.pop(stale, None)
+                self._intra.pop(stale, None)
+
+    # ------------------- CLUSTERS -------------------
+
+    def _cluster_counts(self) -> Tuple[int, int, int]:
+        size = self.cluster_size
+        return tuple(-(-extent // size) for extent in self._graph.shape)
+
+    def _all_clusters(self) -> Iterable[Cluster]:
+        nx, ny, nz = self._cluster_counts()
+        return ((x, y, z) for x in range(nx) for y in range(ny) for z in range(nz))
+
+    def _cluster_of(self, idx: int) -> Cluster:
+        x, y, z = self._graph.position(idx)
+        size = self.cluster_size
+        return (x // size, y // size, z // size)
+
+    def _cluster_bounds(self, cluster: Cluster) -> List[Tuple[int, int]]:
+        size = self.cluster_size
+        return [
+            (c * size, min((c + 1) * size, extent))
+            for c, extent in zip(cluster, self._graph.shape)
+        ]
+
+    def _cluster_cells(self, cluster: Cluster) -> np.ndarray:
+        # Traversable mask of the cluster, read from the grid once per change
+        cells = self._cells.get(cluster)
+
+        if cells is None:
+            bounds = self._cluster_bounds(cluster)
+            region = self.env.read_region(tuple(lo for lo, _ in bounds), tuple(hi - 1 for _, hi in bounds))
+            cells = self._cells[cluster] = region == GridMap.FREE
+
+        return cells
+
+    def _cluster_weather(self, cluster: Cluster):
+        # (step multiplier, penalty) of entering each cell of the cluster
+        if not self.weather:
+            return 1.0, 0.0
+
+        arrays = self._weather_blocks.get(cluster)
+
+        if arrays is None:
+            region = tuple(slice(lo, hi) for lo, hi in self._cluster_bounds(cluster))
+            penalty = np.asarray(self.weather.cost_field(self._graph.shape)[region], dtype=np.float64)
+
+            multiplier = np.ones(penalty.shape)
+            if self.battery_model:
+                multiplier = self.battery_model.weather_factor(penalty)
+
+            arrays = self._weather_blocks[cluster] = (multiplier, penalty)
+
+        return arrays
+
+    def _face_neighbors(self, cluster: Cluster) -> List[Cluster]:
+
+        counts = self._cluster_counts()
+        neighbors = []
+
+        for step in AXES:
+            for sign in (-1, 1):
+                neighbor = tuple(c + sign * s for c, s in zip(cluster, step))
+                if all(0 <= c < n for c, n in zip(neighbor, counts)):
+                    neighbors.append(neighbor)
+
+        return neighbors
+
+    # ------------------- ENTRANCES -------------------
+
+    def _face(self, cluster: Cluster, axis: int) -> List[Tuple[int, int]]:
+        # Entrance pairs (a inside cluster, b in the + neighbor) on one face
+        key = (cluster, axis)
+
+        if key in self._faces:
+            return self._faces[key]
+
+        counts = self._cluster_counts()
+        if cluster[axis] + 1 >= counts[axis]:
+            self._faces[key] = []
+            return []
+
+        bounds = self._cluster_bounds(cluster)
+        boundary = bounds[axis][1]
+
+        graph = self._graph
+        upper = tuple(c + s for c, s in zip(cluster, AXES[axis]))
+
+        # Last layer of this cluster against the first of the next
+        open_face = self._cluster_cells(cluster).take(-1, axis=axis) & self._cluster_cells(upper).take(0, axis=axis)
+
+        pairs = []
+        stride = (graph.stride_x, graph.stride_y, 1)[axis]
+
+        for component in _components(open_face):
+
+            # Middle cell of the opening represents the whole entrance
+            u, v = component[len(component) // 2]
+
+            coords = []
+            plane = iter((u, v))
+            for dim, (lo, _) in enumerate(bounds):
+                if dim == axis:
+                    coords.append(boundary - 1)
+                else:
+                    coords.append(lo + next(plane))
+
+            a = graph.index(tuple(coords))
+            pairs.append((a, a + stride))
+
+        self._faces[key] = pairs
+        return pairs
+
+    def _cluster_links(self, cluster: Cluster) -> Dict[int, List[int]]:
+        # Entrance nodes of a cluster mapped to their partners across faces
+        links = self._links.get(cluster)
+
+        if links is not None:
+            return links
+
+        links = {}
+
+        for axis, step in enumerate(AXES):
+
+            for a, b in self._face(cluster, axis):
+                links.setdefault(a, []).append(b)
+
+            lower = tuple(c - s for c, s in zip(cluster, step))
+            if lower[axis] >= 0:
+                for a, b in self._face(lower, axis):
+                    links.setdefault(b, []).append(a)
+
+        self._links[cluster] = links
+        return links
+
+    def _intra_edges(self, cluster: Cluster) -> Dict[int, List[Tuple[int, float]]]:
+
+        edges = self._intra.get(cluster)
+
+        if edges is not None:
+            return edges
+
+        nodes = list(self._cluster_links(cluster))
+
+        edges = {}
+        if nodes:
+            costs = self._cluster_costs(cluster, nodes, nodes)
+            for node, dist in zip(nodes, costs):
+                edges[node] = [
+                    (other, cost)
+                    for other, cost in dist.items()
+                    if other != node
+                ]
+
+        self._intra[cluster] = edges
+        return edges
+
+    # ------------------- ABSTRACT SEARCH -------------------
+
+    def _edge_cost(self, source: int, target: int) -> float:
+
+        delta = target - source
+
+        cluster = self._cluster_of(target)
+        multiplier, penalty = self._cluster_weather(cluster)
+
+        if self.weather:
+            local = tuple(c - lo for c, (lo, _) in zip(self._graph.position(target), self._cluster_bounds(cluster)))
+            multiplier, penalty = multiplier[local], penalty[local]
+
+        for offset, step in self._moves:
+            if offset == delta:
+                return float(step * multiplier + penalty)
+
+        raise ValueError("Vertices are not adjacent")
+
+    def _cluster_costs(
+        self,
+        cluster: Cluster,
+        sources: List[int],
+        targets: Iterable[int],
+        reverse: bool = False,
+    ) -> List[Dict[int, float]]:
+        """
+        Costs from each source (or, reversed, to it) to the given targets,
+        moving only through the cluster's free cells.
+
+        Runs vectorized min-plus relaxation sweeps over the small cluster
+        block for all sources at once until the costs stop changing.
+        """
+
+        bounds = self._cluster_bounds(cluster)
+        origin = [lo for lo, _ in bounds]
+
+        free = self._cluster_cells(cluster)
+        block = free.shape
+        inside = (slice(1, -1),) * 3
+
+        weather_mul, weather_add = self._cluster_weather(cluster)
+
+        # Cost of entering each cell with each move, blocked cells at inf
+        entry = []
+        for step in self.step_table():
+            cost = np.full(tuple(n + 2 for n in block), math.inf)
+            cost[inside] = np.where(free, step * weather_mul + weather_add, math.inf)
+            entry.append(cost)
+
+        dist = np.full((len(sources),) + tuple(n + 2 for n in block), math.inf)
+        for i, source in enumerate(sources):
+            local = [c - o + 1 for c, o in zip(self._graph.position(source), origin)]
+            dist[(i, *local)] = 0.0
+
+        inner = (slice(None),) + inside
+
+        while True:
+
+            best = dist[inner].copy()
+
+            for (dx, dy, dz), cost in zip(NEIGHBOR_OFFSETS, entry):
+
+                if reverse:
+                    # u -> u + offset, entered at the neighbor
+                    shifted = (dist + cost)[
+                        :,
+                        1 + dx:1 + dx + block[0],
+                        1 + dy:1 + dy + block[1],
+                        1 + dz:1 + dz + block[2],
+                    ]
+                    np.minimum(best, shifted, out=best)
+                else:
+                    # (v - offset) -> v, entered at v
+                    shifted = dist[
+                        :,
+                        1 - dx:1 - dx + block[0],
+                        1 - dy:1 - dy + block[1],
+                        1 - dz:1 - dz + block[2],
+                    ]
+                    np.minimum(best, shifted + cost[inside], out=best)
+
+            if np.array_equal(best, dist[inner]):
+                break
+
+            dist[inner] = best
+
+        results = []
+        locals_ = [
+            (target, tuple(c - o + 1 for c, o in zip(self._graph.position(target), origin)))
+            for target in targets
+        ]
+
+        for i in range(len(sources)):
+            costs = {}
+            for target, local in locals_:
+                value = dist[(i, *local)]
+                if value != math.inf:
+                    costs[target] = float(value)
+            results.append(costs)
+
+        return results
+
+    def _abstract_heuristic(self, node: int, goal: Position) -> float:
+        # Same altitude-weighted estimate GridPlanner uses on the flat grid
+        return self._heuristic(self._graph.position(node), goal)
+
+    def _abstract_corridor(self, start: int, goal: int) -> Optional[Set[Cluster]]:
+
+        start_cluster = self._cluster_of(start)
+        goal_cluster = self._cluster_of(goal)
+
+        # Temporary edges: start into its cluster, its cluster into the goal
+        start_targets = list(self._cluster_links(start_cluster))
+        if goal_cluster == start_cluster:
+            start_targets.append(goal)
+
+        from_start = self._cluster_costs(start_cluster, [start], start_targets)[0]
+        to_goal = self._cluster_costs(
+            goal_cluster, [goal], list(self._cluster_links(goal_cluster)), reverse=True
+        )[0]
+
+        start_edges = list(from_start.items())
+
+        goal_pos = self._graph.position(goal)
+
+        g = {start: 0.0}
+        parent: Dict[int, int] = {}
+        open_set = [(self._abstract_heuristic(start, goal_pos), start)]
+        closed: Set[int] = set()
+
+        while open_set:
+
+            _, current = heapq.heappop(open_set)
+
+            if current in closed:
+                continue
+
+            if current == goal:
+                return self._corridor_from(parent, goal)
+
+            closed.add(current)
+
+            if current == start:
+                edges = list(start_edges)
+            else:
+                edges = []
+
+            if current != start or current in self._cluster_links(start_cluster):
+                edges.extend(self._abstract_edges(current))
+
+            if current in to_goal:
+                edges.append((goal, to_goal[current]))
+
+            for neighbor, cost in edges:
+
+                tentative_g = g[current] + cost
+
+                if tentative_g < g.get(neighbor, math.inf):
+                    g[neighbor] = tentative_g
+                    parent[neighbor] = current
+                    closed.discard(neighbor)
+                    heapq.heappush(open_set, (tentative_g + self._abstract_heuristic(neighbor, goal_pos), neighbor))
+
+        return None
+
+    def _abstract_edges(self, node: int) -> List[Tuple[int, float]]:
+
+        cluster = self._cluster_of(node)
+
+        edges = list(self._intra_edges(cluster).get(node, ()))
+
+        for partner in self._cluster_links(cluster).get(node, ()):
+            edges.append((partner, self._edge_cost(node, partner)))
+
+        return edges
+
+    def _corridor_from(self, parent: Dict[int, int], goal: int) -> Set[Cluster]:
+
+        corridor = {self._cluster_of(goal)}
+        current = goal
+
+        while current in parent:
+            current = parent[current]
+            corridor.add(self._cluster_of(current))
+
+        return corridor
+
+    # ------------------- REFINEMENT -------------------
+
+    def _refine(self, corridor: Set[Cluster], start: Position, goal: Position, stats: Optional[PlanStats]) -> Optional[List[Position]]:
+        # A* limited to the widened corridor, on a graph over its bounding box
+        counts = self._cluster_counts()
+        margin = range(-self.corridor_margin, self.corridor_margin + 1)
+
+        widened = {
+            (cx + dx, cy + dy, cz + dz)
+            for cx, cy, cz in corridor
+            for dx in margin
+            for dy in margin
+            for dz in margin
+        }
+        widened = [cluster for cluster in widened if all(0 <= c < n for c, n in zip(cluster, counts))]
+
+        bounds = [self._cluster_bounds(cluster) for cluster in widened]
+        origin = tuple(min(b[dim][0] for b in bounds) for dim in range(3))
+        end = tuple(max(b[dim][1] for b in bounds) for dim in range(3))
+
+        graph = VoxelGraph(tuple(e - o for o, e in zip(origin, end)))
+
+        # Cells outside the corridor clusters stay blocked
+        free = np.zeros(graph.padded_shape, dtype=np.uint8)
+
+        weather = None
+        if self.weather:
+            weather = (np.ones(graph.padded_shape), np.zeros(graph.padded_shape))
+
+        for cluster, cluster_bounds in zip(widened, bounds):
+
+            region = tuple(slice(lo - o + 1, hi - o + 1) for (lo, hi), o in zip(cluster_bounds, origin))
+            free[region] = self._cluster_cells(cluster)
+
+            if weather is not None:
+                weather[0][region], weather[1][region] = self._cluster_weather(cluster)
+
+        def local(pos: Position) -> Position:
+            return tuple(c - o for c, o in zip(pos, origin))
+
+        route = self._corridor_search(graph, free, weather, local(start), local(goal), stats)
+
+        if route is None:
+            return None
+
+        return [tuple(c + o for c, o in zip(pos, origin)) for pos in route]
+
+    def _corridor_search(self, graph: VoxelGraph, free: np.ndarray, weather, start: Position, goal: Position, stats: Optional[PlanStats]) -> Optional[List[Position]]:
+        """
+        ArrayGridPlanner._search with search state kept in dicts.
+
+        The box of a diagonal corridor is most of the grid, so only the
+        free mask and weather are box-sized arrays, read through
+        memoryviews; costs, parents and heuristic values exist only for
+        the voxels the search reaches. Returns the same routes.
+        """
+
+        free = free.reshape(-1).data
+
+        weather_mul = weather_add = None
+        if weather is not None:
+            weather_mul, weather_add = (values.reshape(-1).data for values in weather)
+
+        moves = list(zip(graph.flat_offsets, self.step_table()))
+        capacity = self.battery_capacity
+
+        start_idx = graph.index(start)
+        goal_idx = graph.index(goal)
+
+        # GridPlanner's heuristic, computed when a voxel is first queued
+        gx, gy, gz = (c + 1 for c in goal)
+        payload_factor = 1 + (self.payload_weight * 0.4)
+        stride_x, stride_y = graph.stride_x, graph.stride_y
+        sqrt = math.sqrt
+
+        def heuristic(idx: int) -> float:
+            x, rest = divmod(idx, stride_x)
+            y, z = divmod(rest, stride_y)
+            dx, dy, dz = abs(x - gx), abs(y - gy), abs(z - gz)
+            return sqrt(dx*dx + dy*dy + dz*dz) * payload_factor * (2.5 if dz > 0 else 1.0)
+
+        g: Dict[int, float] = {start_idx: 0.0}
+        parent: Dict[int, int] = {start_idx: -1}
+        closed: Set[int] = set()
+
+        open_set: List[Tuple[float, int]] = [(0.0, start_idx)]
+
+        heappush = heapq.heappush
+        heappop = heapq.heappop
+        inf = math.inf
+
+        if stats is not None:
+            expanded: Set[int] = set()
+            stats.heap_pushes = stats.heap_peak = 1
+
+        while open_set:
+
+            _, current = heappop(open_set)
+
+            # Stale heap entry for a node already expanded at its best cost
+            if current in closed:
+                continue
+
+            if current == goal_idx:
+                return self._reconstruct_indices(graph, parent, current)
+
+            closed.add(current)
+            g_current = g[current]
+
+            if stats is not None:
+                stats.expansions += 1
+                if current in expanded:
+                    stats.reexpansions += 1
+                expanded.add(current)
+
+            for offset, step in moves:
+
+                neighbor = current + offset
+
+                if not free[neighbor]:
+                    if stats is not None:
+                        stats.pruned_traversability += 1
+                    continue
+
+                if weather_mul is None:
+                    tentative_g = g_current + step
+                else:
+                    tentative_g = g_current + step * weather_mul[neighbor] + weather_add[neighbor]
+
+                # battery constraint check
+                if tentative_g > capacity:
+                    if stats is not None:
+                        stats.pruned_battery += 1
+                    continue
+
+                if tentative_g < g.get(neighbor, inf):
+
+                    g[neighbor] = tentative_g
+                    parent[neighbor] = current
+
+                    # Inconsistent heuristic, so improved nodes are reopened
+                    closed.discard(neighbor)
+
+                    heappush(open_set, (tentative_g + heuristic(neighbor), neighbor))
+
+                    if stats is not None:
+                        stats.heap_pushes += 1
+                        stats.heap_peak = max(stats.heap_peak, len(open_set))
+
+        return None
+
+
+def _components(mask: np.ndarray) -> List[List[Tuple[int, int]]]:
+    # 4-connected components of a 2D face, cells listed in scan order
+    seen = np.zeros(mask.shape, dtype=bool)
+    rows, cols = mask.shape
+    components = []
+
+    for u, v in zip(*np.nonzero(mask)):
+
+        if seen[u, v]:
+            continue
+
+        seen[u, v] = True
+        stack = [(int(u), int(v))]
+        component = []
+
+        while stack:
+            cu, cv = stack.pop()
+            component.append((cu, cv))
+
+            for nu, nv in ((cu - 1, cv), (cu + 1, cv), (cu, cv - 1), (cu, cv + 1)):
+                if 0 <= nu < rows and 0 <= nv < cols and mask[nu, nv] and not seen[nu, nv]:
+                    seen[nu, nv] = True
+                    stack.append((nu, nv))
+
+        component.sort()
+        components.append(component)
+
+    return components
@@ -0,0 +1,380 @@
+"""
+Incremental replanning with D* Lite.
+
+Searches backward from the goal and keeps its g / rhs state between
+calls. When the drone has moved and a few cells changed (e.g. a
+clicked obstacle column), only the vertices whose cost-to-goal is
+affected are repaired instead of running a full search again.
+"""
+
+from typing import Dict, List, Optional, Tuple
+import heapq
+import math
+
+import numpy as np
+
+from src.environment.grid import Position
+from src.planner.array_planner import ArrayGridPlanner
+from src.planner.stats import PlanStats
+from src.planner.voxel_graph import VoxelGraph
+
+
+Key = Tuple[float, float]
+
+
+class IncrementalGridPlanner(ArrayGridPlanner):
+    """
+    Drop-in replacement for GridPlanner in DroneSimulator and Replanner.
+
+    Routes are optimal under the battery cost model, so they can differ
+    from GridPlanner, whose altitude-weighted heuristic is inflated.
+    Routes whose energy exceeds battery_capacity are rejected.
+    """
+
+    def __init__(self, env, weather=None, battery_model=None, payload_weight=0, battery_capacity=100):
+        super().__init__(
+            env,
+            weather,
+            battery_model=battery_model,
+            payload_weight=payload_weight,
+            battery_capacity=battery_capacity
+        )
+        self.reset()
+
+    def reset(self):
+        # Drop all search state, the next plan() starts from scratch
+        self._state_key = None
+        self._graph: Optional[VoxelGraph] = None
+        self._free: Optional[np.ndarray] = None
+
+    # ------------------- PUBLIC API -------------------
+
+    def _astar(self, start: Position, goal: Position, stats: Optional[PlanStats]) -> Optional[List[Position]]:
+
+        if not self.env.is_traversable(start) or not self.env.is_traversable(goal):
+            return None
+
+        graph = VoxelGraph.for_env(self.env)
+
+        state_key = (
+            graph.shape,
+            tuple(goal),
+            self.payload_weight,
+            self._weather_version(),
+        )
+
+        if state_key != self._state_key:
+            self._initialize(graph, start, goal)
+            self._state_key = state_key
+        else:
+            self._move_start(graph.index(start))
+            self._apply_changes()
+
+        self._compute_shortest_path(stats)
+
+        route = self._extract_path()
+
+        if route is None:
+            return None
+
+        return graph.positions(route)
+
+    # ------------------- STATE -------------------
+
+    def _weather_version(self):
+
+        if not self.weather:
+            return None
+
+        return (id(self.weather), self.weather.version)
+
+    def _initialize(self, graph: VoxelGraph, start: Position, goal: Position):
+
+        self._graph = graph
+        self._env_version = self.env.version
+
+        # Mutable occupancy, with a NumPy view for vectorized updates
+        self._free_cells = bytearray(graph.free_cells(self.env))
+        self._free = np.frombuffer(self._free_cells, dtype=np.uint8)
+
+        self._weather_mul, self._weather_add = self._weather_arrays(graph)
+
+        # Moves as (flat offset, base step cost)
+        self._moves = list(zip(graph.flat_offsets, self.step_table()))
+
+        self._heuristic_scale = self.heuristic_scale()
+
+        self._g = [math.inf] * graph.size
+        self._rhs = [math.inf] * graph.size
+
+        self._open: List[Tuple[float, float, int]] = []
+        self._open_keys: Dict[int, Key] = {}
+
+        self._km = 0.0
+        self._goal = graph.index(goal)
+        self._start = graph.index(start)
+
+        self._rhs[self._goal] = 0.0
+        self._push(self._goal, self._calculate_key(self._goal))
+
+    def _move_start(self, new_start: int):
+
+        if new_start == self._start:
+            return
+
+        # Shift all queued keys instead of re-keying the whole queue
+        self._km += self._distance_bound(self._start, new_start)
+        self._start = new_start
+
+    def _apply_changes(self):
+
+        boxes = self.env.changes_since(self._env_version)
+        self._env_version = self.env.version
+
+        if not boxes and boxes is not None:
+            return
+
+        changed = self._changed_cells(boxes)
+
+        if changed.size == 0:
+            return
+
+        self._free[changed] ^= 1
+
+        # A toggled cell changes its own out-edges and every in-edge
+        affected = set()
+        for cell in changed.tolist():
+            affected.add(cell)
+            for offset, _ in self._moves:
+                affected.add(cell - offset)
+
+        for vertex in affected:
+
+            if vertex != self._goal:
+                self._rhs[vertex] = self._best_successor(vertex)[1]
+
+            self._update_queue(vertex)
+
+    def _changed_cells(self, boxes) -> np.ndarray:
+        # Padded indices whose traversability differs from the stored copy
+        graph = self._graph
+
+        if boxes is None:
+            # Change log truncated: diff the whole grid
+            free = np.frombuffer(graph.free_cells(self.env), dtype=np.uint8)
+            return np.flatnonzero(free != self._free)
+
+        changed = []
+
+        for lo, hi in boxes:
+
+            block = self.env.read_region(lo, hi)
+            if block is None:
+                continue
+
+            axes = [np.arange(l + 1, h + 2) for l, h in zip(lo, hi)]
+            xs, ys, zs = np.meshgrid(*axes, indexing="ij")
+            indices = (xs * graph.stride_x + ys * graph.stride_y + zs).ravel()
+
+            now_free = (block == self.env.FREE).ravel()
+            changed.append(indices[now_free != self._free[indices].astype(bool)])
+
+        if not changed:
+            return np.empty(0, dtype=np.intp)
+
+        # Overlapping boxes may report the same cell twice
+        return np.unique(np.concatenate(changed))
+
+    # ------------------- D* LITE CORE -------------------
+
+    def _distance_bound(self, a: int, b: int) -> float:
+        # Scaled Euclidean lower bound, consistent under every move cost
+        ax, ay, az = self._graph.position(a)
+        bx, by, bz = self._graph.position(b)
+
+        dx = ax - bx
+        dy = ay - by
+        dz = az - bz
+
+        return math.sqrt(dx*dx + dy*dy + dz*dz) * self._heuristic_scale
+
+    def _calculate_key(self, vertex: int) -> Key:
+
+        best = min(self._g[vertex], self._rhs[vertex])
+        return (best + self._distance_bound(self._start, vertex) + self._km, best)
+
+    def _key_before(self, key: Key, start_key: Key) -> bool:
+        # Near-ties count as "before" so float rounding in k1 never leaves
+        # a stale vertex on the route unprocessed
+        tolerance = 1e-9 * (1.0 + abs(start_key[0]))
+        return key[0] < start_key[0] + tolerance or key < start_key
+
+    def _edge_cost(self, step: float, target: int) -> float:
+        return step * self._weather_mul[target] + self._weather_add[target]
+
+    def _best_successor(self, vertex: int) -> Tuple[int, float]:
+
+        if not self._free_cells[vertex]:
+            return -1, math.inf
+
+        free = self._free_cells
+        g = self._g
+
+        best_vertex = -1
+        best_cost = math.inf
+
+        for offset, step in self._moves:
+
+            successor = vertex + offset
+
+            if not free[successor]:
+                continue
+
+            cost = self._edge_cost(step, successor) + g[successor]
+
+            if cost < best_cost:
+                best_vertex = successor
+                best_cost = cost
+
+        return best_vertex, best_cost
+
+    def _push(self, vertex: int, key: Key):
+
+        self._open_keys[vertex] = key
+        heapq.heappush(self._open, (key[0], key[1], vertex))
+
+    def _update_queue(self, vertex: int):
+
+        if self._g[vertex] != self._rhs[vertex]:
+            self._push(vertex, self._calculate_key(vertex))
+        else:
+            self._open_keys.pop(vertex, None)
+
+    def _top(self) -> Optional[Tuple[Key, int]]:
+
+        # Lazy deletion: discard heap entries whose key is out of date
+        while self._open:
+            k1, k2, vertex = self._open[0]
+
+            if self._open_keys.get(vertex) == (k1, k2):
+                return (k1, k2), vertex
+
+            heapq.heappop(self._open)
+
+        return None
+
+    def _compute_shortest_path(self, stats: Optional[PlanStats] = None):
+
+        g = self._g
+        rhs = self._rhs
+        free = self._free_cells
+
+        while True:
+
+            top = self._top()
+            if top is None:
+                break
+
+            key_old, vertex = top
+            start = self._start
+
+            if not (self._key_before(key_old, self._calculate_key(start)) or rhs[start] != g[start]):
+                break
+
+            heapq.heappop(self._open)
+            del self._open_keys[vertex]
+
+            if stats is not None:
+                stats.expansions += 1
+
+            key_new = self._calculate_key(vertex)
+
+            if key_old < key_new:
+                self._push(vertex, key_new)
+
+            elif g[vertex] > rhs[vertex]:
+
+                # Overconsistent: settle the vertex, relax its predecessors
+                g[vertex] = rhs[vertex]
+
+                for offset, step in self._moves:
+
+                    predecessor = vertex - offset
+
+                    if not free[predecessor] or predecessor == self._goal:
+                        continue
+
+                    cost = self._edge_cost(step, vertex) + g[vertex]
+
+                    if cost < rhs[predecessor]:
+                        rhs[predecessor] = cost
+                        self._update_queue(predecessor)
+
+            else:
+
+                # Underconsistent: invalidate and recompute dependents
+                g_old = g[vertex]
+                g[vertex] = math.inf
+
+                dependents = [vertex] + [vertex - offset for offset, _ in self._moves]
+
+                for predecessor, move in zip(dependents, [None] + self._moves):
+
+                    if predecessor == self._goal or not free[predecessor]:
+                        continue
+
+                    if move is None or rhs[predecessor] == self._edge_cost(move[1], vertex) + g_old:
+                        rhs[predecessor] = self._best_successor(predecessor)[1]
+
+                    self._update_queue(predecessor)
+
+    def _extract_path(self) -> Optional[List[int]]:
+
+        start = self._start
+
+        path = [start]
+        energy = 0.0
+
+        try:
+            # Walk the start along the route so every step reads settled
+            # g values, the same way D* Lite moves the robot
+            for _ in range(self._graph.size):
+
+                current = self._start
+
+                if self._g[current] == math.inf:
+                    return None
+
+                if current == self._goal:
+                    return path
+
+                successor, _ = self._best_successor(current)
+
+                if successor == -1:
+                    return None
+
+                energy += self._edge_cost(self._step_to(current, successor), successor)
+
+                # battery constraint check
+                if energy > self.battery_capacity:
+                    return None
+
+                path.append(successor)
+
+                self._move_start(successor)
+                self._compute_shortest_path()
+
+            return None
+
+        finally:
+            self._move_start(start)
+
+    def _step_to(self, vertex: int, successor: int) -> float:
+
+        delta = successor - vertex
+
+        for offset, step in self._moves:
+            if offset == delta:
+                return step
+
+        raise ValueError("Vertices are not adjacent")
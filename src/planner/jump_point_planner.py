@@ -0,0 +1,424 @@
+"""
+Jump Point Search for 26-connected 3D grids.
+
+Away from weather zones every move direction has a fixed cost, so many
+paths are symmetric: they use the same moves in a different order and
+cost exactly the same. JPS expands only one canonical ordering. A
+successor is pruned when a path from the parent that avoids the
+current voxel reaches it for less, or for the same cost with a first
+move that ranks higher in a fixed tie-break order. A straight run
+whose only surviving successor is the next voxel along the run is
+jumped over without touching the heap.
+
+The pruning tables are derived from the planner's own step costs, so
+they stay correct for the battery model, where climbing diagonals are
+dearer than their split moves. Voxels with weather within one cell use
+plain A* expansion.
+"""
+
+from typing import Dict, List, Optional, Tuple
+import heapq
+import math
+
+import numpy as np
+
+from src.environment.grid import Position
+from src.planner.array_planner import ArrayGridPlanner
+from src.planner.stats import PlanStats
+from src.planner.voxel_graph import NEIGHBOR_OFFSETS, VoxelGraph
+
+
+# Every one of the 26 neighbors free
+ALL_FREE = (1 << len(NEIGHBOR_OFFSETS)) - 1
+
+
+class JumpPointGridPlanner(ArrayGridPlanner):
+    """
+    Drop-in GridPlanner using Jump Point Search in uniform-cost regions.
+
+    Routes are optimal under the battery cost model, like the other
+    optimal planners, and are rejected when their energy exceeds
+    battery_capacity. Most nodes of open airspace never enter the heap.
+    """
+
+    # Costs closer than this (relative) count as equal when pruning
+    TIE_TOLERANCE = 1e-9
+
+    def __init__(self, env, weather=None, battery_model=None, payload_weight=0, battery_capacity=100):
+        super().__init__(
+            env,
+            weather,
+            battery_model=battery_model,
+            payload_weight=payload_weight,
+            battery_capacity=battery_capacity
+        )
+
+        # payload -> [arrival direction][successor] prune rules
+        self._prune_tables: Dict[float, List[List[Optional[int]]]] = {}
+
+        self._uniform_key = None
+        self._uniform_cache = None
+
+    def _astar(self, start: Position, goal: Position, stats: Optional[PlanStats]) -> Optional[List[Position]]:
+
+        if not self.env.is_traversable(start) or not self.env.is_traversable(goal):
+            return None
+
+        graph = VoxelGraph.for_env(self.env)
+        free = graph.free_cells(self.env)
+
+        return self._jump_search(graph, free, start, goal, stats)
+
+    # ------------------- SEARCH -------------------
+
+    def _jump_search(
+        self,
+        graph: VoxelGraph,
+        free: bytes,
+        start: Position,
+        goal: Position,
+        stats: Optional[PlanStats] = None,
+    ) -> Optional[List[Position]]:
+
+        weather_mul, weather_add = self._weather_arrays(graph)
+        uniform = self._uniform_cells(graph)
+        prune = self._prune_table()
+        heuristic = self._distance_array(graph, goal)
+
+        offsets = graph.flat_offsets
+        steps = self.step_table()
+        directions = range(len(offsets))
+        capacity = self.battery_capacity
+
+        start_idx = graph.index(start)
+        goal_idx = graph.index(goal)
+
+        g = [math.inf] * graph.size
+        parent = [-1] * graph.size
+        arrival = [-1] * graph.size
+        closed = bytearray(graph.size)
+
+        g[start_idx] = 0.0
+        open_set: List[Tuple[float, int]] = [(heuristic[start_idx], start_idx)]
+
+        heappush = heapq.heappush
+        heappop = heapq.heappop
+
+        # Free-neighbor bitmask of every voxel: the pruned successor list
+        # only depends on it and the arrival direction, so it is memoized
+        masks = self._neighbor_masks(graph, free)
+        memo: List[Dict[int, List[int]]] = [{} for _ in range(len(prune) + 1)]
+
+        def surviving(mask: int, direction: int) -> List[int]:
+
+            if direction < 0:
+                return [e for e in directions if mask >> e & 1]
+
+            result = []
+
+            for e, detours in enumerate(prune[direction]):
+
+                # Covered by a direct move from the parent
+                if detours is None or not mask >> e & 1:
+                    continue
+
+                # Pruned when any dominating detour around the voxel is open
+                if mask & detours:
+                    continue
+
+                result.append(e)
+
+            return result
+
+        def successors(node: int, direction: int) -> List[int]:
+            # Directions that survive pruning from `node`, arrived along `direction`
+            if not uniform[node]:
+                direction = -1
+
+            mask = masks[node]
+            known = memo[direction].get(mask)
+
+            if known is None:
+                known = memo[direction][mask] = surviving(mask, direction)
+
+            return known
+
+        # The goal is never open, so no run skips past it
+        open_cells = (np.asarray(masks) == ALL_FREE).reshape(graph.padded_shape)
+        open_cells &= np.frombuffer(uniform, dtype=np.uint8).reshape(graph.padded_shape).astype(bool)
+        open_cells.flat[goal_idx] = False
+        open_box = open_cells.astype(np.uint8).ravel().tobytes()
+
+        # Straight directions that keep going through open airspace, with
+        # the number of open voxels ahead of every voxel
+        runs = {
+            e: self._run_lengths(open_cells, NEIGHBOR_OFFSETS[e])
+            for e in directions
+            if surviving(ALL_FREE, e) == [e]
+        }
+
+        # Instrumented runs count jump points, not the voxels jumped over
+        if stats is not None:
+            expanded = bytearray(graph.size)
+            stats.heap_pushes = stats.heap_peak = 1
+
+        while open_set:
+
+            _, current = heappop(open_set)
+
+            if closed[current]:
+                continue
+
+            if current == goal_idx:
+                return self._reconstruct_jumps(graph, parent, current)
+
+            closed[current] = 1
+            g_current = g[current]
+
+            if stats is not None:
+                stats.expansions += 1
+                if expanded[current]:
+                    stats.reexpansions += 1
+                expanded[current] = 1
+
+            for e in successors(current, arrival[current]):
+
+                offset = offsets[e]
+                step = steps[e]
+
+                node = current + offset
+                cost = g_current + step * weather_mul[node] + weather_add[node]
+
+                # Jump along a straight run while it is the only way on
+                dead_end = False
+                run = runs.get(e)
+
+                while cost <= capacity and node != goal_idx and uniform[node]:
+
+                    # Cross an open run in one go: no weather, no branching
+                    if run is not None and open_box[node]:
+                        skip = run[node] - 1
+                        if skip:
+                            for _ in range(skip):
+                                cost += step
+                            node += offset * skip
+                            continue
+
+                    onward = successors(node, e)
+
+                    # Everything past a dead end is reached another way
+                    if not onward:
+                        dead_end = True
+                        break
+
+                    if onward != [e]:
+                        break
+
+                    nxt = node + offset
+                    cost += step * weather_mul[nxt] + weather_add[nxt]
+                    node = nxt
+
+                # battery constraint check
+                if dead_end or cost > capacity:
+                    if stats is not None and not dead_end:
+                        stats.pruned_battery += 1
+                    continue
+
+                if cost < g[node]:
+
+                    g[node] = cost
+                    parent[node] = current
+                    arrival[node] = e
+                    closed[node] = 0
+
+                    heappush(open_set, (cost + heuristic[node], node))
+
+                    if stats is not None:
+                        stats.heap_pushes += 1
+                        stats.heap_peak = max(stats.heap_peak, len(open_set))
+
+        return None
+
+    def _reconstruct_jumps(self, graph: VoxelGraph, parent, current) -> List[Position]:
+        # Jump points plus the voxels of every straight run between them
+        jumps = [current]
+
+        while parent[current] != -1:
+            current = parent[current]
+            jumps.append(current)
+
+        jumps.reverse()
+
+        path = [jumps[0]]
+
+        for a, b in zip(jumps, jumps[1:]):
+
+            ax, ay, az = graph.position(a)
+            bx, by, bz = graph.position(b)
+
+            length = max(abs(bx - ax), abs(by - ay), abs(bz - az))
+            stride = (b - a) // length
+
+            path.extend(a + stride * k for k in range(1, length + 1))
+
+        return graph.positions(path)
+
+    # ------------------- TABLES -------------------
+
+    def _distance_array(self, graph: VoxelGraph, goal: Position) -> List[float]:
+        # Scaled Euclidean lower bound, consistent under every move cost
+        x_size, y_size, z_size = graph.shape
+
+        dx = (np.arange(x_size) - goal[0])[:, None, None]
+        dy = (np.arange(y_size) - goal[1])[None, :, None]
+        dz = (np.arange(z_size) - goal[2])[None, None, :]
+
+        distance = np.sqrt((dx*dx + dy*dy + dz*dz).astype(np.float64)) * self.heuristic_scale()
+
+        return graph.pad(distance, math.inf).tolist()
+
+    def _neighbor_masks(self, graph: VoxelGraph, free: bytes) -> List[int]:
+        # Bit e set when the neighbor along NEIGHBOR_OFFSETS[e] is free
+        cells = np.frombuffer(free, dtype=np.uint8).astype(np.int64)
+        masks = np.zeros(graph.size, dtype=np.int64)
+
+        # Border voxels are never expanded, so their masks stay 0
+        reach = graph.stride_x + graph.stride_y + 1
+        low, high = reach, graph.size - reach
+
+        for bit, offset in enumerate(graph.flat_offsets):
+            masks[low:high] |= cells[low + offset:high + offset] << bit
+
+        return masks.tolist()
+
+    def _uniform_cells(self, graph: VoxelGraph) -> bytes:
+        # 1 where no voxel within one cell carries a weather cost
+        key = (id(self.weather), self.weather.version if self.weather else None, graph.shape)
+        if key == self._uniform_key:
+            return self._uniform_cache
+
+        weathered = np.zeros(graph.padded_shape, dtype=bool)
+
+        if self.weather:
+            penalty = np.asarray(self.weather.cost_field(graph.shape))
+            weathered[1:-1, 1:-1, 1:-1] = penalty != 0
+
+        # Dilate by one voxel along each axis in turn (3x3x3 box)
+        for axis in range(3):
+            shifted = weathered.copy()
+            low = [slice(None)] * 3
+            high = [slice(None)] * 3
+            low[axis] = slice(1, None)
+            high[axis] = slice(None, -1)
+            shifted[tuple(low)] |= weathered[tuple(high)]
+            shifted[tuple(high)] |= weathered[tuple(low)]
+            weathered = shifted
+
+        self._uniform_key = key
+        self._uniform_cache = (~weathered).astype(np.uint8).ravel().tobytes()
+        return self._uniform_cache
+
+    def _run_lengths(self, cells: np.ndarray, direction: Position) -> memoryview:
+        # Open voxels in a row from every voxel along a straight direction
+        axis = next(i for i, c in enumerate(direction) if c)
+        reverse = direction[axis] < 0
+
+        if reverse:
+            cells = np.flip(cells, axis)
+
+        # Index of the first closed voxel at or after each voxel
+        shape = [1, 1, 1]
+        shape[axis] = cells.shape[axis]
+        index = np.arange(cells.shape[axis]).reshape(shape)
+
+        closed_at = np.where(cells, cells.shape[axis], index)
+        closed_at = np.flip(np.minimum.accumulate(np.flip(closed_at, axis), axis=axis), axis)
+
+        runs = closed_at - index
+
+        if reverse:
+            runs = np.flip(runs, axis)
+
+        return memoryview(np.ascontiguousarray(runs, dtype=np.int32).ravel())
+
+    def _prune_table(self) -> List[List[Optional[int]]]:
+        """
+        Prune rules for every (arrival direction, successor) pair.
+
+        With p the parent and n the successor of x, the rule is None
+        when a direct move p -> n dominates p -> x -> n, otherwise a
+        bitmask of the neighbors y of x for which p -> y -> n does
+        (0 when none does). The successor survives when none of them
+        is free.
+        """
+
+        key = self.payload_weight
+        table = self._prune_tables.get(key)
+        if table is not None:
+            return table
+
+        steps = dict(zip(NEIGHBOR_OFFSETS, self.step_table()))
+        bits = {offset: 1 << bit for bit, offset in enumerate(NEIGHBOR_OFFSETS)}
+        tolerance = self.TIE_TOLERANCE
+
+        def priority(move) -> Tuple:
+            # Tie-break order: diagonals, then climbs, then fixed direction order
+            return (sum(c != 0 for c in move), abs(move[2]), move)
+
+        def dominates(cost: float, via: float, first_move, arrival) -> bool:
+            # Equal-cost detours only win when their first move ranks
+            # above the arrival move, so symmetric paths never prune each other
+            if cost < via - tolerance * via:
+                return True
+            return abs(cost - via) <= tolerance * via and priority(first_move) > priority(arrival)
+
+        def move_cost(a, b) -> Optional[float]:
+            delta = tuple(bb - aa for aa, bb in zip(a, b))
+            return steps.get(delta)
+
+        table = []
+
+        for d in NEIGHBOR_OFFSETS:
+
+            p = tuple(-c for c in d)
+            rules = []
+
+            for e in NEIGHBOR_OFFSETS:
+
+                n = e
+                via = steps[d] + steps[e]
+
+                if n == p:
+                    rules.append(None)
+                    continue
+
+                # A direct move was relaxed by the parent itself, so
+                # it may win ties whatever its direction
+                direct = move_cost(p, n)
+                if direct is not None and direct <= via:
+                    rules.append(None)
+                    continue
+
+                detours = 0
+                for y in NEIGHBOR_OFFSETS:
+
+                    if y == p or y == n:
+                        continue
+
+                    first = move_cost(p, y)
+                    second = move_cost(y, n)
+
+                    if first is None or second is None:
+                        continue
+
+                    first_move = tuple(a - b for a, b in zip(y, p))
+
+                    if dominates(first + second, via, first_move, d):
+                        detours |= bits[y]
+
+                rules.append(detours)
+
+            table.append(rules)
+
+        self._prune_tables[key] = table
+        return table
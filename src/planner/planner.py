@@ -3,6 +3,8 @@ import heapq
 import math
 
 from src.environment.grid import GridMap, Position
+from src.planner import batch
+from src.planner.stats import PlanStats
 
 
 class GridPlanner:
@@ -13,7 +15,18 @@ class GridPlanner:
         self.payload_weight = payload_weight
         self.battery_capacity = battery_capacity
 
-    def plan(self, start: Position, goal: Position) -> Optional[List[Position]]:
+    def plan(self, start: Position, goal: Position, stats: Optional[PlanStats] = None) -> Optional[List[Position]]:
+        # `stats` opts into per-search counters and timings
+        if stats is None:
+            return self._astar(start, goal, None)
+
+        stats.start()
+        route = self._astar(start, goal, stats)
+        stats.finish(route)
+
+        return route
+
+    def _astar(self, start: Position, goal: Position, stats: Optional[PlanStats]) -> Optional[List[Position]]:
 
         if not self.env.is_traversable(start) or not self.env.is_traversable(goal):
             return None
@@ -24,6 +37,26 @@ class GridPlanner:
         came_from: Dict[Position, Position] = {}
         g_cost: Dict[Position, float] = {start: 0.0}
 
+        movement_cost = self._movement_cost
+        cost_field = self.weather.cost_field if self.weather else None
+
+        # Instrumented runs time the cost calls and track expanded nodes
+        if stats is not None:
+            movement_cost = stats.timed("battery_time", movement_cost)
+            if cost_field is not None:
+                cost_field = stats.timed("weather_time", cost_field)
+            expanded = set()
+            stats.heap_pushes = stats.heap_peak = 1
+
+        # Weather penalties come from the precomputed cost volume
+        weather_at = None
+        if cost_field is not None:
+            weather_at = cost_field(
+                (self.env.x_size, self.env.y_size, self.env.z_size)
+            ).__getitem__
+            if stats is not None:
+                weather_at = stats.timed("weather_time", weather_at)
+
         while open_set:
 
             _, current = heapq.heappop(open_set)
@@ -31,21 +64,31 @@ class GridPlanner:
             if current == goal:
                 return self._reconstruct_path(came_from, current)
 
+            if stats is not None:
+                stats.expansions += 1
+                if current in expanded:
+                    stats.reexpansions += 1
+                expanded.add(current)
+
             for neighbor in self._neighbors_3d(current):
 
                 if not self.env.is_traversable(neighbor):
+                    if stats is not None:
+                        stats.pruned_traversability += 1
                     continue
 
-                step_cost = self._movement_cost(current, neighbor)
-
                 weather_cost = 0
-                if self.weather:
-                    weather_cost = self.weather.cost(neighbor)
+                if weather_at is not None:
+                    weather_cost = float(weather_at(neighbor))
+
+                step_cost = movement_cost(current, neighbor, weather_cost)
 
                 tentative_g = g_cost[current] + step_cost + weather_cost
 
                 # battery constraint check
                 if tentative_g > self.battery_capacity:
+                    if stats is not None:
+                        stats.pruned_battery += 1
                     continue
 
                 if neighbor not in g_cost or tentative_g < g_cost[neighbor]:
@@ -57,8 +100,22 @@ class GridPlanner:
 
                     heapq.heappush(open_set, (f_cost, neighbor))
 
+                    if stats is not None:
+                        stats.heap_pushes += 1
+                        stats.heap_peak = max(stats.heap_peak, len(open_set))
+
         return None
 
+    def plan_many(self, requests, executor="process", max_workers=None, chunksize=None):
+        # Plans (start, goal[, payload[, capacity]]) requests on a worker pool
+        return batch.plan_many(
+            self,
+            requests,
+            executor=executor,
+            max_workers=max_workers,
+            chunksize=chunksize
+        )
+
     def _neighbors_3d(self, pos):
 
         x, y, z = pos
@@ -78,14 +135,15 @@ class GridPlanner:
 
         return neighbors
 
-    def _movement_cost(self, a, b):
+    def _movement_cost(self, a, b, weather_cost=None):
 
         if self.battery_model:
             return self.battery_model.step_cost(
                 a,
                 b,
                 self.payload_weight,
-                self.weather
+                self.weather,
+                weather_penalty=weather_cost
             )
 
         # fallback
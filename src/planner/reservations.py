@@ -0,0 +1,186 @@
+"""
+Space-time reservation table for drones sharing one GridMap.
+
+Every (cell, tick) a planned drone occupies is reserved for it under
+one packed integer key, tick * cells + flat cell index, so a lookup
+is a single dict probe and memory grows with the reserved cells only,
+not with the grid or the time horizon. A drone that reached its goal
+parks there: the goal stays reserved for it from its arrival tick on.
+"""
+
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple
+
+from src.environment.grid import Position
+
+TimedPosition = Tuple[Position, int]  # (position, tick)
+
+
+class Conflict:
+    # One place where a route meets another drone's reservation
+    def __init__(self, tick: int, position: Position, other: Hashable, swap: bool = False):
+        self.tick = tick
+        self.position = position
+        self.other = other
+
+        # Head-on: both drones swap cells between tick - 1 and tick
+        self.swap = swap
+
+    def __repr__(self) -> str:
+        kind = "swap" if self.swap else "vertex"
+        return f"Conflict({kind}, tick={self.tick}, position={self.position}, other={self.other!r})"
+
+
+class ReservationTable:
+    # Hashed (cell, tick) -> drone reservations, plus parked goals
+
+    def __init__(self, shape: Tuple[int, int, int]):
+        self.shape = tuple(shape)
+        self._cells = self.shape[0] * self.shape[1] * self.shape[2]
+
+        self._slots: Dict[int, Hashable] = {}
+
+        # Flat cell -> (tick, drone) of a drone parked there from tick on
+        self._parked: Dict[int, Tuple[int, Hashable]] = {}
+
+        # Flat cell -> latest reserved tick, for parking checks
+        self._latest: Dict[int, int] = {}
+
+        # Keys and parked cell of every drone, so it can be released
+        self._owned: Dict[Hashable, Tuple[List[int], Optional[int]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def __contains__(self, agent: Hashable) -> bool:
+        return agent in self._owned
+
+    def index(self, pos: Position) -> int:
+        return (pos[0] * self.shape[1] + pos[1]) * self.shape[2] + pos[2]
+
+    # ------------------- LOOKUPS -------------------
+
+    def at(self, pos: Position, tick: int) -> Optional[Hashable]:
+        # Drone holding `pos` at `tick`, None when it is free
+        flat = self.index(pos)
+
+        owner = self._slots.get(tick * self._cells + flat)
+        if owner is not None:
+            return owner
+
+        parked = self._parked.get(flat)
+        if parked is not None and tick >= parked[0]:
+            return parked[1]
+
+        return None
+
+    def is_free(self, pos: Position, tick: int, agent: Hashable = None) -> bool:
+        owner = self.at(pos, tick)
+        return owner is None or owner == agent
+
+    def move_allowed(self, origin: Position, target: Position, depart: int, arrive: int, agent: Hashable = None) -> bool:
+        # Target free on arrival and no drone coming the other way
+        owner = self.at(target, arrive)
+
+        if owner is not None and owner != agent:
+            return False
+
+        if origin == target:
+            return True
+
+        oncoming = self.at(target, depart)
+
+        return oncoming is None or oncoming == agent or self.at(origin, arrive) != oncoming
+
+    def can_park(self, pos: Position, tick: int, agent: Hashable = None) -> bool:
+        # Nobody else needs `pos` at `tick` or later
+        flat = self.index(pos)
+
+        parked = self._parked.get(flat)
+        if parked is not None and parked[1] != agent:
+            return False
+
+        latest = self._latest.get(flat)
+        if latest is None or latest < tick:
+            return True
+
+        return all(
+            self._slots.get(t * self._cells + flat) in (None, agent)
+            for t in range(tick, latest + 1)
+        )
+
+    def conflicts(self, agent: Hashable, route: Sequence[TimedPosition], park: bool = True) -> List[Conflict]:
+        # Every reservation of other drones that `route` runs into
+        found = []
+
+        for i, (pos, tick) in enumerate(route):
+
+            owner = self.at(pos, tick)
+
+            if owner is not None and owner != agent:
+                found.append(Conflict(tick, pos, owner))
+                continue
+
+            if i > 0:
+                origin, depart = route[i - 1]
+                if not self.move_allowed(origin, pos, depart, tick, agent):
+                    found.append(Conflict(tick, pos, self.at(pos, depart), swap=True))
+
+        if park and route:
+            pos, tick = route[-1]
+            if not self.can_park(pos, tick, agent):
+                flat = self.index(pos)
+                for t in range(tick, self._latest.get(flat, tick) + 1):
+                    owner = self._slots.get(t * self._cells + flat)
+                    if owner is not None and owner != agent:
+                        found.append(Conflict(t, pos, owner))
+                        break
+
+        return found
+
+    # ------------------- UPDATES -------------------
+
+    def reserve(self, agent: Hashable, route: Sequence[TimedPosition], park: bool = True):
+        # Claims every (cell, tick) of the route, replacing the drone's old claims
+        if agent in self._owned:
+            self.release(agent)
+
+        keys = []
+
+        for pos, tick in route:
+
+            flat = self.index(pos)
+            key = tick * self._cells + flat
+
+            self._slots[key] = agent
+            keys.append(key)
+
+            if tick > self._latest.get(flat, -1):
+                self._latest[flat] = tick
+
+        parked = None
+
+        if park and route:
+            pos, tick = route[-1]
+            parked = self.index(pos)
+            self._parked[parked] = (tick, agent)
+
+        self._owned[agent] = (keys, parked)
+
+    def release(self, agent: Hashable):
+
+        keys, parked = self._owned.pop(agent, ((), None))
+
+        for key in keys:
+            if self._slots.get(key) == agent:
+                del self._slots[key]
+
+        if parked is not None and self._parked.get(parked, (None, None))[1] == agent:
+            del self._parked[parked]
+
+        # _latest stays an upper bound; can_park checks the ticks below it
+
+    def clear(self):
+        self._slots.clear()
+        self._parked.clear()
+        self._latest.clear()
+        self._owned.clear()
@@ -0,0 +1,313 @@
+"""
+Planned-route cache with region-based invalidation.
+
+RouteCache keeps the results of plan() calls keyed by (start, goal,
+payload_weight, battery_capacity, weather version), so a repeated
+depot-to-customer request is answered without a search. The cache is
+bounded, least recently used first out.
+
+GridMap changes are read from its dirty boxes (changes_since) on the
+next lookup, and only the entries they can affect are dropped:
+
+- A route with a voxel inside a changed box may now be blocked. A
+  spatial index from coarse blocks of cells to the routes crossing
+  them finds these candidates without scanning every entry.
+- A changed box that still holds free cells may have been cleared,
+  which can open a cheaper route. A route is dropped only if a path
+  through the box could cost as little as it: the straight-line
+  distance start -> box -> goal times the cheapest cost per unit of
+  distance is a lower bound on any such path. "No route" results are
+  kept the same way, with the battery capacity as their cost.
+
+Adding obstacles or no-fly cells anywhere else never changes an entry,
+so it stays a hit.
+"""
+
+from collections import OrderedDict
+from typing import Dict, Hashable, List, Optional, Set, Tuple
+import itertools
+import math
+
+import numpy as np
+
+from src.environment.grid import GridMap, Position
+
+
+# The 26 unit moves of the planners
+MOVES = [move for move in itertools.product((-1, 0, 1), repeat=3) if move != (0, 0, 0)]
+
+
+class CachedRoute:
+    # One cached plan() result and what invalidation needs to know about it
+    def __init__(
+        self,
+        start: Position,
+        goal: Position,
+        route: Optional[List[Position]],
+        cost: float,
+        unit_cost: float,
+    ):
+        self.start = start
+        self.goal = goal
+
+        # None: the planner found no route
+        self.route = route
+
+        # Planner cost of the route (battery_capacity without one)
+        self.cost = cost
+
+        # Cheapest cost per unit of distance, for lower bounds
+        self.unit_cost = unit_cost
+
+        self.cells = np.asarray(route, dtype=np.int64).reshape(-1, 3) if route else np.empty((0, 3), dtype=np.int64)
+        self.blocks: Set[Tuple[int, int, int]] = set()
+
+    def crosses(self, lo: Position, hi: Position) -> bool:
+        # Any route voxel inside the inclusive box
+        inside = (self.cells >= lo) & (self.cells <= hi)
+        return bool(inside.all(axis=1).any())
+
+    def lower_bound(self, lo: Position, hi: Position) -> float:
+        # Least cost of any start -> goal path through the box
+        def to_box(pos):
+            nearest = [min(max(c, l), h) for c, l, h in zip(pos, lo, hi)]
+            return math.dist(pos, nearest)
+
+        return (to_box(self.start) + to_box(self.goal)) * self.unit_cost
+
+    def __repr__(self) -> str:
+        length = len(self.route) if self.route is not None else None
+        return f"CachedRoute(start={self.start}, goal={self.goal}, length={length}, cost={self.cost:.2f})"
+
+
+class RouteCache:
+    """
+    Size-bounded LRU store of planned routes for one GridMap.
+
+    `plan(planner, start, goal)` answers from the cache or runs the
+    planner and stores its result. `weather` and `battery_model` should
+    be the planner's, they price the cached routes.
+    """
+
+    def __init__(self, env: GridMap, weather=None, battery_model=None, maxsize: int = 1024, block_size: int = 8):
+        self.env = env
+        self.weather = weather
+        self.battery_model = battery_model
+
+        self.maxsize = maxsize
+
+        # Edge of the cubes the spatial index is kept at
+        self.block_size = block_size
+
+        self.hits = 0
+        self.misses = 0
+        self.invalidated = 0
+
+        self._entries: "OrderedDict[Hashable, CachedRoute]" = OrderedDict()
+
+        # Block -> keys of the entries whose route crosses it
+        self._index: Dict[Tuple[int, int, int], Set[Hashable]] = {}
+
+        self._env_version = env.version
+        self._weather_version = self._weather_state()
+
+        self._unit_costs: Dict[float, float] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def key(self, start: Position, goal: Position, payload_weight: float, battery_capacity: float) -> Hashable:
+        return tuple(start), tuple(goal), float(payload_weight), float(battery_capacity), self._weather_state()
+
+    # ------------------- LOOKUPS -------------------
+
+    def plan(self, planner, start: Position, goal: Position) -> Optional[List[Position]]:
+        # planner.plan(start, goal), skipped when an unaffected result is cached
+        payload_weight = planner.payload_weight
+        battery_capacity = planner.battery_capacity
+
+        entry = self.get(start, goal, payload_weight, battery_capacity)
+
+        if entry is not None:
+            return list(entry.route) if entry.route is not None else None
+
+        route = planner.plan(start, goal)
+        self.put(start, goal, payload_weight, battery_capacity, route)
+
+        return route
+
+    def get(self, start: Position, goal: Position, payload_weight: float, battery_capacity: float) -> Optional[CachedRoute]:
+
+        self._sync()
+
+        key = self.key(start, goal, payload_weight, battery_capacity)
+        entry = self._entries.get(key)
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return entry
+
+    def put(
+        self,
+        start: Position,
+        goal: Position,
+        payload_weight: float,
+        battery_capacity: float,
+        route: Optional[List[Position]],
+    ):
+        # Stores a result planned against the current grid and weather
+        self._sync()
+
+        key = self.key(start, goal, payload_weight, battery_capacity)
+
+        if key in self._entries:
+            self._remove(key)
+
+        if route is None:
+            cost = float(battery_capacity)
+        else:
+            route = [tuple(int(v) for v in pos) for pos in route]
+            cost = self._route_cost(route, payload_weight)
+
+        entry = CachedRoute(tuple(start), tuple(goal), route, cost, self._unit_cost(payload_weight))
+
+        self._entries[key] = entry
+
+        for block in {tuple(cell) for cell in (entry.cells // self.block_size).tolist()}:
+            entry.blocks.add(block)
+            self._index.setdefault(block, set()).add(key)
+
+        while len(self._entries) > self.maxsize:
+            self._remove(next(iter(self._entries)))
+
+    def clear(self):
+        self._entries.clear()
+        self._index.clear()
+
+    # ------------------- INVALIDATION -------------------
+
+    def _weather_state(self) -> int:
+        return self.weather.version if self.weather is not None else 0
+
+    def _sync(self):
+        # Drops the entries the grid and weather changes since the last call affect
+        weather_version = self._weather_state()
+
+        if weather_version != self._weather_version:
+            # Old-weather keys can never be looked up again
+            self.invalidated += len(self._entries)
+            self.clear()
+            self._weather_version = weather_version
+
+        if self.env.version == self._env_version:
+            return
+
+        boxes = self.env.changes_since(self._env_version)
+        self._env_version = self.env.version
+
+        if boxes is None:
+            # Change log truncated: nothing is known to be unaffected
+            self.invalidated += len(self._entries)
+            self.clear()
+            return
+
+        for lo, hi in boxes:
+            self.invalidate_region(lo, hi)
+
+    def invalidate_region(self, lo: Position, hi: Position) -> int:
+        # Drops the entries a change inside the inclusive box can affect
+        doomed = {key for key in self._keys_near(lo, hi) if self._entries[key].crosses(lo, hi)}
+
+        # Free cells in the box may be newly opened airspace
+        region = self.env.read_region(lo, hi)
+
+        if region is not None and (region == GridMap.FREE).any():
+            doomed.update(
+                key for key, entry in self._entries.items()
+                if key not in doomed and entry.lower_bound(lo, hi) <= entry.cost
+            )
+
+        for key in doomed:
+            self._remove(key)
+
+        self.invalidated += len(doomed)
+        return len(doomed)
+
+    def _keys_near(self, lo: Position, hi: Position) -> Set[Hashable]:
+        # Keys of the entries whose routes cross a block the box touches
+        first = [c // self.block_size for c in lo]
+        last = [c // self.block_size for c in hi]
+
+        count = math.prod(b - a + 1 for a, b in zip(first, last))
+
+        if count > len(self._index):
+            blocks = [
+                block for block in self._index
+                if all(a <= b <= c for a, b, c in zip(first, block, last))
+            ]
+        else:
+            blocks = itertools.product(*(range(a, b + 1) for a, b in zip(first, last)))
+
+        keys = set()
+        for block in blocks:
+            keys.update(self._index.get(block, ()))
+
+        return keys
+
+    def _remove(self, key: Hashable):
+
+        entry = self._entries.pop(key)
+
+        for block in entry.blocks:
+            keys = self._index[block]
+            keys.discard(key)
+            if not keys:
+                del self._index[block]
+
+    # ------------------- COSTS -------------------
+
+    def _route_cost(self, route: List[Position], payload_weight: float) -> float:
+        # The planners' objective: step costs plus the weather penalty of every entered cell
+        if len(route) < 2:
+            return 0.0
+
+        points = np.asarray(route, dtype=np.int64)
+
+        penalty = 0.0
+        if self.weather:
+            penalty = float(self.weather.costs(points[1:]).sum())
+
+        if self.battery_model:
+            _, cumulative = self.battery_model.route_energy(points, payload_weight, self.weather)
+            return float(cumulative[-1]) + penalty
+
+        return float(np.linalg.norm(np.diff(points, axis=0), axis=1).sum()) + penalty
+
+    def _unit_cost(self, payload_weight: float) -> float:
+        # Cheapest step cost per unit of distance at this payload, weather left out
+        payload_weight = float(payload_weight)
+
+        if payload_weight not in self._unit_costs:
+
+            cost = 1.0
+
+            if self.battery_model:
+                cost = min(
+                    self.battery_model.step_cost((0, 0, 0), move, payload_weight) / math.dist((0, 0, 0), move)
+                    for move in MOVES
+                )
+
+            self._unit_costs[payload_weight] = cost
+
+        return self._unit_costs[payload_weight]
+
+    def __repr__(self) -> str:
+        return (
+            "RouteCache("
+            f"routes={len(self._entries)}/{self.maxsize}, hits={self.hits}, "
+            f"misses={self.misses}, invalidated={self.invalidated})"
+        )
@@ -0,0 +1,163 @@
+"""
+Line-of-sight waypoint compression for grid routes.
+
+Planner routes have one waypoint per voxel and zig-zag on diagonals.
+RouteSmoother replaces runs of them with straight segments wherever
+the segment's voxels (traced exactly, corners included) are free, so
+validation, drawing and the command stream handle a handful of
+waypoints instead of one per voxel.
+
+A shortcut is only taken when it costs no more energy than the grid
+moves it replaces. Climbs are charged at the climb rate over their
+whole 3D length, so long climbing diagonals are often dearer than a
+straight climb followed by level flight, and are kept. A segment is
+charged the worst weather it crosses, which keeps the recomputed
+route energy at or below the original route's.
+"""
+
+from typing import List, Optional
+
+import numpy as np
+
+from src.environment.grid import GridMap, Position, stack_routes, trace_segments
+
+
+class SmoothedRoute:
+    # Compressed route and its energy next to the original's
+    def __init__(
+        self,
+        route: List[Position],
+        energy: Optional[float],
+        original_length: int,
+        original_energy: Optional[float],
+    ):
+        self.route = route
+
+        # Recomputed through BatteryModel; None without a battery model
+        self.energy = energy
+
+        self.original_length = original_length
+        self.original_energy = original_energy
+
+    def __repr__(self) -> str:
+        text = f"SmoothedRoute(waypoints={len(self.route)}/{self.original_length}"
+        if self.energy is not None:
+            text += f", energy={self.energy:.2f}/{self.original_energy:.2f}"
+        return text + ")"
+
+
+class RouteSmoother:
+    """
+    Collapses a voxel-by-voxel route into line-of-sight waypoints.
+
+    From each kept waypoint, the segments to the next `window`
+    waypoints are traced in one batch and the farthest one that is
+    clear and no dearer than the grid moves it replaces is taken.
+    Without a battery model every clear shortcut qualifies.
+    """
+
+    def __init__(
+        self,
+        env: GridMap,
+        battery_model=None,
+        payload_weight=0,
+        weather=None,
+        window: int = 64,
+    ):
+        self.env = env
+        self.battery_model = battery_model
+        self.payload_weight = payload_weight
+        self.weather = weather
+        self.window = window
+
+    def smooth(self, route: List[Position]) -> SmoothedRoute:
+
+        points, _ = stack_routes([route])
+        count = points.shape[1]
+
+        # Energy (or length) of the original route up to every waypoint
+        original = np.concatenate(([0.0], np.cumsum(self._hop_costs(route))))
+
+        keep = [0]
+
+        if count > 2:
+            grid = self.env.view()
+            anchor = 0
+
+            while anchor < count - 1:
+
+                # The next waypoint is always reachable: it is a grid move
+                candidates = np.arange(anchor + 2, min(count, anchor + self.window + 1))
+                best = anchor + 1
+
+                if len(candidates):
+                    budget = original[candidates] - original[anchor]
+                    usable = np.flatnonzero(self._shortcuts(grid, points, anchor, candidates, budget))
+                    if len(usable):
+                        best = int(candidates[usable[-1]])
+
+                keep.append(best)
+                anchor = best
+        else:
+            keep = list(range(count))
+
+        smoothed = [tuple(int(c) for c in points[:, k]) for k in keep]
+
+        energy = None
+        original_energy = None
+
+        if self.battery_model:
+            energy = float(self._hop_costs(smoothed).sum())
+            original_energy = float(original[-1])
+
+        return SmoothedRoute(smoothed, energy, count, original_energy)
+
+    def line_of_sight(self, a: Position, b: Position) -> bool:
+        # True when every voxel strictly between a and b is free
+        cells, _ = trace_segments(
+            np.array(a, dtype=np.int64).reshape(3, 1),
+            np.array(b, dtype=np.int64).reshape(3, 1),
+        )
+        return bool((self.env.view().gather(cells.T) == self.env.FREE).all())
+
+    # ------------------- SHORTCUTS -------------------
+
+    def _hop_costs(self, route) -> np.ndarray:
+        # Energy of every hop through BatteryModel, or its length without one
+        if self.battery_model:
+            steps, _ = self.battery_model.route_energy(route, self.payload_weight, self.weather)
+            return steps
+
+        points, _ = stack_routes([route])
+        dx, dy, dz = np.diff(points, axis=1).astype(np.float64)
+        return np.sqrt(dx*dx + dy*dy + dz*dz)
+
+    def _shortcuts(self, grid, points, anchor: int, candidates: np.ndarray, budget: np.ndarray) -> np.ndarray:
+        # Which segments anchor -> candidate are clear and within budget
+        ends = np.take(points, candidates, axis=1)
+        starts = np.repeat(points[:, anchor:anchor + 1], len(candidates), axis=1)
+
+        cells, owner = trace_segments(starts, ends)
+
+        # Cells between two in-bounds voxels are in bounds as well
+        blocked = grid.gather(cells.T) != self.env.FREE
+        clear = np.bincount(owner[blocked], minlength=len(candidates)) == 0
+
+        if not self.battery_model:
+            return clear
+
+        # Weather-free cost of each segment as one hop, then the worst
+        # penalty along it, end voxel included
+        hops = np.stack([starts, ends], axis=1).transpose(2, 1, 0)
+        cost = np.array([
+            steps[0]
+            for steps, _ in self.battery_model.route_energy_batch(list(hops), self.payload_weight)
+        ])
+
+        if self.weather:
+            worst = np.asarray(self.weather.costs(ends.T), dtype=np.float64)
+            if len(owner):
+                np.maximum.at(worst, owner, self.weather.costs(cells.T))
+            cost = cost * self.battery_model.weather_factor(worst)
+
+        return clear & (cost <= budget * (1 + 1e-9))
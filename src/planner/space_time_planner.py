@@ -0,0 +1,236 @@
+"""
+Time-dependent planning against moving weather.
+
+SpaceTimeGridPlanner searches over (position, time step) states:
+every move takes one time step, and entering a cell at step t pays
+the weather penalty of where the zones are at t, read from a cached
+WeatherTimeVolume. With `wait_cost` set, the drone may also hover in
+place for a step, which lets a route wait for a storm to pass.
+Given a ReservationTable, cells and moves held by other drones are
+skipped and the goal is only accepted once nobody else needs it
+later (cooperative A*, see FleetPlanner).
+
+States later than `horizon` steps after the start share the weather
+(and the time stamp) of the horizon, which keeps the state space
+finite. With static weather and no reservations time changes nothing,
+so the search is GridPlanner's and finds the same routes, as long as
+they fit within the horizon.
+"""
+
+from typing import Dict, Hashable, List, Optional, Tuple
+import heapq
+import math
+
+from src.environment.grid import Position
+from src.planner.planner import GridPlanner
+from src.planner.reservations import ReservationTable, TimedPosition
+from src.planner.stats import PlanStats
+from src.weather.time_volume import WeatherTimeVolume
+
+
+class SpaceTimeGridPlanner(GridPlanner):
+    # GridPlanner whose weather cost depends on the time a cell is entered
+
+    def __init__(
+        self,
+        env,
+        weather=None,
+        battery_model=None,
+        payload_weight=0,
+        battery_capacity=100,
+        start_time: int = 0,
+        horizon: Optional[int] = None,
+        wait_cost: Optional[float] = None,
+        slice_steps: int = 16,
+        max_slices: int = 8,
+        reservations: Optional[ReservationTable] = None,
+        agent: Hashable = None,
+    ):
+        super().__init__(
+            env,
+            weather,
+            battery_model=battery_model,
+            payload_weight=payload_weight,
+            battery_capacity=battery_capacity
+        )
+
+        # Mission time step of the start position; set it before a replan
+        self.start_time = start_time
+
+        self.horizon = horizon if horizon is not None else 4 * sum(env.shape)
+
+        # Energy of hovering one step, None disables waiting
+        self.wait_cost = wait_cost
+
+        # Other drones' claims, checked against as `agent`
+        self.reservations = reservations
+        self.agent = agent
+
+        self.volume = None
+        if weather:
+            self.volume = WeatherTimeVolume(weather, env.shape, slice_steps=slice_steps, max_slices=max_slices)
+
+    def plan_timed(
+        self,
+        start: Position,
+        goal: Position,
+        start_time: Optional[int] = None,
+        stats: Optional[PlanStats] = None,
+    ) -> Optional[List[TimedPosition]]:
+        # Route as (position, time step) pairs; hovers repeat a position
+        if start_time is None:
+            start_time = self.start_time
+
+        if stats is not None:
+            stats.start()
+
+        timed = self._search(start, goal, start_time, stats)
+
+        if stats is not None:
+            stats.finish(timed)
+
+        return timed
+
+    def _astar(self, start: Position, goal: Position, stats: Optional[PlanStats]) -> Optional[List[Position]]:
+        # GridPlanner.plan entry point: the timed route without its times
+        timed = self._search(start, goal, self.start_time, stats)
+
+        if timed is None:
+            return None
+
+        return [pos for pos, _ in timed]
+
+    def _search(self, start: Position, goal: Position, start_time: int, stats: Optional[PlanStats]) -> Optional[List[TimedPosition]]:
+
+        if not self.env.is_traversable(start) or not self.env.is_traversable(goal):
+            return None
+
+        reservations = self.reservations
+        agent = self.agent
+
+        if reservations is not None and not reservations.is_free(start, start_time, agent):
+            return None
+
+        last_time = start_time + self.horizon
+
+        # Nothing changes over time: hovering never pays off and every
+        # arrival time is alike, so the plain position search is exact
+        if reservations is None and (self.volume is None or not self.weather.is_dynamic):
+            route = GridPlanner._astar(self, start, goal, stats)
+
+            # Past the horizon the timed search has no tick to give each step
+            if route is None or len(route) - 1 > self.horizon:
+                return None
+
+            return [(pos, min(start_time + i, last_time)) for i, pos in enumerate(route)]
+
+        weather_plane = None
+        if self.volume is not None:
+            # Slices before the start are never read again
+            self.volume.advance(start_time)
+            weather_plane = self.volume.plane
+
+            if stats is not None:
+                weather_plane = stats.timed("weather_time", weather_plane)
+
+        movement_cost = self._movement_cost
+        if stats is not None:
+            movement_cost = stats.timed("battery_time", movement_cost)
+            expanded = set()
+            stats.heap_pushes = stats.heap_peak = 1
+
+        start_state = (start, start_time)
+
+        open_set: List[Tuple[float, TimedPosition]] = []
+        heapq.heappush(open_set, (0.0, start_state))
+
+        came_from: Dict[TimedPosition, TimedPosition] = {}
+        g_cost: Dict[TimedPosition, float] = {start_state: 0.0}
+
+        # State -> g it was expanded at. States are only compared at the
+        # same tick: a later arrival can be the cheaper one (drifting
+        # weather) or the only one the reservations allow
+        closed: Dict[TimedPosition, float] = {}
+
+        while open_set:
+
+            _, state = heapq.heappop(open_set)
+            current, t = state
+
+            if current == goal and (reservations is None or reservations.can_park(goal, t, agent)):
+                return self._reconstruct_path(came_from, state)
+
+            g = g_cost[state]
+
+            # Stale heap entry for a state already expanded at this cost
+            if closed.get(state, math.inf) <= g:
+                continue
+
+            closed[state] = g
+
+            if stats is not None:
+                stats.expansions += 1
+                if state in expanded:
+                    stats.reexpansions += 1
+                expanded.add(state)
+
+            # Arrival step of every successor, frozen past the horizon
+            arrival = min(t + 1, last_time)
+            plane = weather_plane(arrival) if weather_plane is not None else None
+
+            successors = self._neighbors_3d(current)
+            if self.wait_cost is not None:
+                successors.append(current)
+
+            for neighbor in successors:
+
+                if not self.env.is_traversable(neighbor):
+                    if stats is not None:
+                        stats.pruned_traversability += 1
+                    continue
+
+                if reservations is not None and not reservations.move_allowed(current, neighbor, t, arrival, agent):
+                    if stats is not None:
+                        stats.pruned_reserved += 1
+                    continue
+
+                weather_cost = 0
+                if plane is not None:
+                    weather_cost = float(plane[neighbor[0], neighbor[1]])
+
+                if neighbor == current:
+                    step_cost = self._wait_cost(weather_cost)
+                else:
+                    step_cost = movement_cost(current, neighbor, weather_cost)
+
+                tentative_g = g + step_cost + weather_cost
+
+                # battery constraint check
+                if tentative_g > self.battery_capacity:
+                    if stats is not None:
+                        stats.pruned_battery += 1
+                    continue
+
+                next_state = (neighbor, arrival)
+
+                if next_state not in g_cost or tentative_g < g_cost[next_state]:
+
+                    came_from[next_state] = state
+                    g_cost[next_state] = tentative_g
+
+                    f_cost = tentative_g + self._heuristic(neighbor, goal)
+
+                    heapq.heappush(open_set, (f_cost, next_state))
+
+                    if stats is not None:
+                        stats.heap_pushes += 1
+                        stats.heap_peak = max(stats.heap_peak, len(open_set))
+
+        return None
+
+    def _wait_cost(self, weather_cost) -> float:
+        # Hovering pays the same weather factor as flying
+        if self.battery_model and weather_cost:
+            return self.wait_cost * self.battery_model.weather_factor(weather_cost)
+
+        return self.wait_cost
@@ -0,0 +1,127 @@
+"""
+Per-search planner statistics.
+
+Pass a PlanStats to GridPlanner.plan to find out why a search was
+slow or failed: how many nodes were expanded (and re-expanded through
+the inconsistent heuristic), how much traffic the open heap saw, how
+many neighbors were pruned as blocked versus over the battery
+capacity, and how long the weather and battery cost calls took.
+Without a PlanStats the planner runs its plain loop.
+
+Finished stats are handed to every export hook, both the hooks given
+to the instance and the process-wide ones registered with
+add_stats_hook (a metrics pipeline registers once at startup).
+"""
+
+from typing import Callable, Dict, List, Optional, Sequence
+import time
+
+from src.environment.grid import Position
+
+
+# Process-wide hooks, called with every finished PlanStats
+_hooks: List[Callable[["PlanStats"], None]] = []
+
+
+def add_stats_hook(hook: Callable[["PlanStats"], None]):
+    _hooks.append(hook)
+
+
+def remove_stats_hook(hook: Callable[["PlanStats"], None]):
+    if hook in _hooks:
+        _hooks.remove(hook)
+
+
+class PlanStats:
+    # Counters and timings of one plan() call
+    def __init__(self, hooks: Sequence[Callable[["PlanStats"], None]] = (), labels: Optional[Dict[str, str]] = None):
+        self.hooks = list(hooks)
+
+        # Free-form tags passed through to exporters (mission id, planner ...)
+        self.labels = dict(labels or {})
+
+        self.reset()
+
+    def reset(self):
+
+        self.expansions = 0
+        self.reexpansions = 0
+
+        self.heap_pushes = 0
+        self.heap_peak = 0
+
+        self.pruned_traversability = 0
+        self.pruned_battery = 0
+
+        # Moves into cells other drones reserved (SpaceTimeGridPlanner)
+        self.pruned_reserved = 0
+
+        # Seconds spent in weather lookups and battery step costs
+        self.weather_time = 0.0
+        self.battery_time = 0.0
+        self.total_time = 0.0
+
+        self.found = False
+        self.route_length = 0
+
+        self._started = None
+
+    # ------------------- RECORDING -------------------
+
+    def start(self):
+        # A reused PlanStats records each search from zero
+        self.reset()
+        self._started = time.perf_counter()
+
+    def finish(self, route: Optional[List[Position]]):
+        # Closes the record and hands it to the export hooks
+        if self._started is not None:
+            self.total_time = time.perf_counter() - self._started
+
+        self.found = route is not None
+        self.route_length = len(route) if route is not None else 0
+
+        for hook in self.hooks + _hooks:
+            hook(self)
+
+    def timed(self, field: str, fn: Callable) -> Callable:
+        # Wraps `fn` so its run time accumulates into the `field` attribute
+        clock = time.perf_counter
+
+        def wrapper(*args, **kwargs):
+            started = clock()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                setattr(self, field, getattr(self, field) + clock() - started)
+
+        return wrapper
+
+    # ------------------- EXPORT -------------------
+
+    def to_dict(self) -> Dict:
+        return {
+            "labels": dict(self.labels),
+            "found": self.found,
+            "route_length": self.route_length,
+            "expansions": self.expansions,
+            "reexpansions": self.reexpansions,
+            "heap_pushes": self.heap_pushes,
+            "heap_peak": self.heap_peak,
+            "pruned_traversability": self.pruned_traversability,
+            "pruned_battery": self.pruned_battery,
+            "pruned_reserved": self.pruned_reserved,
+            "weather_time": self.weather_time,
+            "battery_time": self.battery_time,
+            "total_time": self.total_time,
+        }
+
+    def __repr__(self) -> str:
+        return (
+            "PlanStats("
+            f"found={self.found}, expansions={self.expansions}, "
+            f"reexpansions={self.reexpansions}, heap_pushes={self.heap_pushes}, "
+            f"heap_peak={self.heap_peak}, "
+            f"pruned={self.pruned_traversability}+{self.pruned_battery}, "
+            f"total={self.total_time * 1000:.2f}ms)"
+        )
@@ -0,0 +1,69 @@
+"""
+Flat-index view of a 3D voxel grid.
+
+The grid is padded with a one-cell blocked border so every interior
+voxel has all 26 neighbors at fixed index offsets and search loops
+never need a bounds check.
+"""
+
+from typing import List, Tuple
+
+import numpy as np
+
+from src.environment.grid import GridMap, Position
+
+
+# Same order as GridPlanner._neighbors_3d
+NEIGHBOR_OFFSETS: Tuple[Position, ...] = tuple(
+    (dx, dy, dz)
+    for dx in (-1, 0, 1)
+    for dy in (-1, 0, 1)
+    for dz in (-1, 0, 1)
+    if (dx, dy, dz) != (0, 0, 0)
+)
+
+
+class VoxelGraph:
+    # Maps positions to flat indices of the padded grid and back
+    def __init__(self, shape: Tuple[int, int, int]):
+        self.shape = tuple(shape)
+
+        x_size, y_size, z_size = self.shape
+        self.padded_shape = (x_size + 2, y_size + 2, z_size + 2)
+        self.size = int(np.prod(self.padded_shape))
+
+        self.stride_x = self.padded_shape[1] * self.padded_shape[2]
+        self.stride_y = self.padded_shape[2]
+
+        # Flat index delta for each of the 26 moves
+        self.flat_offsets: List[int] = [
+            dx * self.stride_x + dy * self.stride_y + dz
+            for dx, dy, dz in NEIGHBOR_OFFSETS
+        ]
+
+    @classmethod
+    def for_env(cls, env: GridMap) -> "VoxelGraph":
+        return cls((env.x_size, env.y_size, env.z_size))
+
+    def index(self, pos: Position) -> int:
+        # Padded indices keep the lexicographic order of position tuples
+        x, y, z = pos
+        return (x + 1) * self.stride_x + (y + 1) * self.stride_y + (z + 1)
+
+    def position(self, idx: int) -> Position:
+        x, rest = divmod(idx, self.stride_x)
+        y, z = divmod(rest, self.stride_y)
+        return (x - 1, y - 1, z - 1)
+
+    def pad(self, values: np.ndarray, fill) -> np.ndarray:
+        # Flat padded copy of an unpadded (x, y, z) array
+        padded = np.full(self.padded_shape, fill, dtype=values.dtype)
+        padded[1:-1, 1:-1, 1:-1] = values
+        return padded.ravel()
+
+    def free_cells(self, env: GridMap) -> bytes:
+        # 1 for traversable voxels, 0 for blocked ones and the border
+        return self.pad(env.free_mask().astype(np.uint8), 0).tobytes()
+
+    def positions(self, indices) -> List[Position]:
+        return [self.position(idx) for idx in indices]
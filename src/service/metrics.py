@@ -0,0 +1,110 @@
+"""
+Latency and throughput metrics of the planning service.
+
+Every endpoint keeps running totals (count, mean, min, max through
+RunningStat) and a bounded window of its most recent requests, from
+which latency percentiles and the recent request rate are read, so
+memory stays flat however long the service runs.
+"""
+
+from collections import deque
+from typing import Dict, Optional
+import time
+
+import numpy as np
+
+from src.simulation.campaign import RunningStat
+
+
+PERCENTILES = (50, 90, 99)
+
+
+class EndpointMetrics:
+    # Counters and recent latencies of one endpoint
+    def __init__(self, window: int = 1024):
+
+        # Answered requests, and those that failed or were invalid
+        self.requests = 0
+        self.errors = 0
+
+        # Turned away with 503 because the worker queue was full
+        self.rejected = 0
+
+        # Answered by joining an identical request already in flight
+        self.deduplicated = 0
+
+        # Answered from the route cache without planning
+        self.cached = 0
+
+        self.latency = RunningStat()
+
+        # (finish time, seconds) of the most recent requests
+        self._recent = deque(maxlen=window)
+
+    def record(self, seconds: float, error: bool = False, now: Optional[float] = None):
+
+        self.requests += 1
+        if error:
+            self.errors += 1
+
+        self.latency.add(seconds)
+        self._recent.append((time.monotonic() if now is None else now, seconds))
+
+    def percentiles(self) -> Dict[str, float]:
+        # Latency percentiles over the window, in seconds
+        if not self._recent:
+            return {}
+
+        values = np.percentile([seconds for _, seconds in self._recent], PERCENTILES)
+        return {f"p{p}": float(v) for p, v in zip(PERCENTILES, values)}
+
+    def throughput(self, now: float, period: float) -> float:
+        # Requests per second finished within the last `period` seconds
+        since = now - period
+        count = sum(1 for finished, _ in self._recent if finished >= since)
+        return count / period if period > 0 else 0.0
+
+    def to_dict(self, now: float, period: float) -> Dict:
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "rejected": self.rejected,
+            "deduplicated": self.deduplicated,
+            "cached": self.cached,
+            "latency": dict(self.latency.to_dict(), **self.percentiles()),
+            "throughput": self.throughput(now, period),
+        }
+
+
+class ServiceMetrics:
+    # Per-endpoint metrics plus service-wide totals
+    def __init__(self, window: int = 1024, period: float = 60.0):
+        self.window = window
+
+        # Throughput is averaged over this many recent seconds
+        self.period = period
+
+        self.started = time.monotonic()
+        self.endpoints: Dict[str, EndpointMetrics] = {}
+
+    def endpoint(self, name: str) -> EndpointMetrics:
+        metrics = self.endpoints.get(name)
+        if metrics is None:
+            metrics = self.endpoints[name] = EndpointMetrics(self.window)
+        return metrics
+
+    def to_dict(self, **gauges) -> Dict:
+        # `gauges` are point-in-time values (queue depth, workers ...)
+        now = time.monotonic()
+        uptime = now - self.started
+
+        # A young service averages over its whole life, not the full period
+        period = max(min(self.period, uptime), 1e-9)
+
+        return {
+            "uptime": uptime,
+            "requests": sum(m.requests for m in self.endpoints.values()),
+            "throughput": sum(m.throughput(now, period) for m in self.endpoints.values()),
+            **gauges,
+            "endpoints": {name: m.to_dict(now, period) for name, m in sorted(self.endpoints.items())},
+        }
@@ -0,0 +1,429 @@
+"""
+Long-lived planning service state.
+
+PlanningService keeps one environment, weather model and battery
+model in memory and answers plan / validate / preflight requests
+given as JSON-style dicts, independent of the transport (see
+server.py for the HTTP front end).
+
+Plans run on a bounded worker pool shared by all clients. At most
+`max_workers` plans are handed to the pool at once and at most
+`max_pending` may be admitted in total; past that, requests fail
+fast with ServiceBusy instead of queueing without bound. Identical
+plan requests that arrive while one is in flight join it rather than
+planning again, and finished results go to a RouteCache, so a
+repeated request is answered without planning until a grid change
+near its route invalidates it. Process workers build their planner
+once from a snapshot of the environment; when `GridMap.version` or
+the weather version changes, the next plan starts a fresh pool on the
+new state and plans already running finish on the old one. Validation
+and preflight checks are vectorized and cheap, so they run on the
+event loop and always see the live environment.
+"""
+
+from concurrent.futures import BrokenExecutor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+import asyncio
+import multiprocessing
+import os
+import time
+
+from src.battery.battery_model import BatteryModel
+from src.decision.preflight_checker import PreflightChecker, PreflightResult
+from src.environment.grid import Position
+from src.environment.map_file import load_map
+from src.planner import batch
+from src.planner.batch import PlanResult, PlanStatus
+from src.planner.planner import GridPlanner
+from src.planner.route_cache import RouteCache
+from src.service.metrics import ServiceMetrics
+from src.validation.route_validator import RouteValidationResult, RouteValidator
+
+
+ENDPOINTS = ("plan", "validate", "preflight")
+
+PlanJob = Tuple[Position, Position, float, float]  # start, goal, payload, capacity
+
+
+class ServiceBusy(RuntimeError):
+    # The plan queue is full; the client should retry later
+    pass
+
+
+class PlanningService:
+    # Warm environment, worker pool and metrics behind the service endpoints
+
+    def __init__(
+        self,
+        env,
+        weather=None,
+        battery_model=None,
+        planner_cls=GridPlanner,
+        payload_weight: float = 0,
+        battery_capacity: float = 100,
+        executor: str = "process",
+        max_workers: Optional[int] = None,
+        max_pending: int = 64,
+        swept: bool = False,
+        max_route_length: Optional[int] = None,
+        reserve_margin: float = 0.0,
+        metrics_window: int = 1024,
+        route_cache_size: int = 1024,
+    ):
+        if executor not in batch.EXECUTORS:
+            raise ValueError(f"Unknown executor {executor!r}, expected one of {batch.EXECUTORS}")
+
+        self.env = env
+        self.weather = weather
+        self.battery_model = battery_model
+
+        # Template planner: request defaults, and the planner of "serial" mode
+        self.planner = planner_cls(env, weather, battery_model=battery_model)
+        self.planner.payload_weight = payload_weight
+        self.planner.battery_capacity = battery_capacity
+
+        self.validator = RouteValidator(env, swept=swept)
+        self.max_route_length = max_route_length
+        self.reserve_margin = reserve_margin
+
+        self.executor = executor
+        self.max_workers = max(1, max_workers or os.cpu_count() or 1)
+
+        # Admitted plans (running or waiting for a worker) before ServiceBusy
+        self.max_pending = max(1, max_pending)
+
+        self.metrics = ServiceMetrics(window=metrics_window)
+
+        # Finished plans, None when route_cache_size is 0
+        self.route_cache = None
+        if route_cache_size > 0:
+            self.route_cache = RouteCache(env, weather, battery_model, maxsize=route_cache_size)
+
+        self._pool = None
+        self._pool_versions = None
+        self._slots: Optional[asyncio.Semaphore] = None
+
+        # (job, versions) -> task of a plan in flight, for deduplication
+        self._inflight: Dict[tuple, asyncio.Task] = {}
+        self._pending = 0
+        self._running = 0
+
+    @classmethod
+    def from_map(cls, path: str, mmap_mode: Optional[str] = "c", **kwargs) -> "PlanningService":
+        # Service over a saved map; its mission sets the request defaults
+        bundle = load_map(path, mmap_mode=mmap_mode)
+        mission = bundle.mission or {}
+
+        kwargs.setdefault("battery_model", BatteryModel())
+        kwargs.setdefault("payload_weight", mission.get("payload_weight", 0))
+        kwargs.setdefault("battery_capacity", mission.get("battery_capacity", 100))
+
+        return cls(bundle.env, bundle.weather, **kwargs)
+
+    def versions(self) -> Tuple[int, int]:
+        # State the plans are made against
+        return self.env.version, self.weather.version if self.weather is not None else 0
+
+    # ------------------- LIFECYCLE -------------------
+
+    async def start(self):
+        # Spawns the workers up front so the first requests do not pay for it
+        self._slots = asyncio.Semaphore(self.max_workers)
+        self._pool_for_state()
+
+    def close(self):
+
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def _pool_for_state(self):
+        # Pool whose workers plan against the current environment
+        if self.executor == "serial":
+            return None
+
+        # Thread workers share the live objects, process workers hold a copy
+        versions = self.versions() if self.executor == "process" else None
+
+        if self._pool is not None and versions == self._pool_versions:
+            return self._pool
+
+        if self._pool is not None:
+            # Plans already submitted finish on the old workers
+            self._pool.shutdown(wait=False)
+
+        if self.executor == "thread":
+            self._pool = ThreadPoolExecutor(max_workers=self.max_workers)
+        else:
+            # Forking this threaded process can deadlock the children
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=context,
+                initializer=batch._init_worker,
+                initargs=(self.planner,),
+            )
+
+            # Every submit without an idle worker spawns one
+            for _ in range(self.max_workers):
+                self._pool.submit(batch._process_job, None)
+
+        self._pool_versions = versions
+        return self._pool
+
+    # ------------------- ENDPOINTS -------------------
+
+    async def handle(self, endpoint: str, request: Dict) -> Dict:
+        # Runs one endpoint and records its latency
+        if endpoint not in ENDPOINTS:
+            raise ValueError(f"Unknown endpoint {endpoint!r}, expected one of {ENDPOINTS}")
+
+        if not isinstance(request, dict):
+            raise ValueError("Expected a JSON object")
+
+        metrics = self.metrics.endpoint(endpoint)
+        started = time.perf_counter()
+
+        try:
+            response = await getattr(self, endpoint)(request)
+        except ServiceBusy:
+            raise
+        except Exception:
+            metrics.record(time.perf_counter() - started, error=True)
+            raise
+
+        metrics.record(time.perf_counter() - started)
+        return response
+
+    async def plan(self, request: Dict) -> Dict:
+        # {"start", "goal"[, "payload_weight"[, "battery_capacity"]]}
+        result = await self._plan(self._job(request), "plan")
+        return _plan_response(result)
+
+    async def validate(self, request: Dict) -> Dict:
+        # {"route": [[x, y, z], ...]}
+        route = _route(request.get("route"))
+        return _validation_response(self.validator.validate(route))
+
+    async def preflight(self, request: Dict) -> Dict:
+        # A "route" to check, or a plan request whose route is checked
+        payload_weight, battery_capacity = self._mission(request)
+
+        response = {}
+
+        if "route" in request:
+            route = _route(request["route"])
+        else:
+            result = await self._plan(self._job(request), "preflight")
+            route = result.route
+            response["plan"] = _plan_response(result)
+
+        checker = PreflightChecker(
+            self.validator,
+            max_route_length=self.max_route_length,
+            battery_model=self.battery_model,
+            battery_capacity=battery_capacity,
+            payload_weight=payload_weight,
+            weather=self.weather,
+            reserve_margin=self.reserve_margin,
+        )
+
+        response.update(_preflight_response(checker.check(route)))
+        return response
+
+    def status(self) -> Dict:
+        # Point-in-time gauges, for /health and /metrics
+        env_version, weather_version = self.versions()
+
+        return {
+            "executor": self.executor,
+            "workers": self.max_workers,
+            "running": self._running,
+            "pending": self._pending,
+            "max_pending": self.max_pending,
+            "inflight": len(self._inflight),
+            "cached_routes": len(self.route_cache) if self.route_cache is not None else 0,
+            "env_version": env_version,
+            "weather_version": weather_version,
+        }
+
+    def metrics_snapshot(self) -> Dict:
+        return self.metrics.to_dict(**self.status())
+
+    # ------------------- PLANNING -------------------
+
+    def _mission(self, request: Dict) -> Tuple[float, float]:
+        payload_weight = _number(request.get("payload_weight", self.planner.payload_weight), "payload_weight")
+        battery_capacity = _number(request.get("battery_capacity", self.planner.battery_capacity), "battery_capacity")
+        return payload_weight, battery_capacity
+
+    def _job(self, request: Dict) -> PlanJob:
+        start = _position(request.get("start"), "start")
+        goal = _position(request.get("goal"), "goal")
+        return (start, goal) + self._mission(request)
+
+    async def _plan(self, job: PlanJob, endpoint: str) -> PlanResult:
+        # Answers from the cache, joins an identical plan in flight, or admits a new one
+        metrics = self.metrics.endpoint(endpoint)
+
+        if self.route_cache is not None:
+            entry = self.route_cache.get(*job)
+
+            if entry is not None:
+                metrics.cached += 1
+                return _cached_result(job, entry.route)
+
+        versions = self.versions()
+        key = (job, versions)
+
+        task = self._inflight.get(key)
+
+        if task is not None:
+            metrics.deduplicated += 1
+        else:
+            if self._pending >= self.max_pending:
+                metrics.rejected += 1
+                raise ServiceBusy(f"{self._pending} plans pending, limit is {self.max_pending}")
+
+            self._pending += 1
+            task = asyncio.ensure_future(self._run(job, versions))
+            self._inflight[key] = task
+
+            def finished(_, key=key, task=task):
+                self._pending -= 1
+                if self._inflight.get(key) is task:
+                    del self._inflight[key]
+
+            task.add_done_callback(finished)
+
+        # A client hanging up must not cancel the plan for the others
+        return await asyncio.shield(task)
+
+    async def _run(self, job: PlanJob, versions: Tuple[int, int]) -> PlanResult:
+
+        result = await self._execute(job)
+
+        # Only results planned against the state the cache is at are stored
+        if (
+            self.route_cache is not None
+            and result.status in (PlanStatus.OK, PlanStatus.NO_ROUTE)
+            and self.versions() == versions
+        ):
+            self.route_cache.put(*job, result.route)
+
+        return result
+
+    async def _execute(self, job: PlanJob) -> PlanResult:
+
+        if self._slots is None:
+            await self.start()
+
+        async with self._slots:
+
+            self._running += 1
+            pool = None
+
+            try:
+                pool = self._pool_for_state()
+
+                if pool is None:
+                    # The template's settings are the request defaults, put them back
+                    settings = self.planner.payload_weight, self.planner.battery_capacity
+                    try:
+                        return batch._run_job(self.planner, job)
+                    finally:
+                        self.planner.payload_weight, self.planner.battery_capacity = settings
+
+                loop = asyncio.get_running_loop()
+
+                if self.executor == "thread":
+                    return await loop.run_in_executor(pool, batch._thread_job, self.planner, job)
+
+                return await loop.run_in_executor(pool, batch._process_job, job)
+
+            except BrokenExecutor as exc:
+                # A worker died; the next plan starts a new pool
+                if pool is not None and pool is self._pool:
+                    self._pool = None
+                return PlanResult(status=PlanStatus.ERROR, details=repr(exc))
+
+            finally:
+                self._running -= 1
+
+
+# ------------------- REQUEST PARSING -------------------
+
+def _position(value, name: str) -> Position:
+
+    if (
+        not isinstance(value, (list, tuple))
+        or len(value) != 3
+        or not all(isinstance(v, int) and not isinstance(v, bool) for v in value)
+    ):
+        raise ValueError(f"{name} must be three integers [x, y, z], got {value!r}")
+
+    return tuple(value)
+
+
+def _route(value) -> List[Position]:
+
+    if not isinstance(value, (list, tuple)):
+        raise ValueError(f"route must be a list of [x, y, z] positions, got {value!r}")
+
+    return [_position(pos, f"route[{i}]") for i, pos in enumerate(value)]
+
+
+def _number(value, name: str) -> float:
+
+    if isinstance(value, bool) or not isinstance(value, (int, float)) or value < 0:
+        raise ValueError(f"{name} must be a non-negative number, got {value!r}")
+
+    return float(value)
+
+
+# ------------------- RESPONSES -------------------
+
+def _cached_result(job: PlanJob, route: Optional[List[Position]]) -> PlanResult:
+
+    if route is None:
+        start, goal = job[:2]
+        return PlanResult(status=PlanStatus.NO_ROUTE, details=f"No route from {start} to {goal}")
+
+    return PlanResult(status=PlanStatus.OK, route=list(route))
+
+
+def _positions(route) -> Optional[List[List[int]]]:
+    return None if route is None else [[int(v) for v in pos] for pos in route]
+
+
+def _plan_response(result: PlanResult) -> Dict:
+    return {
+        "status": result.status.value,
+        "route": _positions(result.route),
+        "details": result.details,
+    }
+
+
+def _validation_response(result: RouteValidationResult) -> Dict:
+    return {
+        "valid": result.valid,
+        "reason": result.reason.value if result.reason else None,
+        "failing_position": _positions([result.failing_position])[0] if result.failing_position else None,
+        "violations": [
+            {"index": v.index, "position": _positions([v.position])[0], "reason": v.reason.value}
+            for v in result.violations
+        ],
+    }
+
+
+def _preflight_response(result: PreflightResult) -> Dict:
+    return {
+        "decision": result.decision.value,
+        "approved": result.approved(),
+        "reason": result.reason.value if result.reason else None,
+        "details": result.details,
+        "energy": float(result.energy) if result.energy is not None else None,
+        "landing_charge": float(result.landing_charge) if result.landing_charge is not None else None,
+    }
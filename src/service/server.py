@@ -0,0 +1,294 @@
+"""
+Local HTTP front end of the planning service.
+
+A small asyncio HTTP/1.1 server (TCP or a Unix socket) with JSON
+bodies and keep-alive connections:
+
+    POST /plan       {"start": [x, y, z], "goal": [x, y, z],
+                      "payload_weight": 3, "battery_capacity": 300}
+    POST /validate   {"route": [[x, y, z], ...]}
+    POST /preflight  {"route": [...]} or a /plan request
+    GET  /metrics    per-endpoint counts, latency percentiles, throughput
+    GET  /health     liveness and queue gauges
+
+Invalid requests get 400 and a full plan queue gets 503 with a
+Retry-After header. Run it over a saved map:
+
+    python -m src.service.server --map city.map --port 8642
+    python -m src.service.server --map city.map --socket /tmp/planner.sock
+"""
+
+from http import HTTPStatus
+from typing import Dict, Optional, Sequence, Tuple
+import argparse
+import asyncio
+import json
+import os
+import sys
+
+from src.benchmarks.suite import PLANNERS
+from src.planner import batch
+from src.service.planning_service import ENDPOINTS, PlanningService, ServiceBusy
+
+
+# Largest accepted request body and header count
+MAX_BODY = 16 * 1024 * 1024
+MAX_HEADERS = 100
+
+# Seconds a client is asked to wait after a 503
+RETRY_AFTER = 1
+
+
+class HttpError(Exception):
+    # Malformed request; answered with `status` and the connection closed
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class PlanningServer:
+    # Serves one PlanningService over TCP or a Unix socket
+    def __init__(self, service: PlanningService, host: str = "127.0.0.1", port: int = 8642, path: Optional[str] = None):
+        self.service = service
+        self.host = host
+        self.port = port
+
+        # Unix socket path; TCP when None
+        self.path = path
+
+        self._server = None
+
+        # Open connections, closed on shutdown
+        self._connections: Dict[asyncio.Task, asyncio.StreamWriter] = {}
+
+    @property
+    def address(self) -> str:
+
+        if self.path:
+            return f"unix:{self.path}"
+
+        host, port = self._server.sockets[0].getsockname()[:2] if self._server else (self.host, self.port)
+        return f"http://{host}:{port}"
+
+    async def start(self):
+
+        await self.service.start()
+
+        if self.path:
+            self._server = await asyncio.start_unix_server(self._handle, path=self.path)
+        else:
+            self._server = await asyncio.start_server(self._handle, self.host, self.port)
+
+    async def serve_forever(self):
+
+        if self._server is None:
+            await self.start()
+
+        await self._server.serve_forever()
+
+    async def close(self):
+
+        if self._server is not None:
+            self._server.close()
+
+            # Idle keep-alive clients would otherwise hold their handlers open
+            for writer in self._connections.values():
+                writer.close()
+            await asyncio.gather(*self._connections, return_exceptions=True)
+
+            await self._server.wait_closed()
+            self._server = None
+
+        self.service.close()
+
+        if self.path and os.path.exists(self.path):
+            os.unlink(self.path)
+
+    # ------------------- CONNECTIONS -------------------
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+
+        task = asyncio.current_task()
+        self._connections[task] = writer
+
+        try:
+            while True:
+
+                try:
+                    request = await _read_request(reader)
+                except HttpError as exc:
+                    writer.write(_encode_response(exc.status, {"error": str(exc)}, keep_alive=False))
+                    await writer.drain()
+                    break
+
+                if request is None:
+                    break
+
+                method, target, version, headers, body = request
+
+                connection = headers.get("connection", "").lower()
+                keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+
+                status, payload, extra = await self._dispatch(method, target, body)
+
+                writer.write(_encode_response(status, payload, keep_alive, extra))
+                await writer.drain()
+
+                if not keep_alive:
+                    break
+
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+
+        finally:
+            del self._connections[task]
+            writer.close()
+
+    async def _dispatch(self, method: str, target: str, body: bytes) -> Tuple[int, Dict, Dict[str, str]]:
+        # (status, JSON payload, extra headers) of one request
+        path = target.split("?", 1)[0].rstrip("/") or "/"
+
+        if path in ("/health", "/metrics"):
+
+            if method != "GET":
+                return 405, {"error": f"{path} only accepts GET"}, {"Allow": "GET"}
+
+            if path == "/health":
+                return 200, dict(self.service.status(), status="ok"), {}
+
+            return 200, self.service.metrics_snapshot(), {}
+
+        endpoint = path[1:]
+
+        if endpoint not in ENDPOINTS:
+            return 404, {"error": f"Unknown path {path!r}"}, {}
+
+        if method != "POST":
+            return 405, {"error": f"{path} only accepts POST"}, {"Allow": "POST"}
+
+        try:
+            request = json.loads(body or b"{}")
+        except ValueError as exc:
+            return 400, {"error": f"Invalid JSON: {exc}"}, {}
+
+        try:
+            return 200, await self.service.handle(endpoint, request), {}
+        except ServiceBusy as exc:
+            return 503, {"error": str(exc)}, {"Retry-After": str(RETRY_AFTER)}
+        except ValueError as exc:
+            return 400, {"error": str(exc)}, {}
+        except Exception as exc:
+            return 500, {"error": repr(exc)}, {}
+
+
+async def _read_request(reader: asyncio.StreamReader):
+    # (method, target, version, headers, body), or None once the client is done
+    try:
+        line = await reader.readline()
+    except ValueError:
+        raise HttpError(400, "Request line too long")
+
+    if not line:
+        return None
+
+    parts = line.decode("latin-1").split()
+
+    if len(parts) != 3 or not parts[2].startswith("HTTP/"):
+        raise HttpError(400, "Malformed request line")
+
+    method, target, version = parts
+    headers: Dict[str, str] = {}
+
+    while True:
+
+        try:
+            line = await reader.readline()
+        except ValueError:
+            raise HttpError(431, "Header line too long")
+
+        if line in (b"\r\n", b"\n", b""):
+            break
+
+        if len(headers) >= MAX_HEADERS:
+            raise HttpError(431, "Too many headers")
+
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+
+    try:
+        length = int(headers.get("content-length", 0))
+    except ValueError:
+        raise HttpError(400, "Invalid Content-Length")
+
+    if length < 0:
+        raise HttpError(400, "Invalid Content-Length")
+
+    if length > MAX_BODY:
+        raise HttpError(413, f"Body over {MAX_BODY} bytes")
+
+    body = await reader.readexactly(length) if length else b""
+
+    return method.upper(), target, version, headers, body
+
+
+def _encode_response(status: int, payload: Dict, keep_alive: bool, headers: Optional[Dict[str, str]] = None) -> bytes:
+
+    body = json.dumps(payload).encode()
+
+    lines = [
+        f"HTTP/1.1 {status} {HTTPStatus(status).phrase}",
+        "Content-Type: application/json",
+        f"Content-Length: {len(body)}",
+        f"Connection: {'keep-alive' if keep_alive else 'close'}",
+    ]
+    lines.extend(f"{name}: {value}" for name, value in (headers or {}).items())
+
+    return ("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body
+
+
+# ------------------- CLI -------------------
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+
+    parser = argparse.ArgumentParser(description="Serve plan / validate / preflight requests over a saved map.")
+    parser.add_argument("--map", required=True, help="map directory to plan in (see python -m src.main --save-map)")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8642)
+    parser.add_argument("--socket", help="listen on this Unix socket instead of TCP")
+    parser.add_argument("--planner", choices=sorted(PLANNERS), default="grid")
+    parser.add_argument("--executor", choices=batch.EXECUTORS, default="process")
+    parser.add_argument("--workers", type=int, help="planning workers (default: CPU count)")
+    parser.add_argument("--max-pending", type=int, default=64, help="admitted plans before answering 503")
+    parser.add_argument("--swept", action="store_true", help="validate every voxel a segment crosses")
+
+    args = parser.parse_args(argv)
+
+    service = PlanningService.from_map(
+        args.map,
+        planner_cls=PLANNERS[args.planner],
+        executor=args.executor,
+        max_workers=args.workers,
+        max_pending=args.max_pending,
+        swept=args.swept,
+    )
+
+    server = PlanningServer(service, host=args.host, port=args.port, path=args.socket)
+
+    async def run():
+        await server.start()
+        print(f"🛰 Planning service on {server.address} ({service.executor}, {service.max_workers} workers)", file=sys.stderr)
+        try:
+            await server.serve_forever()
+        finally:
+            await server.close()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,446 @@
+"""
+Seeded Monte Carlo mission campaigns.
+
+A campaign sweeps seeds, payloads, battery capacities, weather presets
+and pop-up obstacle rates. Each run builds its own world from the main
+scenario (a no-fly cuboid, scattered buildings and trees, generated
+weather), then plans, runs the preflight gate and flies the mission in
+the headless engine. Every random draw comes from RNGs seeded by the
+run's seed, so a run gives the same result in any process and in any
+order. The world depends only on the seed and weather preset, so the
+other parameters are compared on identical worlds.
+
+Runs are spread over a process pool with a bounded number in flight.
+Each finished run is appended to a JSON-lines file, and aggregates per
+parameter group are kept as running statistics and rewritten to a
+summary JSON file as the campaign goes, so memory stays flat however
+long the sweep is.
+"""
+
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+import itertools
+import json
+import math
+import os
+import random
+import time
+
+from src.battery.battery_model import BatteryModel
+from src.decision.preflight_checker import PreflightChecker
+from src.environment.constraints import add_cuboid_no_fly_zone
+from src.environment.grid import GridMap, Position
+from src.planner.planner import GridPlanner
+from src.simulation.engine import SimulationEngine
+from src.simulation.world import PopUpObstacles, scatter_buildings, scatter_trees
+from src.validation.route_validator import RouteValidator
+from src.weather.weather_model import WeatherModel
+
+
+# Zone counts passed to WeatherModel.generate_weather
+WEATHER_PRESETS: Dict[str, Dict[str, int]] = {
+    "clear": {"rain": 0, "wind": 0, "storm": 0},
+    "default": {"rain": 2, "wind": 2, "storm": 1},
+    "severe": {"rain": 3, "wind": 3, "storm": 3},
+}
+
+EXECUTORS = ("process", "serial")
+
+
+class MissionSpec:
+    # Parameters of one campaign run; the scenario defaults match main.py
+    def __init__(
+        self,
+        run: int,
+        seed: int,
+        payload_weight: float,
+        battery_capacity: float,
+        weather: str = "default",
+        obstacle_rate: float = 0.0,
+        shape: Tuple[int, int, int] = (20, 20, 10),
+        start: Position = (0, 0, 2),
+        goal: Position = (19, 19, 3),
+        planner_cls=GridPlanner,
+    ):
+        if weather not in WEATHER_PRESETS:
+            raise ValueError(f"Unknown weather preset {weather!r}, expected one of {tuple(WEATHER_PRESETS)}")
+
+        self.run = run
+        self.seed = seed
+        self.payload_weight = payload_weight
+        self.battery_capacity = battery_capacity
+        self.weather = weather
+        self.obstacle_rate = obstacle_rate
+        self.shape = tuple(shape)
+        self.start = tuple(start)
+        self.goal = tuple(goal)
+        self.planner_cls = planner_cls
+
+    def group(self) -> Tuple:
+        # Runs with equal groups differ only in their seed
+        return (self.payload_weight, self.battery_capacity, self.weather, self.obstacle_rate)
+
+    def __repr__(self) -> str:
+        return (
+            "MissionSpec("
+            f"run={self.run}, seed={self.seed}, payload={self.payload_weight}, "
+            f"capacity={self.battery_capacity}, weather={self.weather}, "
+            f"obstacle_rate={self.obstacle_rate})"
+        )
+
+
+def campaign_specs(
+    seeds: Iterable[int],
+    payload_weights: Sequence[float],
+    battery_capacities: Sequence[float],
+    weather: Sequence[str] = ("default",),
+    obstacle_rates: Sequence[float] = (0.0,),
+    **scenario,
+) -> Iterator[MissionSpec]:
+    # Full sweep, generated lazily; `scenario` goes to every MissionSpec
+    grid = itertools.product(seeds, payload_weights, battery_capacities, weather, obstacle_rates)
+
+    for run, (seed, payload_weight, battery_capacity, preset, rate) in enumerate(grid):
+        yield MissionSpec(run, seed, payload_weight, battery_capacity, preset, rate, **scenario)
+
+
+# ------------------- SINGLE RUN -------------------
+
+def run_mission(spec: MissionSpec) -> dict:
+    """
+    Plan, preflight-check and fly one mission, returning a JSON-ready record.
+
+    `preflight` is the rejection reason or "go"; `outcome` is the
+    MissionOutcome value, or None when the mission never took off.
+    """
+
+    started = time.perf_counter()
+
+    # Separate streams, so adding draws to one never shifts the others
+    world_rng = random.Random(f"{spec.seed}/world")
+    weather_rng = random.Random(f"{spec.seed}/weather/{spec.weather}")
+    flight_rng = random.Random(f"{spec.seed}/flight")
+
+    env = GridMap(*spec.shape)
+    add_cuboid_no_fly_zone(env, (10, 10, 2), (12, 12, 5))
+    scatter_buildings(env, world_rng, spec.start, spec.goal)
+    scatter_trees(env, world_rng)
+
+    weather = WeatherModel()
+    weather.generate_weather(env.x_size, env.y_size, env.z_size, rng=weather_rng, **WEATHER_PRESETS[spec.weather])
+
+    battery_model = BatteryModel()
+
+    planner = spec.planner_cls(
+        env,
+        weather,
+        battery_model=battery_model,
+        payload_weight=spec.payload_weight,
+        battery_capacity=spec.battery_capacity
+    )
+
+    route = planner.plan(spec.start, spec.goal)
+    planned = time.perf_counter()
+
+    preflight = PreflightChecker(
+        RouteValidator(env),
+        max_route_length=500,
+        battery_model=battery_model,
+        battery_capacity=spec.battery_capacity,
+        payload_weight=spec.payload_weight,
+        weather=weather,
+        reserve_margin=0.1
+    ).check(route)
+
+    record = {
+        "run": spec.run,
+        "seed": spec.seed,
+        "payload_weight": spec.payload_weight,
+        "battery_capacity": spec.battery_capacity,
+        "weather": spec.weather,
+        "obstacle_rate": spec.obstacle_rate,
+        "preflight": "go" if preflight.approved() else preflight.reason.value,
+        "outcome": None,
+        "success": False,
+        "steps": 0,
+        "replans": 0,
+        "energy_used": 0.0,
+        "battery_ratio": 1.0,
+        "plan_seconds": planned - started,
+    }
+
+    if preflight.approved():
+
+        engine = SimulationEngine(
+            env,
+            planner,
+            spec.start,
+            spec.goal,
+            battery_model=battery_model,
+            payload_weight=spec.payload_weight,
+            battery_capacity=spec.battery_capacity,
+            weather=weather,
+            observers=[PopUpObstacles(flight_rng, spec.obstacle_rate)],
+            route=route,
+        )
+        result = engine.run()
+
+        record.update(
+            outcome=result.outcome.value,
+            success=result.success(),
+            steps=result.steps,
+            replans=result.replans,
+            energy_used=result.energy_used,
+            battery_ratio=result.battery_ratio,
+        )
+
+    record["seconds"] = time.perf_counter() - started
+    return record
+
+
+def _run_chunk(specs: List[MissionSpec]) -> List[dict]:
+    return [run_mission(spec) for spec in specs]
+
+
+# ------------------- AGGREGATION -------------------
+
+class RunningStat:
+    # Count, mean, variance (Welford), min and max in O(1) memory
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value: float):
+
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (value - self.mean)
+
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self._m2 / (self.count - 1)) if self.count > 1 else 0.0
+
+    def to_dict(self) -> dict:
+
+        if not self.count:
+            return {"count": 0}
+
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "std": self.std,
+            "min": self.min,
+            "max": self.max,
+        }
+
+
+class GroupStats:
+    # Aggregates of all runs of one parameter group
+    def __init__(self):
+        self.runs = 0
+        self.successes = 0
+        self.preflight: Dict[str, int] = {}
+        self.outcomes: Dict[str, int] = {}
+
+        # Flown missions only
+        self.energy = RunningStat()
+        self.replans = RunningStat()
+        self.steps = RunningStat()
+
+        self.seconds = RunningStat()
+
+    def add(self, record: dict):
+
+        self.runs += 1
+        self.successes += bool(record["success"])
+        self.preflight[record["preflight"]] = self.preflight.get(record["preflight"], 0) + 1
+        self.seconds.add(record["seconds"])
+
+        if record["outcome"] is None:
+            return
+
+        self.outcomes[record["outcome"]] = self.outcomes.get(record["outcome"], 0) + 1
+        self.energy.add(record["energy_used"])
+        self.replans.add(record["replans"])
+        self.steps.add(record["steps"])
+
+    def to_dict(self) -> dict:
+        return {
+            "runs": self.runs,
+            "success_rate": self.successes / self.runs if self.runs else 0.0,
+            "preflight": self.preflight,
+            "outcomes": self.outcomes,
+            "energy_used": self.energy.to_dict(),
+            "replans": self.replans.to_dict(),
+            "steps": self.steps.to_dict(),
+            "seconds": self.seconds.to_dict(),
+        }
+
+
+class CampaignStats:
+    # Running aggregates per (payload, capacity, weather, obstacle rate)
+    def __init__(self):
+        self.total = GroupStats()
+        self.groups: Dict[Tuple, GroupStats] = {}
+
+    def add(self, record: dict):
+
+        key = (
+            record["payload_weight"],
+            record["battery_capacity"],
+            record["weather"],
+            record["obstacle_rate"],
+        )
+
+        self.total.add(record)
+        self.groups.setdefault(key, GroupStats()).add(record)
+
+    def to_dict(self) -> dict:
+        return {
+            "total": self.total.to_dict(),
+            "groups": [
+                dict(
+                    payload_weight=key[0],
+                    battery_capacity=key[1],
+                    weather=key[2],
+                    obstacle_rate=key[3],
+                    **stats.to_dict(),
+                )
+                for key, stats in sorted(self.groups.items(), key=lambda item: repr(item[0]))
+            ],
+        }
+
+    def write(self, path: str):
+        # Atomic rewrite, readers never see a half-written summary
+        partial = path + ".tmp"
+        with open(partial, "w") as handle:
+            json.dump(self.to_dict(), handle, indent=2)
+        os.replace(partial, path)
+
+
+# ------------------- CAMPAIGN -------------------
+
+def _load_records(path: str, stats: "CampaignStats", done: set):
+    # Counts the records of an earlier run. A torn last line (the run was
+    # killed mid-write) is cut off, so appended records start on a clean line
+    end = 0
+
+    with open(path, "rb+") as handle:
+
+        for number, line in enumerate(handle, 1):
+
+            try:
+                record = json.loads(line) if line.strip() else None
+            except ValueError:
+                if handle.read(1):
+                    raise ValueError(f"{path}:{number}: unreadable record before the end of the file")
+                break
+
+            end += len(line)
+
+            if record is not None:
+                done.add(record["run"])
+                stats.add(record)
+
+        handle.truncate(end)
+
+        if end:
+            handle.seek(end - 1)
+            if handle.read(1) != b"\n":
+                handle.write(b"\n")
+
+
+def run_campaign(
+    specs: Iterable[MissionSpec],
+    records_path: str,
+    summary_path: Optional[str] = None,
+    executor: str = "process",
+    max_workers: Optional[int] = None,
+    chunksize: int = 8,
+    summary_every: int = 100,
+    resume: bool = False,
+) -> CampaignStats:
+    """
+    Run every spec, streaming records and aggregates to disk as they finish.
+
+    Records are appended to `records_path` (JSON lines, in completion
+    order, each with its `run` number). The summary goes to
+    `summary_path` (default: records_path + ".summary.json") every
+    `summary_every` runs and at the end. With `resume`, runs already
+    in the records file are counted and skipped. Specs are consumed
+    lazily; at most a few chunks per worker are in flight.
+    """
+
+    if executor not in EXECUTORS:
+        raise ValueError(f"Unknown executor {executor!r}, expected one of {EXECUTORS}")
+
+    if summary_path is None:
+        summary_path = records_path + ".summary.json"
+
+    stats = CampaignStats()
+    done = set()
+
+    if resume and os.path.exists(records_path):
+        _load_records(records_path, stats, done)
+
+    pending = (spec for spec in specs if spec.run not in done)
+    chunks = iter(lambda: list(itertools.islice(pending, chunksize)), [])
+
+    with open(records_path, "a" if resume else "w") as records:
+
+        since_summary = 0
+
+        def collect(batch: List[dict]):
+
+            nonlocal since_summary
+
+            for record in batch:
+                records.write(json.dumps(record) + "\n")
+                stats.add(record)
+
+            records.flush()
+
+            since_summary += len(batch)
+            if since_summary >= summary_every:
+                stats.write(summary_path)
+                since_summary = 0
+
+        if executor == "serial" or max_workers == 1:
+            for chunk in chunks:
+                collect(_run_chunk(chunk))
+
+        else:
+            if max_workers is None:
+                max_workers = os.cpu_count() or 1
+
+            with ProcessPoolExecutor(max_workers=max_workers) as pool:
+
+                # Bounded window: a few chunks per worker keeps the pool busy
+                in_flight = set()
+
+                for chunk in itertools.chain(chunks, [None]):
+
+                    if chunk is not None:
+                        in_flight.add(pool.submit(_run_chunk, chunk))
+
+                        if len(in_flight) < max_workers * 2:
+                            continue
+
+                    while in_flight:
+                        finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+
+                        for future in finished:
+                            collect(future.result())
+
+                        if chunk is not None:
+                            break
+
+    stats.write(summary_path)
+    return stats
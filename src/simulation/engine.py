@@ -0,0 +1,318 @@
+"""
+Headless mission simulation.
+
+SimulationEngine flies a planned route in discrete steps with the
+mission rules of the interactive simulator: battery drain per move
+through BatteryModel, abort below 10% charge, a flat energy penalty
+per replan and a two-waypoint obstacle lookahead. It never sleeps or
+renders, so a mission runs as fast as planning allows. Rendering,
+logging or scripted disturbances attach as SimulationObserver
+instances and are called at every event.
+"""
+
+from enum import Enum
+from typing import List, Optional, Sequence
+
+from src.environment.grid import GridMap, Position
+
+
+class MissionOutcome(Enum):
+    # How a simulated mission ended
+    GOAL_REACHED = "goal_reached"
+    NO_PATH = "no_path"
+    NO_ALTERNATE_PATH = "no_alternate_path"
+    BATTERY_CRITICAL = "battery_critical"
+    BATTERY_DEPLETED = "battery_depleted"
+    ROUTE_EXHAUSTED = "route_exhausted"
+    STEP_LIMIT = "step_limit"
+
+
+class MissionResult:
+    # Final state of a simulated mission
+    def __init__(
+        self,
+        outcome: MissionOutcome,
+        position: Position,
+        battery_remaining: float,
+        battery_capacity: float,
+        steps: int,
+        replans: int,
+        flown: List[Position],
+    ):
+        self.outcome = outcome
+        self.position = position
+        self.battery_remaining = battery_remaining
+        self.battery_capacity = battery_capacity
+        self.steps = steps
+        self.replans = replans
+
+        # Every position the drone occupied, start included
+        self.flown = flown
+
+    @property
+    def energy_used(self) -> float:
+        return self.battery_capacity - self.battery_remaining
+
+    @property
+    def battery_ratio(self) -> float:
+        return self.battery_remaining / self.battery_capacity
+
+    def success(self) -> bool:
+        return self.outcome == MissionOutcome.GOAL_REACHED
+
+    def __repr__(self) -> str:
+        return (
+            "MissionResult("
+            f"outcome={self.outcome}, position={self.position}, "
+            f"battery={self.battery_ratio * 100:.1f}%, "
+            f"steps={self.steps}, replans={self.replans})"
+        )
+
+
+class SimulationObserver:
+    # Hooks called by SimulationEngine; every one is optional
+
+    def on_start(self, engine: "SimulationEngine"):
+        # Initial route planned (engine.path), before the first step
+        pass
+
+    def on_step(self, engine: "SimulationEngine", origin: Position, target: Position, energy: float):
+        # Energy for the next move was drained, the drone has not moved yet
+        pass
+
+    def on_move(self, engine: "SimulationEngine", origin: Position, target: Position):
+        # The drone reached `target`
+        pass
+
+    def on_obstacle(self, engine: "SimulationEngine"):
+        # Obstacle ahead, replan penalty drained, replanning next
+        pass
+
+    def on_replan(self, engine: "SimulationEngine", route: Optional[List[Position]]):
+        # Result of the replan, None when no route was found
+        pass
+
+    def on_finish(self, engine: "SimulationEngine", result: MissionResult):
+        pass
+
+
+class SimulationEngine:
+    """
+    Discrete-step mission simulation without rendering or delays.
+
+    Each step() either moves the drone one waypoint or handles an
+    obstacle inside the lookahead by draining the replan penalty and
+    replanning from the current position. run() steps until the
+    mission ends and returns its MissionResult. The environment may
+    change between steps (from an observer, for instance); the
+    lookahead picks that up like a sensor would.
+    """
+
+    # Abort the mission below this fraction of the battery capacity
+    CRITICAL_RATIO = 0.1
+
+    # Observers warn below this fraction
+    LOW_RATIO = 0.3
+
+    def __init__(
+        self,
+        env: GridMap,
+        planner,
+        start: Position,
+        goal: Position,
+        battery_model=None,
+        payload_weight=0.0,
+        battery_capacity=300.0,
+        weather=None,
+        replan_penalty=10.0,
+        lookahead: int = 2,
+        max_steps: Optional[int] = None,
+        observers: Sequence[SimulationObserver] = (),
+        route: Optional[List[Position]] = None,
+    ):
+        self.env = env
+        self.planner = planner
+
+        self.start = start
+        self.goal = goal
+
+        self.battery_model = battery_model
+        self.payload_weight = payload_weight
+        self.battery_capacity = battery_capacity
+        self.weather = weather
+
+        self.replan_penalty = replan_penalty
+        self.lookahead = lookahead
+        self.max_steps = max_steps
+
+        self.observers: List[SimulationObserver] = list(observers)
+
+        # Already planned (and checked) route to fly first, planned when None
+        self.initial_route = route
+
+        self.reset()
+
+    def attach(self, observer: SimulationObserver):
+        self.observers.append(observer)
+
+    def detach(self, observer: SimulationObserver):
+        self.observers.remove(observer)
+
+    def reset(self):
+
+        self.current_pos = self.start
+        self.path: Optional[List[Position]] = None
+        self.route_index = 0
+
+        self.battery_remaining = self.battery_capacity
+        self.total_steps = 0
+        self.replans = 0
+        self.flown = [self.start]
+
+        self.result: Optional[MissionResult] = None
+
+    @property
+    def battery_ratio(self) -> float:
+        return self.battery_remaining / self.battery_capacity
+
+    @property
+    def finished(self) -> bool:
+        return self.result is not None
+
+    # ------------------- MISSION -------------------
+
+    def run(self) -> MissionResult:
+
+        while not self.finished:
+            self.step()
+
+        return self.result
+
+    def step(self) -> Optional[MissionResult]:
+        # Advance by one event; returns the result once the mission ended
+        if self.finished:
+            return self.result
+
+        if self.path is None:
+            return self._begin()
+
+        if self.current_pos == self.goal:
+            return self._finish(MissionOutcome.GOAL_REACHED)
+
+        if self.route_index >= len(self.path) - 1:
+            return self._finish(MissionOutcome.ROUTE_EXHAUSTED)
+
+        if self.max_steps is not None and self.total_steps >= self.max_steps:
+            return self._finish(MissionOutcome.STEP_LIMIT)
+
+        if self.obstacle_ahead():
+            return self._replan()
+
+        return self._advance()
+
+    def obstacle_ahead(self) -> bool:
+
+        for i in range(1, self.lookahead + 1):
+
+            if self.route_index + i >= len(self.path):
+                return False
+
+            cell = self.path[self.route_index + i]
+
+            if not self.env.is_traversable(cell):
+                return True
+
+        return False
+
+    # ------------------- EVENTS -------------------
+
+    def _begin(self) -> Optional[MissionResult]:
+
+        if self.initial_route is not None:
+            self.path = list(self.initial_route)
+        else:
+            self.path = self.planner.plan(self.start, self.goal)
+
+        self.route_index = 0
+
+        if self.path is None:
+            return self._finish(MissionOutcome.NO_PATH)
+
+        for observer in self.observers:
+            observer.on_start(self)
+
+        return None
+
+    def _replan(self) -> Optional[MissionResult]:
+
+        self.battery_remaining -= self.replan_penalty
+        self.replans += 1
+
+        for observer in self.observers:
+            observer.on_obstacle(self)
+
+        if self.battery_remaining <= 0:
+            return self._finish(MissionOutcome.BATTERY_DEPLETED)
+
+        new_path = self.planner.plan(self.current_pos, self.goal)
+
+        for observer in self.observers:
+            observer.on_replan(self, new_path)
+
+        if new_path is None:
+            return self._finish(MissionOutcome.NO_ALTERNATE_PATH)
+
+        self.path = new_path
+        self.route_index = 0
+        return None
+
+    def _advance(self) -> Optional[MissionResult]:
+
+        origin = self.current_pos
+        target = self.path[self.route_index + 1]
+
+        if self.battery_model:
+            energy = self.battery_model.step_cost(
+                origin,
+                target,
+                self.payload_weight,
+                self.weather
+            )
+        else:
+            energy = 0
+
+        self.battery_remaining -= energy
+        self.total_steps += 1
+
+        for observer in self.observers:
+            observer.on_step(self, origin, target, energy)
+
+        # The drone lands where it is rather than flying the step
+        if self.battery_ratio < self.CRITICAL_RATIO:
+            return self._finish(MissionOutcome.BATTERY_CRITICAL)
+
+        self.current_pos = target
+        self.route_index += 1
+        self.flown.append(target)
+
+        for observer in self.observers:
+            observer.on_move(self, origin, target)
+
+        return None
+
+    def _finish(self, outcome: MissionOutcome) -> MissionResult:
+
+        self.result = MissionResult(
+            outcome,
+            self.current_pos,
+            self.battery_remaining,
+            self.battery_capacity,
+            self.total_steps,
+            self.replans,
+            self.flown,
+        )
+
+        for observer in self.observers:
+            observer.on_finish(self, self.result)
+
+        return self.result
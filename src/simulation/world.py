@@ -0,0 +1,89 @@
+"""
+Procedural mission worlds.
+
+The obstacle layout the interactive simulator scatters (buildings,
+trees) and the towers a user clicks in mid-flight, without any
+rendering. Every function takes a random.Random, so a run is fully
+determined by its seed and can be repeated in any worker process.
+"""
+
+from typing import List, Tuple
+import random
+
+from src.environment.grid import GridMap, Position
+from src.simulation.engine import SimulationEngine, SimulationObserver
+
+
+def scatter_buildings(env: GridMap, rng: random.Random, start: Position, goal: Position, count: int = 30) -> List[Tuple[int, int, int]]:
+    # Adds building columns as obstacles; returns their (x, y, height)
+    x_size, y_size, _ = env.shape
+
+    buildings = []
+
+    for _ in range(count):
+
+        x = rng.randint(2, x_size-3)
+        y = rng.randint(2, y_size-3)
+
+        if (x, y) == (start[0], start[1]) or (x, y) == (goal[0], goal[1]):
+            continue
+
+        height = rng.randint(3, 7)
+
+        env.fill_region((x, y, 0), (x, y, height), env.OBSTACLE)
+        buildings.append((x, y, height))
+
+    return buildings
+
+
+def scatter_trees(env: GridMap, rng: random.Random, count: int = 20) -> List[Tuple[float, float]]:
+    # Adds trees as 3-cell obstacle columns; returns their (x, y) centers
+    trees = []
+
+    for _ in range(count):
+
+        x = rng.uniform(0, env.x_size)
+        y = rng.uniform(0, env.y_size)
+
+        gx = int(x)
+        gy = int(y)
+
+        env.fill_region((gx, gy, 0), (gx, gy, 2), env.OBSTACLE)
+        trees.append((x, y))
+
+    return trees
+
+
+class PopUpObstacles(SimulationObserver):
+    """
+    Raises obstacle towers on the route ahead during a mission.
+
+    After each move, with probability `rate`, a tower of `height`
+    cells is placed under a random waypoint inside the engine's
+    lookahead, like a user click in the interactive simulator. The
+    goal and the drone's own column are never blocked.
+    """
+
+    def __init__(self, rng: random.Random, rate: float, height: int = 6):
+        self.rng = rng
+        self.rate = rate
+        self.height = height
+
+        self.placed: List[Position] = []
+
+    def on_move(self, engine: SimulationEngine, origin: Position, target: Position):
+
+        if self.rate <= 0 or self.rng.random() >= self.rate:
+            return
+
+        ahead = engine.path[engine.route_index + 1:engine.route_index + 1 + engine.lookahead]
+        kept = (engine.goal[:2], engine.current_pos[:2])
+        ahead = [cell for cell in ahead if cell[:2] not in kept]
+
+        if not ahead:
+            return
+
+        x, y, _ = self.rng.choice(ahead)
+
+        engine.env.fill_region((x, y, 0), (x, y, self.height - 1), engine.env.OBSTACLE)
+        self.placed.append((x, y, self.height))
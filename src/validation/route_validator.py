@@ -1,12 +1,21 @@
 """
 Deterministic verification of planned routes against
 environment constraints.
+
+Routes are checked as index arrays: all waypoints of all routes in a
+batch are looked up with a single gather on a copy-on-write view of
+the grid, and every violation is reported, not just the first. With
+`swept=True` every voxel a segment passes through is checked as well,
+including the corners a diagonal move cuts across, so any-angle routes
+with long segments validate too.
 """
 
 from enum import Enum
-from typing import List, Optional
+from typing import List, Optional, Sequence
+
+import numpy as np
 
-from src.environment.grid import GridMap, Position
+from src.environment.grid import GridMap, Position, stack_routes, trace_segments
 
 
 class RouteInvalidReason(Enum):
@@ -15,6 +24,21 @@ class RouteInvalidReason(Enum):
     OUT_OF_BOUNDS = "out_of_bounds"
     OBSTACLE = "obstacle"
     NO_FLY_ZONE = "no_fly_zone"
+    SEGMENT_BLOCKED = "segment_blocked"
+
+
+class RouteViolation:
+    # One failing waypoint, or one blocked cell swept by a segment
+    def __init__(self, index: int, position: Position, reason: RouteInvalidReason):
+        self.index = index
+        self.position = position
+        self.reason = reason
+
+    def __repr__(self) -> str:
+        return (
+            "RouteViolation("
+            f"index={self.index}, position={self.position}, reason={self.reason})"
+        )
 
 
 class RouteValidationResult:
@@ -24,11 +48,15 @@ class RouteValidationResult:
         valid: bool,
         reason: Optional[RouteInvalidReason] = None,
         failing_position: Optional[Position] = None,
+        violations: Optional[List[RouteViolation]] = None,
     ):
         self.valid = valid
         self.reason = reason
         self.failing_position = failing_position
 
+        # Every violation in route order; reason / failing_position mirror the first
+        self.violations = violations or []
+
     def __bool__(self) -> bool:
         # Allows `if result:` style checks
         return self.valid
@@ -40,14 +68,16 @@ class RouteValidationResult:
         return (
             "RouteValidationResult("
             f"valid=False, reason={self.reason}, "
-            f"failing_position={self.failing_position})"
+            f"failing_position={self.failing_position}, "
+            f"violations={len(self.violations)})"
         )
 
 
 class RouteValidator:
     # Validates routes against the current environment state
-    def __init__(self, env: GridMap):
+    def __init__(self, env: GridMap, swept: bool = False):
         self.env = env
+        self.swept = swept
 
     def validate(self, route: List[Position]) -> RouteValidationResult:
         # Reject missing or empty routes early
@@ -57,35 +87,153 @@ class RouteValidator:
                 reason=RouteInvalidReason.EMPTY_ROUTE,
             )
 
-        # Snapshot once to keep validation consistent
-        grid = self.env.snapshot()
+        return self.validate_many([route])[0]
 
-        for pos in route:
-            # Route must stay within grid bounds
-            if not self.env.in_bounds(pos):
-                return RouteValidationResult(
-                    valid=False,
-                    reason=RouteInvalidReason.OUT_OF_BOUNDS,
-                    failing_position=pos,
-                )
+    def validate_many(self, routes: Sequence[List[Position]]) -> List[RouteValidationResult]:
+        """
+        Validate a batch of routes, returning one result per route, in order.
+
+        Routes may be lists of positions or (N, 3) integer arrays. All
+        waypoints, and with `swept` all segment cells, are read in one
+        gather from a single view, so the batch sees one consistent grid.
+        """
+
+        results: List[Optional[RouteValidationResult]] = [None] * len(routes)
 
-            cell_state = grid[pos]
+        arrays = []
+        owners = []
 
-            # Obstacles are non-traversable
-            if cell_state == self.env.OBSTACLE:
-                return RouteValidationResult(
+        for i, route in enumerate(routes):
+
+            if route is None or len(route) == 0:
+                results[i] = RouteValidationResult(
                     valid=False,
-                    reason=RouteInvalidReason.OBSTACLE,
-                    failing_position=pos,
+                    reason=RouteInvalidReason.EMPTY_ROUTE,
                 )
+                continue
 
-            # No-fly zones represent restricted airspace
-            if cell_state == self.env.NO_FLY:
-                return RouteValidationResult(
-                    valid=False,
-                    reason=RouteInvalidReason.NO_FLY_ZONE,
-                    failing_position=pos,
+            arrays.append(route)
+            owners.append(i)
+
+        if not arrays:
+            return results
+
+        coords, lengths = stack_routes(arrays)
+
+        # Route number and waypoint index of every stacked point
+        route_ids = np.repeat(np.arange(len(arrays)), lengths)
+        offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        indices = np.arange(coords.shape[1]) - np.repeat(offsets, lengths)
+
+        # Copy-on-write view keeps validation consistent without a full copy
+        grid = self.env.view()
+
+        found = [self._check_cells(grid, coords, route_ids, indices, swept=False)]
+
+        if self.swept:
+            found.append(self._check_cells(grid, *self._swept_cells(coords, route_ids, indices), swept=True))
+
+        violations = self._group(found, len(arrays))
+
+        for slot, route_violations in zip(owners, violations):
+
+            # All checks passed
+            if not route_violations:
+                results[slot] = RouteValidationResult(valid=True)
+                continue
+
+            first = route_violations[0]
+            results[slot] = RouteValidationResult(
+                valid=False,
+                reason=first.reason,
+                failing_position=first.position,
+                violations=route_violations,
+            )
+
+        return results
+
+    # ------------------- CHECKS -------------------
+
+    def _check_cells(self, grid, coords, route_ids, indices, swept: bool):
+        # (route id, index, position, cell state) arrays of failing cells
+        xs, ys, zs = coords
+        x_size, y_size, z_size = grid.shape
+
+        inside = (
+            (xs >= 0) & (xs < x_size) &
+            (ys >= 0) & (ys < y_size) &
+            (zs >= 0) & (zs < z_size)
+        )
+
+        # Out-of-bounds cells read as -1, in-bounds ones from the grid
+        states = np.full(len(xs), -1, dtype=np.int16)
+
+        if inside.all():
+            states[:] = grid.gather(coords.T)
+        else:
+            states[inside] = grid.gather(np.take(coords, np.flatnonzero(inside), axis=1).T)
+
+        bad = states != self.env.FREE
+
+        if swept:
+            # Segments only fail on blocked cells; their endpoints are
+            # already reported as waypoints when out of bounds
+            bad &= inside
+
+        bad = np.flatnonzero(bad)
+
+        return route_ids[bad], indices[bad], np.take(coords, bad, axis=1), states[bad], swept
+
+    def _swept_cells(self, coords, route_ids, indices):
+        # Cells strictly between consecutive waypoints of the same route,
+        # including the corners a diagonal segment cuts across
+        segments = np.flatnonzero(route_ids[1:] == route_ids[:-1])
+
+        cells, owner = trace_segments(
+            np.take(coords, segments, axis=1),
+            np.take(coords, segments + 1, axis=1),
+        )
+
+        # Segment i starts at stacked waypoint i
+        segment_of = segments[owner]
+
+        return cells, route_ids[segment_of], indices[segment_of]
+
+    def _group(self, found, route_count: int) -> List[List[RouteViolation]]:
+        # Split stacked failures per route, ordered by index, waypoints first
+        route_ids = np.concatenate([f[0] for f in found])
+        indices = np.concatenate([f[1] for f in found])
+        positions = np.concatenate([f[2] for f in found], axis=1)
+        states = np.concatenate([f[3] for f in found])
+        swept = np.concatenate([np.full(len(f[0]), f[4]) for f in found])
+
+        grouped: List[List[RouteViolation]] = [[] for _ in range(route_count)]
+
+        order = np.lexsort((swept, indices, route_ids))
+
+        for i in order.tolist():
+            grouped[int(route_ids[i])].append(
+                RouteViolation(
+                    index=int(indices[i]),
+                    position=tuple(int(c) for c in positions[:, i]),
+                    reason=self._reason(int(states[i]), bool(swept[i])),
                 )
+            )
+
+        return grouped
+
+    def _reason(self, state: int, swept: bool) -> RouteInvalidReason:
+
+        if swept:
+            return RouteInvalidReason.SEGMENT_BLOCKED
+
+        # Route must stay within grid bounds
+        if state < 0:
+            return RouteInvalidReason.OUT_OF_BOUNDS
+
+        # No-fly zones represent restricted airspace
+        if state == self.env.NO_FLY:
+            return RouteInvalidReason.NO_FLY_ZONE
 
-        # All checks passed
-        return RouteValidationResult(valid=True)
+        # Obstacles are non-traversable
+        return RouteInvalidReason.OBSTACLE
@@ -0,0 +1,157 @@
+"""
+Constant-cost rendering primitives for the PyVista simulator.
+
+Per-frame cost has to stay flat however long the mission runs, so:
+
+- TrailBuffer writes each new waypoint into a preallocated point
+  buffer in place, growing by doubling, instead of rebuilding the
+  trail mesh and its actor every step,
+- RainField keeps every rain zone in one point cloud and moves the
+  drops in place,
+- FrameClock paces animation by elapsed time, so a move takes the
+  same wall time at any frame rate.
+"""
+
+from typing import Optional
+import time
+
+import numpy as np
+import pyvista as pv
+
+
+class TrailBuffer:
+    """
+    Flown trail as a preallocated point cloud updated in place.
+
+    Unused slots repeat the first point, so they draw on top of it.
+    append() writes one slot and marks the mesh modified; only when
+    the buffer is full is it reallocated at twice the size (and the
+    actor replaced), so the cost per step is amortized constant.
+    """
+
+    def __init__(self, plotter: pv.Plotter, capacity: int = 256, color: str = "cyan", name: str = "trail"):
+        self.plotter = plotter
+        self.capacity = capacity
+        self.color = color
+        self.name = name
+
+        self.count = 0
+        self.mesh: Optional[pv.PolyData] = None
+
+    def append(self, point):
+
+        point = np.asarray(point, dtype=np.float32)
+
+        if self.mesh is None or self.count == self.capacity:
+            self._allocate(point)
+
+        self.mesh.points[self.count] = point
+        self.mesh.Modified()
+        self.count += 1
+
+    def _allocate(self, point):
+
+        if self.mesh is None:
+            buffer = np.empty((self.capacity, 3), dtype=np.float32)
+            buffer[:] = point
+        else:
+            self.capacity *= 2
+            buffer = np.empty((self.capacity, 3), dtype=np.float32)
+            buffer[:self.count] = self.mesh.points
+            buffer[self.count:] = self.mesh.points[0]
+
+        self.mesh = pv.PolyData(buffer)
+
+        # Same name, so the previous trail actor is replaced
+        self.plotter.add_mesh(
+            self.mesh,
+            color=self.color,
+            line_width=3,
+            name=self.name
+        )
+
+
+class RainField:
+    # All rain zones as one point cloud; drops fall in place and respawn on top
+
+    def __init__(self, plotter: pv.Plotter, zones, drops_per_zone: int = 300, speed: float = 6.0, rng=None):
+        self.speed = speed
+        self.rng = rng if rng is not None else np.random.default_rng()
+        self.mesh: Optional[pv.PolyData] = None
+
+        clouds = []
+
+        for cx, cy, radius, typ in zones:
+
+            if typ != "rain":
+                continue
+
+            points = self.rng.uniform(-radius, radius, (drops_per_zone, 3))
+
+            # Grid x / y map to world y / x, like every other mesh
+            points[:, 0] += cy
+            points[:, 1] += cx
+            points[:, 2] = self.rng.uniform(3, 7, drops_per_zone)
+
+            clouds.append(points)
+
+        if not clouds:
+            return
+
+        self.mesh = pv.PolyData(np.concatenate(clouds).astype(np.float32))
+
+        plotter.add_mesh(
+            self.mesh,
+            color="lightblue",
+            point_size=3,
+            render_points_as_spheres=True,
+            name="rain"
+        )
+
+    def advance(self, dt: float):
+
+        if self.mesh is None:
+            return
+
+        # In place on the mesh's own point array, no new VTK arrays
+        points = self.mesh.points
+        points[:, 2] -= self.speed * dt
+
+        reset = points[:, 2] < 0
+        points[reset, 2] = self.rng.uniform(5, 8, int(reset.sum()))
+
+        self.mesh.Modified()
+
+
+class FrameClock:
+    """
+    Elapsed-time pacing for animations.
+
+    tick() returns the seconds since the previous tick and sleeps off
+    whatever is left of the frame budget at `max_fps`, so fast
+    machines do not spin and slow frames are caught up by moving
+    further instead of by moving later.
+    """
+
+    def __init__(self, max_fps: float = 60.0, clock=time.perf_counter, sleep=time.sleep):
+        self.frame_time = 1.0 / max_fps
+        self.clock = clock
+        self.sleep = sleep
+
+        self.last = clock()
+
+    def reset(self):
+        self.last = self.clock()
+
+    def tick(self) -> float:
+
+        spare = self.frame_time - (self.clock() - self.last)
+
+        if spare > 0:
+            self.sleep(spare)
+
+        now = self.clock()
+        dt = now - self.last
+        self.last = now
+
+        return dt
@@ -1,10 +1,15 @@
 import numpy as np
 import pyvista as pv
 import random
-import time
 
+from src.simulation.engine import MissionOutcome, SimulationEngine, SimulationObserver
+from src.simulation.world import scatter_buildings, scatter_trees
+from src.visualization.rendering import FrameClock, RainField, TrailBuffer
+from src.visualization.voxel_renderer import VoxelRenderer
 
-class DroneSimulator:
+
+class DroneSimulator(SimulationObserver):
+    # PyVista view of a mission; SimulationEngine runs the mission itself
 
     def __init__(
         self,
@@ -15,7 +20,8 @@ class DroneSimulator:
         battery_model=None,
         payload_weight=0.0,
         battery_capacity=300.0,
-        weather=None
+        weather=None,
+        generate_scenery=True
     ):
 
         self.env = env
@@ -24,33 +30,39 @@ class DroneSimulator:
         self.start = start
         self.goal = goal
 
-        self.current_pos = start
-
         self.plotter = pv.Plotter()
         self.plotter.set_background("#0b0f17")
 
+        self.engine = None
         self.path = None
-        self.route_index = 0
-        self.total_steps = 0
-        self.trail_points = []
-        self.trail_actor = None
 
-        self.rain_systems = []
+        # Batched scene layers: one actor each, updated in place
+        self.trail = TrailBuffer(self.plotter)
+        self.rain = None
+
+        # Obstacles and no-fly zones are drawn from the grid itself
+        self.voxels = VoxelRenderer(self.plotter, self.env)
+
+        # Wall time of one waypoint move, whatever the frame rate
+        self.step_duration = 0.45
+        self.clock = FrameClock()
 
         self.battery_model = battery_model
         self.payload_weight = payload_weight
         self.battery_capacity = battery_capacity
-        self.battery_remaining = battery_capacity
         self.weather = weather
 
         self.replan_penalty = 10.0
 
+        # Maps loaded from disk already hold their buildings and trees
+        self.generate_scenery = generate_scenery
+
 
     # ------------------- ENVIRONMENT -------------------
 
     def build_ground(self):
 
-        rows, cols, _ = self.env._grid.shape
+        rows, cols, _ = self.env.shape
 
         plane = pv.Plane(
             center=(cols/2, rows/2, 0),
@@ -67,48 +79,15 @@ class DroneSimulator:
             pickable=True
         )
 
-    def generate_buildings(self):
-
-        x_size, y_size, _ = self.env._grid.shape
-
-        for _ in range(30):
-
-            x = random.randint(2, x_size-3)
-            y = random.randint(2, y_size-3)
-
-            if (x, y) == (self.start[0], self.start[1]) or (x, y) == (self.goal[0], self.goal[1]):
-                continue
-
-            height = random.randint(3, 7)
-
-            building = pv.Box(
-                bounds=(y-0.5, y+0.5, x-0.5, x+0.5, 0, height)
-            )
-
-            self.plotter.add_mesh(building, color="lightgray")
-
-            for z in range(height+1):
-                self.env.add_obstacle((x, y, z))
-
-    def generate_trees(self):
+    def generate_buildings(self, rng=random):
+        # Building columns go into the grid; the voxel renderer draws them
+        return scatter_buildings(self.env, rng, self.start, self.goal)
 
-        for _ in range(20):
+    def generate_trees(self, rng=random):
+        return scatter_trees(self.env, rng)
 
-            x = random.uniform(0, 20)
-            y = random.uniform(0, 20)
-
-            trunk = pv.Cylinder(center=(y, x, 0.5), radius=0.1, height=1, direction=(0,0,1))
-            leaves = pv.Sphere(center=(y, x, 1.5), radius=0.4)
-
-            self.plotter.add_mesh(trunk, color="brown")
-            self.plotter.add_mesh(leaves, color="green")
-
-            gx = int(x)
-            gy = int(y)
-
-            for z in range(3):
-                if self.env.in_bounds((gx, gy, z)):
-                    self.env.add_obstacle((gx, gy, z))
+    def draw_obstacles(self):
+        self.voxels.update()
 
     # ------------------- WEATHER -------------------
 
@@ -122,39 +101,12 @@ class DroneSimulator:
         if weather is None:
             return
 
-        for cx, cy, radius, typ in weather.zones:
-
-            if typ != "rain":
-                continue
-
-            points = np.random.uniform(-radius, radius, (300, 3))
-
-            points[:, 0] += cy
-            points[:, 1] += cx
-            points[:, 2] = np.random.uniform(3, 7, 300)
+        self.rain = RainField(self.plotter, weather.zones)
 
-            rain = pv.PolyData(points)
+    def update_rain(self, dt):
 
-            self.plotter.add_mesh(
-                rain,
-                color="lightblue",
-                point_size=3,
-                render_points_as_spheres=True
-            )
-
-            self.rain_systems.append(rain)
-
-    def update_rain(self):
-
-        for rain in self.rain_systems:
-
-            pts = rain.points
-            pts[:, 2] -= 0.2
-
-            reset = pts[:, 2] < 0
-            pts[reset, 2] = np.random.uniform(5, 8, np.sum(reset))
-
-            rain.points = pts
+        if self.rain:
+            self.rain.advance(dt)
 
     # ------------------- PATH -------------------
 
@@ -187,7 +139,7 @@ class DroneSimulator:
 
     def update_battery_display(self):
 
-        percentage = self.battery_remaining / self.battery_capacity
+        percentage = self.engine.battery_ratio
 
         bar_length = 20
         filled = int(bar_length * percentage)
@@ -212,73 +164,58 @@ class DroneSimulator:
 
             height = 6
 
-            for z in range(height):
-                if self.env.in_bounds((grid_x, grid_y, z)):
-                    self.env.add_obstacle((grid_x, grid_y, z))
-
-            # ✅ use Cube instead of Box to fixes recursion bug
-            cube = pv.Cube(
-                center=(grid_y, grid_x, height / 2),
-                x_length=1,
-                y_length=1,
-                z_length=height
-            )
+            self.env.fill_region((grid_x, grid_y, 0), (grid_x, grid_y, height - 1), self.env.OBSTACLE)
 
-            self.plotter.add_mesh(cube, color="red")
+            # Only the blocks around the new tower are re-extracted
+            self.draw_obstacles()
 
         self.plotter.enable_point_picking(
             callback=add_obstacle,
             show_message=False,
             use_picker=True
         )
-    def update_trail(self, point):
-
-        self.trail_points.append(point)
-
-        trail = pv.PolyData(np.array(self.trail_points, dtype=np.float32))
-
-        if self.trail_actor:
-            self.plotter.remove_actor(self.trail_actor)
-
-        self.trail_actor = self.plotter.add_mesh(
-            trail,
-            color="cyan",
-            line_width=3
-        )
-
-    # ------------------- OBSTACLE DETECTION -------------------
 
-    def obstacle_ahead(self):
+    def update_trail(self, point):
+        self.trail.append(point)
 
-        lookahead = 2
+    # ------------------- MAIN LOOP -------------------
 
-        for i in range(1, lookahead+1):
+    def run(self):
 
-            if self.route_index + i >= len(self.path):
-                return False
+        self.build_ground()
 
-            cell = self.path[self.route_index + i]
+        if self.generate_scenery:
+            self.generate_buildings()
+            self.generate_trees()
 
-            if not self.env.is_traversable(cell):
-                return True
+        self.draw_obstacles()
+        self.draw_weather()
 
-        return False
+        self.engine = SimulationEngine(
+            self.env,
+            self.planner,
+            self.start,
+            self.goal,
+            battery_model=self.battery_model,
+            payload_weight=self.payload_weight,
+            battery_capacity=self.battery_capacity,
+            weather=self.weather,
+            replan_penalty=self.replan_penalty,
+            observers=[self]
+        )
 
-    # ------------------- MAIN LOOP -------------------
+        result = self.engine.run()
 
-    def run(self):
+        if result.outcome == MissionOutcome.NO_PATH:
+            raise RuntimeError("No path")
 
-        self.build_ground()
-        self.generate_buildings()
-        self.generate_trees()
-        self.draw_weather()
+        return result
 
-        self.path = self.planner.plan(self.start, self.goal)
+    # ------------------- ENGINE EVENTS -------------------
 
-        if self.path is None:
-            raise RuntimeError("No path")
+    def on_start(self, engine):
 
-        self.route_index = 0
+        self.path = engine.path
 
         self.draw_path()
         self.create_drone()
@@ -286,103 +223,99 @@ class DroneSimulator:
 
         self.plotter.show(interactive_update=True)
 
-        while self.current_pos != self.goal:
+    def on_obstacle(self, engine):
 
-            if self.route_index >= len(self.path) - 1:
-                break
+        print("🚨 Obstacle detected ahead")
+        print("⏸ Replanning...")
 
-            if self.obstacle_ahead():
-                print("🚨 Obstacle detected ahead")
-                print("⏸ Replanning...")
+        print(f"⚡ Replanning cost: {engine.replan_penalty}")
+        self.update_battery_display()
 
-                self.battery_remaining -= self.replan_penalty
+    def on_replan(self, engine, route):
 
-                print(f"⚡ Replanning cost: {self.replan_penalty}")
-                self.update_battery_display()
+        if route is None:
+            print("❌ No alternate path")
+            return
 
-                if self.battery_remaining <= 0:
-                    print("🛑 Mission aborted: battery depleted during replanning")
-                    return
+        self.path = route
 
-                new_path = self.planner.plan(self.current_pos, self.goal)
+        self.plotter.remove_actor("planned_path")
+        self.draw_path()
 
-                if new_path is None:
-                    print("❌ No alternate path")
-                    break
+    def on_step(self, engine, origin, target, energy):
 
-                self.path = new_path
-                self.route_index = 0
+        print(f"📍 Step {engine.total_steps} → {target}")
+        print(f"⚡ Energy used: {energy:.2f}")
+        self.update_battery_display()
 
-                self.plotter.remove_actor("planned_path")
-                self.draw_path()
+        # Colour drone based on battery level
+        ratio = engine.battery_ratio
 
-                continue
+        if ratio > 0.6:
+            color = "green"
+        elif ratio > engine.LOW_RATIO:
+            color = "yellow"
+        else:
+            color = "red"
 
-            next_pos = self.path[self.route_index + 1]
-            if self.battery_model:
-                energy = self.battery_model.step_cost(
-                    self.current_pos,
-                    next_pos,
-                    self.payload_weight,
-                    self.weather
-                )
-            else:
-                energy = 0
-            self.battery_remaining -= energy
+        self.drone_actor.GetProperty().SetColor(*pv.Color(color).float_rgb)
 
-            self.total_steps += 1
-            print(f"📍 Step {self.total_steps} → {next_pos}")
-            print(f"⚡ Energy used: {energy:.2f}")
-            self.update_battery_display()
+        if engine.CRITICAL_RATIO <= ratio < engine.LOW_RATIO:
+            print("⚠️ Low battery!")
 
-            # Colour drone based on battery level
-            ratio = self.battery_remaining / self.battery_capacity
+    def on_move(self, engine, origin, target):
 
-            if ratio > 0.6:
-                color = "green"
-            elif ratio > 0.3:
-                color = "yellow"
-            else:
-                color = "red"
+        start_xyz = np.array([
+            origin[1],
+            origin[0],
+            origin[2] + 1
+        ])
 
-            self.drone_actor.GetProperty().SetColor(*pv.Color(color).float_rgb)
+        end_xyz = np.array([
+            target[1],
+            target[0],
+            target[2] + 1
+        ])
 
-            if ratio < 0.1:
-                print("🛑 Mission aborted: battery critical")
-                return
+        # Progress follows elapsed time, so slow frames skip ahead
+        # instead of stretching the move
+        elapsed = 0.0
+        self.clock.reset()
+
+        while elapsed < self.step_duration:
 
-            if ratio < 0.3:
-                print("⚠️ Low battery!")
+            dt = self.clock.tick()
+            elapsed += dt
 
-            start_xyz = np.array([
-                self.current_pos[1],
-                self.current_pos[0],
-                self.current_pos[2] + 1
-            ])
+            interp = start_xyz + (end_xyz - start_xyz) * min(1.0, elapsed / self.step_duration)
 
-            end_xyz = np.array([
-                next_pos[1],
-                next_pos[0],
-                next_pos[2] + 1
-            ])
+            self.drone_actor.SetPosition(*interp)
+            self.update_rain(dt)
+            self.draw_obstacles()
 
-            for i in range(15):
+            self.plotter.update()
 
-                interp = start_xyz + (end_xyz - start_xyz) * (i / 15)
+        self.update_trail(end_xyz)
 
-                self.drone_actor.SetPosition(*interp)
-                self.update_rain()
+    def on_finish(self, engine, result):
 
-                self.plotter.update()
-                time.sleep(0.03)
+        if result.outcome == MissionOutcome.BATTERY_CRITICAL:
+            print("🛑 Mission aborted: battery critical")
+            return
 
-            self.current_pos = next_pos
-            self.route_index += 1
+        if result.outcome == MissionOutcome.BATTERY_DEPLETED:
+            print("🛑 Mission aborted: battery depleted during replanning")
+            return
 
-            self.update_trail(end_xyz)
+        if result.outcome == MissionOutcome.NO_PATH:
+            return
 
         print("\n🏁 Mission Summary")
-        print(f"🔋 Final Battery: {self.battery_remaining:.2f} ({(self.battery_remaining/self.battery_capacity)*100:.1f}%)")
-        print("✅ Goal reached successfully")
+        print(f"🔋 Final Battery: {result.battery_remaining:.2f} ({result.battery_ratio*100:.1f}%)")
+
+        if result.success():
+            print("✅ Goal reached successfully")
+        else:
+            print(f"❌ Goal not reached, stopped at {result.position}")
 
-        self.plotter.show()
\ No newline at end of file
+        self.plotter.show()
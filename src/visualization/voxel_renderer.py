@@ -0,0 +1,344 @@
+"""
+Occupancy grid rendering straight from GridMap.
+
+VoxelRenderer draws the grid itself: the exposed faces of every
+OBSTACLE and NO_FLY voxel, in one surface mesh (and actor) per
+material. FREE voxels are not drawn. Nothing is kept beside the grid,
+so buildings, clicked towers and no-fly zones from any source all
+show up.
+
+The faces are extracted per block of the grid, and every block owns a
+slot of quads in its material's mesh, with a quarter to spare. update()
+reads GridMap.changes_since(version) and re-extracts only the blocks
+that the dirty boxes touch, one cell wider because a change also
+exposes or hides its neighbors' faces. Their quads are written into
+their slots in place, unused quads collapsed to a point. A block that
+outgrows its slot moves to a new one at the end of the mesh, and the
+mesh is packed again once most of it is unused. A frame without grid
+changes costs one version comparison.
+"""
+
+from typing import Dict, Iterable, Optional, Tuple
+import itertools
+
+import numpy as np
+import pyvista as pv
+
+from src.environment.grid import GridMap, Position
+
+
+# (axis, side) of the six faces, with the corners of the unit square
+# on that face in cell-local coordinates
+_FACE_CORNERS = {
+    (0, 0): ((0, 0, 0), (0, 0, 1), (0, 1, 1), (0, 1, 0)),
+    (0, 1): ((1, 0, 0), (1, 1, 0), (1, 1, 1), (1, 0, 1)),
+    (1, 0): ((0, 0, 0), (1, 0, 0), (1, 0, 1), (0, 0, 1)),
+    (1, 1): ((0, 1, 0), (0, 1, 1), (1, 1, 1), (1, 1, 0)),
+    (2, 0): ((0, 0, 0), (0, 1, 0), (1, 1, 0), (1, 0, 0)),
+    (2, 1): ((0, 0, 1), (1, 0, 1), (1, 1, 1), (0, 1, 1)),
+}
+
+# Cell (x, y, z) spans [x-0.5, x+0.5] x [y-0.5, y+0.5] x [z, z+1]
+_CELL_ORIGIN = np.array([-0.5, -0.5, 0.0], dtype=np.float32)
+
+
+def surface_quads(cells: np.ndarray, value: int, origin: Position) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Exposed faces of the `value` voxels in the interior of `cells`.
+
+    `cells` is a block with a one-cell border of context; faces are
+    emitted for interior voxels only, wherever the neighbor across the
+    face holds a different value. `origin` is the grid position of the
+    first interior cell. Returns world-space points (grid x / y map to
+    world y / x, like the rest of the scene) and legacy VTK quad faces.
+    """
+
+    occupied = cells == value
+    inner = occupied[1:-1, 1:-1, 1:-1]
+
+    quads = []
+
+    for (axis, side), corners in _FACE_CORNERS.items():
+
+        # Neighbor across the face, same shape as the interior
+        shift = [slice(1, -1)] * 3
+        shift[axis] = slice(2, None) if side else slice(0, -2)
+
+        exposed = inner & ~occupied[tuple(shift)]
+        index = np.argwhere(exposed)
+
+        if len(index):
+            quads.append(index[:, None, :] + np.asarray(corners)[None])
+
+    if not quads:
+        return np.empty((0, 3), dtype=np.float32), np.empty(0, dtype=np.int64)
+
+    corners = np.concatenate(quads).astype(np.float32) + np.asarray(origin, dtype=np.float32) + _CELL_ORIGIN
+    count = len(corners)
+
+    points = corners.reshape(-1, 3)[:, [1, 0, 2]]
+
+    faces = np.empty((count, 5), dtype=np.int64)
+    faces[:, 0] = 4
+    faces[:, 1:] = np.arange(4 * count).reshape(count, 4)
+
+    return points, faces.ravel()
+
+
+class MaterialMesh:
+    # The single mesh of one material, a slot of quads per block
+
+    def __init__(self):
+
+        # Block -> (first quad, capacity) of its slot in the mesh
+        self.slots: Dict[Tuple[int, int, int], Tuple[int, int]] = {}
+
+        # Block -> quads written into its slot
+        self.counts: Dict[Tuple[int, int, int], int] = {}
+
+        # Block -> corner points extracted since the last flush()
+        self.pending: Dict[Tuple[int, int, int], np.ndarray] = {}
+
+        # Quads in the mesh, drawn or collapsed
+        self.size = 0
+
+        self.mesh: Optional[pv.PolyData] = None
+
+    def __len__(self) -> int:
+        return sum(self.counts.values())
+
+    def set(self, block: Tuple[int, int, int], points: np.ndarray):
+        self.pending[block] = points
+
+    def clear(self):
+        self.slots.clear()
+        self.counts.clear()
+        self.pending.clear()
+        self.size = 0
+        self.mesh = None
+
+    def flush(self) -> bool:
+        # Writes the pending blocks; True when the mesh appeared or went away
+        had_mesh = self.mesh is not None
+
+        outgrown = {
+            block: len(points) // 4
+            for block, points in self.pending.items()
+            if len(points) // 4 > self.slots.get(block, (0, 0))[1]
+        }
+
+        if outgrown:
+            self._append(outgrown)
+
+        for block, points in self.pending.items():
+            self._write(block, points)
+
+        self.pending.clear()
+
+        # Mostly abandoned slots and spare quads: pack the mesh again
+        if 2 * len(self) < self.size:
+            self._layout()
+
+        return had_mesh != (self.mesh is not None)
+
+    def _append(self, outgrown: Dict[Tuple[int, int, int], int]):
+        # Moves the blocks that outgrew their slots to new slots at the end
+        first = self.size
+
+        for block, count in sorted(outgrown.items()):
+
+            old = self.slots.get(block)
+            if old is not None:
+                self._write(block, np.empty((0, 3), dtype=np.float32))
+                del self.counts[block]
+
+            capacity = count + count // 4
+            self.slots[block] = (first, capacity)
+            first += capacity
+
+        points = np.zeros((4 * first, 3), dtype=np.float32)
+
+        if self.mesh is not None:
+            points[:4 * self.size] = self.mesh.points
+
+        self._resize(points, first)
+
+    def _layout(self):
+        # Packs every drawn block into a fresh slot, a quarter larger than its quads
+        old = np.array(self.mesh.points) if self.mesh is not None else None
+        old_slots = self.slots
+
+        self.slots = {}
+        total = 0
+
+        for block in sorted(block for block, count in self.counts.items() if count):
+            count = self.counts[block]
+            self.slots[block] = (total, count + count // 4)
+            total += count + count // 4
+
+        points = np.zeros((4 * total, 3), dtype=np.float32)
+        counts, self.counts = self.counts, {}
+
+        self._resize(points, total)
+
+        for block in self.slots:
+            first = 4 * old_slots[block][0]
+            self._write(block, old[first:first + 4 * counts[block]])
+
+    def _resize(self, points: np.ndarray, size: int):
+        # Swaps in arrays of `size` quads; the mesh object stays on screen
+        self.size = size
+
+        if not size:
+            self.mesh = None
+            return
+
+        faces = np.empty((size, 5), dtype=np.int64)
+        faces[:, 0] = 4
+        faces[:, 1:] = np.arange(4 * size).reshape(size, 4)
+
+        if self.mesh is None:
+            self.mesh = pv.PolyData(points, faces.ravel())
+        else:
+            self.mesh.points = points
+            self.mesh.faces = faces.ravel()
+
+    def _write(self, block: Tuple[int, int, int], points: np.ndarray):
+        # Copies a block's quads into its slot; spare quads collapse to a point
+        slot = self.slots.get(block)
+        count = len(points) // 4
+
+        if slot is None:
+            return
+
+        first, capacity = slot
+
+        quads = np.empty((4 * capacity, 3), dtype=np.float32)
+        quads[:len(points)] = points
+        quads[len(points):] = points[0] if count else 0.0
+
+        self.mesh.points[4 * first:4 * (first + capacity)] = quads
+        self.counts[block] = count
+
+
+class VoxelRenderer:
+    # Per-material surface meshes of a GridMap, patched block by block
+
+    STYLES = {
+        GridMap.OBSTACLE: {"color": "lightgray"},
+        GridMap.NO_FLY: {"color": "#ef4444", "opacity": 0.35},
+    }
+
+    def __init__(self, plotter: pv.Plotter, env: GridMap, block_size: int = 16):
+        self.plotter = plotter
+        self.env = env
+
+        # Edge of the cubes faces are extracted and tracked in
+        self.block_size = block_size
+
+        # Grid version the meshes on screen were extracted from
+        self.version = None
+
+        self._materials: Dict[int, MaterialMesh] = {value: MaterialMesh() for value in self.STYLES}
+
+    def blocks(self) -> Iterable[Tuple[int, int, int]]:
+        counts = [-(-n // self.block_size) for n in self.env.shape]
+        return itertools.product(*(range(c) for c in counts))
+
+    def build(self) -> int:
+        # Extracts every block from scratch; returns their count
+        self.version = self.env.version
+
+        for value, material in self._materials.items():
+
+            # Its next mesh, if any, gets a fresh actor
+            if material.mesh is not None:
+                self.plotter.remove_actor(f"voxels_{value}")
+
+            material.clear()
+
+        blocks = list(self.blocks())
+        for block in blocks:
+            self._extract(block)
+
+        for value in self._materials:
+            self._show(value)
+
+        return len(blocks)
+
+    def update(self) -> int:
+        # Re-extracts the blocks touched since the last call; returns their count
+        if self.version is None:
+            return self.build()
+
+        if self.env.version == self.version:
+            return 0
+
+        changes = self.env.changes_since(self.version)
+
+        # History dropped from the grid's log, so everything may have changed
+        if changes is None:
+            return self.build()
+
+        self.version = self.env.version
+
+        dirty = set()
+
+        for lo, hi in changes:
+            dirty.update(self._blocks_touching(lo, hi))
+
+        for block in dirty:
+            self._extract(block)
+
+        for value in self._materials:
+            self._show(value)
+
+        return len(dirty)
+
+    def _blocks_touching(self, lo: Position, hi: Position) -> Iterable[Tuple[int, int, int]]:
+        # Blocks whose faces a change in the inclusive box can affect
+        size = self.block_size
+        ranges = []
+
+        for l, h, n in zip(lo, hi, self.env.shape):
+            first = max(0, l - 1) // size
+            last = min(n - 1, h + 1) // size
+            ranges.append(range(first, last + 1))
+
+        return itertools.product(*ranges)
+
+    def _extract(self, block: Tuple[int, int, int]):
+        # Stages the block's quads with every material
+        size = self.block_size
+
+        lo = tuple(b * size for b in block)
+        hi = tuple(min(n, l + size) - 1 for l, n in zip(lo, self.env.shape))
+
+        # One cell of context on every side; outside the grid counts as FREE
+        cells = np.full(tuple(h - l + 3 for l, h in zip(lo, hi)), GridMap.FREE, dtype=np.uint8)
+
+        context_lo = tuple(l - 1 for l in lo)
+        context_hi = tuple(h + 1 for h in hi)
+        region = self.env.read_region(context_lo, context_hi)
+
+        offset = tuple(max(0, -c) for c in context_lo)
+        cells[tuple(slice(o, o + s) for o, s in zip(offset, region.shape))] = region
+
+        for value, material in self._materials.items():
+            points, _ = surface_quads(cells, value, lo)
+            material.set(block, points)
+
+    def _show(self, value: int):
+        # Writes the material's staged blocks; actors change only when its mesh comes or goes
+        material = self._materials[value]
+        name = f"voxels_{value}"
+
+        if not material.flush():
+            return
+
+        if material.mesh is None:
+            self.plotter.remove_actor(name)
+            return
+
+        # Same name, so the previous mesh of the material is replaced
+        self.plotter.add_mesh(material.mesh, name=name, **self.STYLES[value])
@@ -0,0 +1,107 @@
+"""
+Time-sliced weather penalty volume for time-dependent planning.
+
+Moving zones make the weather penalty a function of (x, y, t). The
+volume groups time steps into slices of `slice_steps`; the first read
+of any step in a slice builds the whole slice with one vectorized
+WeatherModel.cost_planes() call, so a search reads cached planes and
+never evaluates zone geometry per expansion.
+
+Memory is bounded over any horizon: at most `max_slices` slices are
+kept, least recently used first out, and advance(t) drops every slice
+that ends before mission time t. Static weather is a single plane.
+"""
+
+from collections import OrderedDict
+from typing import Tuple
+
+import numpy as np
+
+from src.weather.weather_model import WeatherModel
+
+
+class WeatherTimeVolume:
+    # (t, x, y) weather penalties, built and evicted one time slice at a time
+
+    def __init__(self, weather: WeatherModel, shape: Tuple[int, int, int], slice_steps: int = 16, max_slices: int = 8):
+        if slice_steps < 1 or max_slices < 1:
+            raise ValueError("slice_steps and max_slices must be positive")
+
+        self.weather = weather
+        self.shape = tuple(shape)
+        self.slice_steps = slice_steps
+        self.max_slices = max_slices
+
+        # Slice index -> (slice_steps, x, y) planes, least recently used first
+        self._slices: "OrderedDict[int, np.ndarray]" = OrderedDict()
+        self._key = None
+
+        # Slices dropped before mission time, never needed again
+        self._floor = 0
+
+        self.builds = 0
+
+    def plane(self, t: int) -> np.ndarray:
+        # (x, y) penalties at time step t
+        self._check_weather()
+
+        if self._static:
+            return self._static_plane
+
+        t = max(int(t), 0)
+        index = t // self.slice_steps
+
+        planes = self._slices.get(index)
+
+        if planes is None:
+            planes = self._build(index)
+        else:
+            self._slices.move_to_end(index)
+
+        return planes[t - index * self.slice_steps]
+
+    def penalty(self, t: int, pos) -> float:
+        return float(self.plane(t)[pos[0], pos[1]])
+
+    def advance(self, t: int):
+        # Mission time reached t: slices that end before it are dropped
+        self._floor = max(self._floor, int(t) // self.slice_steps)
+
+        for index in [i for i in self._slices if i < self._floor]:
+            del self._slices[index]
+
+    def clear(self):
+        self._slices.clear()
+
+    @property
+    def nbytes(self) -> int:
+        return sum(planes.nbytes for planes in self._slices.values())
+
+    def _check_weather(self):
+        # Zone or extent changes invalidate every cached slice
+        key = (self.weather.version, self.shape)
+
+        if key == self._key:
+            return
+
+        self._key = key
+        self._slices.clear()
+
+        self._static = not self.weather.is_dynamic
+
+        if self._static:
+            self._static_plane = self.weather.cost_planes([0], self.shape)[0]
+
+    def _build(self, index: int) -> np.ndarray:
+
+        start = index * self.slice_steps
+        planes = self.weather.cost_planes(np.arange(start, start + self.slice_steps), self.shape)
+        planes.setflags(write=False)
+
+        self._slices[index] = planes
+        self.builds += 1
+
+        while len(self._slices) > self.max_slices:
+            self._slices.popitem(last=False)
+
+        return planes
@@ -1,61 +1,299 @@
 import random
 import math
 
+import numpy as np
+
 
 class WeatherModel:
 
+    # Energy penalty added by each zone type
+    PENALTIES = {
+        "rain": 2,
+        "wind": 4,
+        "storm": 8,
+    }
+
+    # Motion of a zone that does not change: velocity (vx, vy) in cells
+    # per time step, radius growth per step, intensity and its rate
+    STATIC = (0.0, 0.0, 0.0, 1.0, 0.0)
+
     def __init__(self):
 
-        self.zones = []
+        self._zones = []
+        self._motion = []
+
+        # Bumped on every zone change so cached fields know they are stale
+        self.version = 0
+
+        # Airspace extent (x, y, z) covered by the cost field
+        self.shape = None
+
+        self._plane = None
+        self._field = None
+        self._field_version = -1
+
+    # ------------------- ZONES -------------------
+
+    @property
+    def zones(self):
+        # Read-only view, use add_zone / set_zones / clear_zones to mutate
+        return tuple(self._zones)
+
+    @zones.setter
+    def zones(self, zones):
+        self.set_zones(zones)
+
+    def add_zone(self, cx, cy, radius, typ, velocity=(0.0, 0.0), growth=0.0, intensity=1.0, intensity_rate=0.0):
+        # (cx, cy, radius) hold at time step 0; the zone then drifts by
+        # `velocity` cells and grows by `growth` cells per step, and its
+        # penalty is scaled by intensity + intensity_rate * t (never < 0)
+        self._zones.append((cx, cy, radius, typ))
+        self._motion.append((float(velocity[0]), float(velocity[1]), float(growth), float(intensity), float(intensity_rate)))
+        self.version += 1
+
+    def set_zones(self, zones):
+
+        self._zones = list(zones)
+        self._motion = [self.STATIC] * len(self._zones)
+        self.version += 1
+
+    def clear_zones(self):
+
+        self._zones.clear()
+        self._motion.clear()
+        self.version += 1
+
+    @property
+    def is_dynamic(self) -> bool:
+        return any(motion != self.STATIC for motion in self._motion)
+
+    def zones_at(self, t):
+        # (cx, cy, radius, typ, penalty) of every zone at time step t
+        return [
+            (cx + vx * t, cy + vy * t, max(0.0, radius + growth * t), typ, self.PENALTIES.get(typ, 0) * max(0.0, intensity + rate * t))
+            for (cx, cy, radius, typ), (vx, vy, growth, intensity, rate) in zip(self._zones, self._motion)
+        ]
 
-    def generate_weather(self, x_size, y_size):
+    def set_extent(self, x_size, y_size, z_size=1):
 
-        self.zones.clear()
+        shape = (x_size, y_size, z_size)
+
+        if shape != self.shape:
+            self.shape = shape
+            self.version += 1
+
+    def generate_weather(self, x_size, y_size, z_size=1, rng=None, rain=2, wind=2, storm=1, drift=0.0):
+        # `rng` is a random.Random for reproducible runs, the global
+        # random module by default; rain / wind / storm are zone counts.
+        # `drift` > 0 sets every zone moving at up to that many cells per
+        # time step, drawn after the layout so static draws do not change
+        rng = rng or random
+
+        self.clear_zones()
+        self.set_extent(x_size, y_size, z_size)
 
         # Rain zones
-        for _ in range(2):
-            self.zones.append((
-                random.randint(4, x_size-4),
-                random.randint(4, y_size-4),
-                random.randint(3,4),
+        for _ in range(rain):
+            self.add_zone(
+                rng.randint(4, x_size-4),
+                rng.randint(4, y_size-4),
+                rng.randint(3,4),
                 "rain"
-            ))
+            )
 
         # Wind zones
-        for _ in range(2):
-            self.zones.append((
-                random.randint(4, x_size-4),
-                random.randint(4, y_size-4),
-                random.randint(3,4),
+        for _ in range(wind):
+            self.add_zone(
+                rng.randint(4, x_size-4),
+                rng.randint(4, y_size-4),
+                rng.randint(3,4),
                 "wind"
-            ))
+            )
+
+        # Storm zones
+        for _ in range(storm):
+            self.add_zone(
+                rng.randint(5, x_size-5),
+                rng.randint(5, y_size-5),
+                rng.randint(4,5),
+                "storm"
+            )
+
+        if drift > 0:
+            self._motion = [
+                (
+                    rng.uniform(-drift, drift),
+                    rng.uniform(-drift, drift),
+                    rng.uniform(-0.05, 0.05),
+                    1.0,
+                    rng.uniform(-0.01, 0.01),
+                )
+                for _ in self._zones
+            ]
+            self.version += 1
+
+    # ------------------- SERIALIZATION -------------------
+
+    def to_dict(self):
+        # JSON-ready zones, motion and extent
+        return {
+            "shape": list(self.shape) if self.shape is not None else None,
+            "zones": [
+                {
+                    "cx": cx,
+                    "cy": cy,
+                    "radius": radius,
+                    "type": typ,
+                    "velocity": [vx, vy],
+                    "growth": growth,
+                    "intensity": intensity,
+                    "intensity_rate": rate,
+                }
+                for (cx, cy, radius, typ), (vx, vy, growth, intensity, rate) in zip(self._zones, self._motion)
+            ],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+
+        weather = cls()
+
+        if data.get("shape") is not None:
+            weather.set_extent(*data["shape"])
+
+        for zone in data.get("zones", []):
+            weather.add_zone(
+                zone["cx"],
+                zone["cy"],
+                zone["radius"],
+                zone["type"],
+                velocity=zone.get("velocity", (0.0, 0.0)),
+                growth=zone.get("growth", 0.0),
+                intensity=zone.get("intensity", 1.0),
+                intensity_rate=zone.get("intensity_rate", 0.0),
+            )
+
+        return weather
+
+    # ------------------- COST FIELD -------------------
+
+    def cost_planes(self, times, shape=None):
+        """
+        (T, x, y) penalty planes at every time step in `times`.
+
+        Zones are vertical columns, so one plane covers every altitude.
+        All zones and time steps are evaluated in one vectorized pass.
+        """
+
+        x_size, y_size = (shape or self.shape)[:2]
+        times = np.asarray(times, dtype=np.float64).reshape(-1)
 
-        # Storm zone
-        self.zones.append((
-            random.randint(5, x_size-5),
-            random.randint(5, y_size-5),
-            random.randint(4,5),
-            "storm"
-        ))
+        if not self._zones:
+            return np.zeros((len(times), x_size, y_size), dtype=np.float64)
+
+        cx, cy, radius = np.array([zone[:3] for zone in self._zones], dtype=np.float64).T
+        vx, vy, growth, intensity, rate = np.array(self._motion, dtype=np.float64).T
+        base = np.array([self.PENALTIES.get(zone[3], 0) for zone in self._zones], dtype=np.float64)
+
+        # (T, zones) geometry and penalty at each time step
+        t = times[:, None]
+        cx = cx + vx * t
+        cy = cy + vy * t
+        radius = np.maximum(0.0, radius + growth * t)
+        penalty = base * np.maximum(0.0, intensity + rate * t)
+
+        xs = np.arange(x_size)[None, :, None, None]
+        ys = np.arange(y_size)[None, None, :, None]
+
+        # dist < radius  <=>  dist^2 < radius^2, no sqrt needed
+        inside = (xs - cx[:, None, None, :]) ** 2 + (ys - cy[:, None, None, :]) ** 2 < radius[:, None, None, :] ** 2
+
+        return np.einsum("txyz,tz->txy", inside, penalty)
+
+    def _rebuild_field(self):
+
+        plane = self.cost_planes([0])[0]
+
+        # Zones are vertical columns, so every altitude shares the same plane
+        self._plane = plane
+        self._field = np.broadcast_to(plane[:, :, None], self.shape)
+        self._field_version = self.version
+
+    def cost_field(self, shape=None):
+        """
+        Return the (x, y, z) weather penalty volume.
+
+        The volume is rebuilt lazily when zones or the extent change.
+        Passing `shape` resizes the field to cover that airspace.
+        The returned array is a read-only broadcast view.
+        """
+
+        if shape is not None:
+            self.set_extent(*shape)
+
+        if self.shape is None:
+            raise ValueError("Weather extent unknown, call set_extent() first")
+
+        if self._field_version != self.version:
+            self._rebuild_field()
+
+        return self._field
 
     def cost(self, pos):
 
         x, y, z = pos
-        penalty = 0
 
-        for cx, cy, radius, typ in self.zones:
+        if self.shape is not None:
 
-            dist = math.sqrt((x-cx)**2 + (y-cy)**2)
+            if self._field_version != self.version:
+                self._rebuild_field()
 
-            if dist < radius:
+            if 0 <= x < self.shape[0] and 0 <= y < self.shape[1]:
+                return self._plane[x, y].item()
+
+        return self._zone_cost(x, y)
+
+    def costs(self, points):
+        """
+        Vectorized cost(): penalties for an (N, 3) array of positions.
+
+        Positions inside the extent read the cost plane, the rest are
+        tested against the zones directly, as cost() does.
+        """
+
+        points = np.asarray(points)
+        xs = points[:, 0]
+        ys = points[:, 1]
+
+        penalties = np.zeros(len(points), dtype=np.float64)
+        outside = np.ones(len(points), dtype=bool)
+
+        if self.shape is not None:
+
+            if self._field_version != self.version:
+                self._rebuild_field()
 
-                if typ == "rain":
-                    penalty += 2
+            inside = (xs >= 0) & (xs < self.shape[0]) & (ys >= 0) & (ys < self.shape[1])
+            penalties[inside] = self._plane[xs[inside], ys[inside]]
+            outside = ~inside
 
-                elif typ == "wind":
-                    penalty += 4
+        if outside.any():
+            for cx, cy, radius, typ, penalty in self.zones_at(0):
+                hit = outside & ((xs - cx) ** 2 + (ys - cy) ** 2 < radius ** 2)
+                penalties[hit] += penalty
 
-                elif typ == "storm":
-                    penalty += 8
+        return penalties
+
+    def _zone_cost(self, x, y):
+
+        # Fallback for positions outside the precomputed field
+        penalty = 0
+
+        for cx, cy, radius, typ, zone_penalty in self.zones_at(0):
+
+            dist = math.sqrt((x-cx)**2 + (y-cy)**2)
+
+            if dist < radius:
+                penalty += zone_penalty
 
-        return penalty
\ No newline at end of file
+        return penalty